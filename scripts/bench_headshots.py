@@ -0,0 +1,777 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the headshot scripts. Each subcommand runs against local data only
+(no network), so numbers are comparable between runs.
+
+  download  – serial httpx.Client loop vs process_headshots.download_images, against a
+              local HTTP server that adds a fixed latency per request.
+  http-cache – cold vs warm download_images against a local server that answers
+              conditional GETs with 304; the warm run prints the cache hit summary.
+  detect    – full-resolution face detection vs the downscaled (--detect-max-side) path,
+              with and without ROI refinement; reports speedup and crop geometry drift.
+  decode    – full vs reduced (DCT-scaled) JPEG decode: time and decoded megabytes.
+  backends  – images/s for each face detector backend (haar, yunet, ssd, ssd batched)
+              and how often each agrees with the Haar cascade on the main face.
+  outputs   – avatar sizes resized separately from each crop vs downscale_progressive,
+              and bytes per size for JPEG / WebP / AVIF.
+  score     – per-candidate score_candidate + max() vs candidate_table / score_table /
+              best_per_slug on synthetic analysis records; checks both pick the same rows.
+  search    – fetch_missing_headshots: serial search + downloads (old loop) vs the asyncio
+              pipeline (token-bucket searches overlapping parallel downloads), against a
+              local mock of the Serper /images endpoint and a local image server; then a
+              rerun through a warm search cache (counts the API calls it still makes).
+  client    – a new httpx.Client per request (the old search_urls) vs one create_client,
+              against the local latency server (HTTPS with --cert/--key): wall time,
+              connections opened, reuse ratio and TLS time.
+  page      – fetch_headshots_google.download_image on HTML results: the old full-page
+              read + regex + serial tries vs the streaming extractor (stops at og:image,
+              reads on if it fails) with HEAD probes on a shared pool, picked in page
+              order, on trickled pages with broken/slow <img>s and a broken og:image.
+  normalize – ImageEnhance chain (two full reads, re-encode) vs normalize_lut +
+              apply_normalize with thumbnail statistics, and the in-pipeline variant
+              (no decode or second encode) on a folder of avatars; reports each variant's
+              reference brightness and max pixel drift from the chain.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+import random
+import ssl
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import httpx
+import numpy as np
+from PIL import Image, ImageEnhance, ImageFilter
+
+from headshot_processor import (
+    AVIF_SUPPORTED,
+    OUTPUT_FORMATS,
+    PROFILES,
+    AvatarOutputs,
+    ClientStats,
+    DownloadRejected,
+    HttpCache,
+    ImageContext,
+    SearchCache,
+    apply_normalize,
+    center_crop_rect,
+    compute_crop_region,
+    create_client,
+    crop_image,
+    downscale_progressive,
+    fetch_image,
+    normalize_lut,
+    parse_sizes,
+    save_avatar,
+    save_jpeg,
+    thumbnail_brightness,
+)
+from headshot_processor import detectors as face_detectors
+import fetch_headshots_google
+import fetch_missing_headshots
+import process_headshots
+import process_staging_headshots
+
+
+class _Server(ThreadingHTTPServer):
+    # The default listen backlog (5) drops SYNs when many connections open at once
+    request_queue_size = 128
+    daemon_threads = True
+
+
+def _sample_jpeg(side: int = 400) -> bytes:
+    """Small noise JPEG used as the served payload."""
+    rng = np.random.default_rng(0)
+    arr = rng.integers(0, 256, size=(side, side, 3), dtype=np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(arr).save(buf, "JPEG", quality=85)
+    return buf.getvalue()
+
+
+def start_latency_server(
+    body: bytes, latency: float, tls: ssl.SSLContext | None = None
+) -> ThreadingHTTPServer:
+    """
+    Serve `body` as image/jpeg for any GET after sleeping `latency` seconds, with an ETag
+    and Last-Modified; conditional GETs that match get a 304. Binds all interfaces so
+    127.0.0.x aliases reach it. Connections are kept alive (HTTP/1.1); with tls, serves HTTPS.
+    server.requests logs (path, request headers, status) of every GET.
+    """
+    etag = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+    last_modified = "Wed, 01 Jan 2025 00:00:00 GMT"
+    requests: list[tuple[str, dict[str, str], int]] = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body go out in separate writes; without this, keep-alive requests stall on delayed ACKs
+        disable_nagle_algorithm = True
+
+        def do_GET(self) -> None:
+            time.sleep(latency)
+            not_modified = self.headers.get("If-None-Match") == etag or self.headers.get("If-Modified-Since") == last_modified
+            requests.append((self.path, dict(self.headers), 304 if not_modified else 200))
+            if not_modified:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "image/jpeg")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", last_modified)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args) -> None:
+            pass
+
+    server = _Server(("0.0.0.0", 0), Handler)
+    server.requests = requests
+    if tls is not None:
+        server.socket = tls.wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_serper_mock(
+    image_base: str, latency: float, results: int, extra_urls: tuple[str, ...] = ()
+) -> ThreadingHTTPServer:
+    """
+    Local stand-in for Serper's POST /images: after `latency` seconds, answers any query
+    with `results` imageUrl entries under image_base (one path per query and rank), then
+    extra_urls as given (e.g. malformed ones). server.searches counts the requests answered; server.requests logs (arrival time on
+    the time.monotonic clock, query) of each.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self) -> None:
+            arrived = time.monotonic()
+            self.server.searches += 1
+            query = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))["q"]
+            self.server.requests.append((arrived, query))
+            time.sleep(latency)
+            key = hashlib.sha256(query.encode()).hexdigest()[:12]
+            urls = [f"{image_base}/{key}-{n}.jpg" for n in range(results)] + list(extra_urls)
+            body = json.dumps({"images": [{"imageUrl": url} for url in urls]})
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body.encode())
+
+        def log_message(self, format: str, *args) -> None:
+            pass
+
+    server = _Server(("127.0.0.1", 0), Handler)
+    server.searches = 0
+    server.requests = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_page_server(image: bytes, body_kb: int, trickle: float, slow: float) -> ThreadingHTTPServer:
+    """
+    /og, /og-broken, /og-malformed and /plain: HTML pages whose body (body_kb KB of filler
+    after <head>, then the <img> tags) is sent in 1 KB chunks, `trickle` seconds apart;
+    /og has an og:image in <head>, /og-broken one that 404s, /og-malformed share images
+    and leading <img>s whose URLs cannot be parsed or fetched, /plain only <img> tags.
+    Images: /img/ok.jpg (image), /img/missing-*.jpg (404), /img/page-*.jpg (text/html),
+    /img/slow-*.jpg (the image, after `slow` seconds), /img/huge.jpg (claims 1 GB).
+    server.requests logs (method, path) of every request.
+    """
+    imgs = "".join(
+        f'<img src="/img/{kind}-{i}.jpg">' for i in range(3) for kind in ("missing", "page", "slow")
+    ) + '<img src="/img/huge.jpg"><img src="/img/ok.jpg">'
+    share_images = {
+        "/og": [("og:image", "/img/ok.jpg")],
+        "/og-broken": [("og:image", "/img/missing-og.jpg")],
+        # urljoin rejects the first; httpx rejects the others (InvalidURL, IDNA error)
+        "/og-malformed": [("og:image", "http://[::1/og.png"), ("twitter:image", "http://a\x00b.com/tw.jpg")],
+    }
+    malformed_imgs = "".join(
+        f'<img src="{src}">' for src in ("http://[::1/a.jpg", "http://a\x00b.com/b.jpg", "http://xn--/c.jpg")
+    )
+    requests: list[tuple[str, str]] = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def _head(self, status: int, ctype: str, length: int) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(length))
+            self.end_headers()
+
+        def _image(self, send_body: bool) -> None:
+            path = self.path
+            requests.append(("GET" if send_body else "HEAD", path))
+            if path.startswith("/img/slow"):
+                time.sleep(slow)
+            if path.startswith("/img/missing"):
+                self._head(404, "text/plain", 0)
+            elif path.startswith("/img/page"):
+                self._head(200, "text/html", 13)
+                if send_body:
+                    self.wfile.write(b"<html></html>")
+            elif path == "/img/huge.jpg":
+                self._head(200, "image/jpeg", 2**30)
+                self.close_connection = True
+            else:
+                self._head(200, "image/jpeg", len(image))
+                if send_body:
+                    self.wfile.write(image)
+
+        def do_HEAD(self) -> None:
+            self._image(send_body=False)
+
+        def do_GET(self) -> None:
+            if self.path.startswith("/img/"):
+                self._image(send_body=True)
+                return
+            requests.append(("GET", self.path))
+            meta = "".join(
+                f'<meta property="{key}" content="{url}">' for key, url in share_images.get(self.path, [])
+            )
+            head = f"<html><head><title>p</title>{meta}</head><body>".encode()
+            filler = b"<p>" + b"x" * 1017 + b"</p>"
+            page_imgs = malformed_imgs + imgs if self.path == "/og-malformed" else imgs
+            tail = f"{page_imgs}</body></html>".encode()
+            self._head(200, "text/html; charset=utf-8", len(head) + body_kb * len(filler) + len(tail))
+            try:
+                self.wfile.write(head)
+                for _ in range(body_kb):
+                    time.sleep(trickle)
+                    self.wfile.write(filler)
+                self.wfile.write(tail)
+            except OSError:
+                # The streaming reader hung up after <head>
+                self.close_connection = True
+
+        def log_message(self, format: str, *args) -> None:
+            pass
+
+    server = _Server(("127.0.0.1", 0), Handler)
+    server.requests = requests
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def bench_download(args: argparse.Namespace) -> None:
+    server = start_latency_server(_sample_jpeg(), args.latency)
+    port = server.server_address[1]
+    # Spread rows over a few loopback hostnames so the per-host limit is exercised
+    hosts = ["127.0.0.1", "127.0.0.2", "127.0.0.3", "127.0.0.4"]
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_dir = Path(tmp)
+        csv_path = tmp_dir / "sources.csv"
+        lines = ["id,image_url"]
+        for i in range(args.count):
+            host = hosts[i % len(hosts)]
+            lines.append(f"person_{i},http://{host}:{port}/img/{i}.jpg")
+        csv_path.write_text("\n".join(lines) + "\n")
+
+        start = time.perf_counter()
+        with httpx.Client(follow_redirects=True, timeout=30) as client:
+            for i in range(args.count):
+                r = client.get(f"http://{hosts[i % len(hosts)]}:{port}/img/{i}.jpg")
+                r.raise_for_status()
+                (tmp_dir / f"serial_{i}.jpg").write_bytes(r.content)
+        serial = time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = process_headshots.download_images(
+            csv_path,
+            tmp_dir / "downloaded",
+            concurrency=args.concurrency,
+            per_host=args.per_host,
+            http_cache_dir=None,
+        )
+        concurrent = time.perf_counter() - start
+    server.shutdown()
+
+    print(f"\n{args.count} images, {args.latency * 1000:.0f} ms latency per request")
+    print(f"  serial:     {serial:.2f}s")
+    print(f"  concurrent: {concurrent:.2f}s ({len(results)} ok; concurrency={args.concurrency}, per-host={args.per_host})")
+    print(f"  speedup:    {serial / concurrent:.1f}x")
+
+
+def bench_http_cache(args: argparse.Namespace) -> None:
+    server = start_latency_server(_sample_jpeg(args.side), args.latency)
+    port = server.server_address[1]
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_dir = Path(tmp)
+        csv_path = tmp_dir / "sources.csv"
+        rows = [f"person_{i},http://127.0.0.1:{port}/img/{i}.jpg" for i in range(args.count)]
+        csv_path.write_text("id,image_url\n" + "\n".join(rows) + "\n")
+        times = []
+        for _ in range(2):
+            start = time.perf_counter()
+            results = process_headshots.download_images(
+                csv_path, tmp_dir / "downloaded", http_cache_dir=tmp_dir / "http_cache"
+            )
+            times.append(time.perf_counter() - start)
+        cache = HttpCache(tmp_dir / "http_cache")
+        cached = sum(1 for i in range(args.count) if cache.request_headers(f"http://127.0.0.1:{port}/img/{i}.jpg"))
+        cache.close()
+    server.shutdown()
+
+    print(f"\n{args.count} images ({len(results)} ok on rerun), {args.latency * 1000:.0f} ms latency per request")
+    print(f"  cold run:  {times[0]:.2f}s")
+    print(f"  warm run:  {times[1]:.2f}s ({cached}/{args.count} URLs revalidated from the cache)")
+
+
+def _image_paths(directory: Path) -> list[Path]:
+    return sorted(
+        p for p in directory.iterdir()
+        if p.is_file() and p.suffix.lower() in (".jpg", ".jpeg", ".png", ".webp")
+    )
+
+
+def bench_detect(args: argparse.Namespace) -> None:
+    paths = _image_paths(args.images)
+    if not paths:
+        raise SystemExit(f"No images in {args.images}")
+    modes = [
+        ("full", face_detectors.HaarDetector()),
+        (f"max {args.max_side}", face_detectors.HaarDetector(max_side=args.max_side)),
+        (f"max {args.max_side}+refine", face_detectors.HaarDetector(max_side=args.max_side, refine=True)),
+    ]
+    times = {name: 0.0 for name, _ in modes}
+    drift: dict[str, list[int]] = {name: [] for name, _ in modes[1:]}
+    missed = {name: 0 for name, _ in modes[1:]}
+    for path in paths:
+        ctx = ImageContext.load(path)
+        if ctx is None:
+            continue
+        gray = ctx.gray
+        crops = {}
+        for name, detector in modes:
+            start = time.perf_counter()
+            faces = detector.detect(ctx.img, gray)
+            times[name] += time.perf_counter() - start
+            crops[name] = compute_crop_region(gray.shape, faces[0], PROFILES["staging"]) if faces else None
+        for name in drift:
+            if crops["full"] is None or crops[name] is None:
+                missed[name] += crops["full"] != crops[name]
+                continue
+            drift[name].append(max(abs(a - b) for a, b in zip(crops["full"], crops[name])))
+
+    print(f"{len(paths)} images from {args.images}")
+    for name, _ in modes:
+        line = f"  {name:<18} {times[name]:.2f}s  ({times['full'] / times[name]:.1f}x)"
+        if name in drift and drift[name]:
+            d = np.array(drift[name])
+            within = int((d <= args.tolerance).sum())
+            line += (f"  crop drift: median {np.median(d):.0f}px, max {d.max()}px, "
+                     f"{within}/{len(d)} within {args.tolerance}px, {missed[name]} face found/lost")
+        print(line)
+
+
+def bench_decode(args: argparse.Namespace) -> None:
+    paths = _image_paths(args.images)
+    if not paths:
+        raise SystemExit(f"No images in {args.images}")
+    print(f"{len(paths)} images from {args.images}")
+    for name, min_side in (("full", 0), (f"min side {args.min_side}", args.min_side)):
+        start = time.perf_counter()
+        nbytes = 0
+        for path in paths:
+            ctx = ImageContext.load_reduced(path, min_side)
+            nbytes += ctx.img.nbytes if ctx is not None else 0
+        elapsed = time.perf_counter() - start
+        print(f"  {name:<18} {elapsed:.2f}s  {nbytes / len(paths) / 2**20:.1f} MB decoded per image")
+
+
+def _iou(a: tuple[int, int, int, int], b: tuple[int, int, int, int]) -> float:
+    ax2, ay2, bx2, by2 = a[0] + a[2], a[1] + a[3], b[0] + b[2], b[1] + b[3]
+    iw = max(0, min(ax2, bx2) - max(a[0], b[0]))
+    ih = max(0, min(ay2, by2) - max(a[1], b[1]))
+    inter = iw * ih
+    union = a[2] * a[3] + b[2] * b[3] - inter
+    return inter / union if union else 0.0
+
+
+def bench_backends(args: argparse.Namespace) -> None:
+    paths = _image_paths(args.images)
+    images = [img for img in (ImageContext.load(p) for p in paths) if img is not None]
+    if not images:
+        raise SystemExit(f"No images in {args.images}")
+    backends: list[tuple[str, face_detectors.FaceDetector]] = [("haar", face_detectors.HaarDetector())]
+    if args.yunet:
+        backends.append(("yunet", face_detectors.YuNetDetector(str(args.yunet))))
+    if args.ssd_model and args.ssd_config:
+        ssd = face_detectors.SsdDetector(str(args.ssd_model), str(args.ssd_config))
+        backends.append(("ssd", ssd))
+        backends.append((f"ssd batch={args.batch}", ssd))
+
+    results: dict[str, list[list[tuple[int, int, int, int]]]] = {}
+    print(f"{len(images)} images from {args.images}")
+    for name, detector in backends:
+        start = time.perf_counter()
+        if "batch=" in name:
+            faces = []
+            for i in range(0, len(images), args.batch):
+                faces.extend(detector.detect_batch([c.img for c in images[i:i + args.batch]]))
+        else:
+            faces = [detector.detect(c.img, c.gray) for c in images]
+        elapsed = time.perf_counter() - start
+        results[name] = faces
+        line = f"  {name:<14} {len(images) / elapsed:7.1f} images/s"
+        if name != "haar":
+            # Agreement with Haar on the main (largest) face: both none, or IoU >= threshold
+            agree = sum(
+                1 for h, o in zip(results["haar"], faces)
+                if (not h and not o) or (h and o and _iou(h[0], o[0]) >= args.iou)
+            )
+            line += f"  agrees with haar on {agree}/{len(images)} ({agree / len(images):.0%}, IoU >= {args.iou})"
+        print(line)
+
+
+def bench_outputs(args: argparse.Namespace) -> None:
+    paths = _image_paths(args.images)
+    crops = []
+    for path in paths:
+        ctx = ImageContext.load(path)
+        if ctx is not None:
+            crops.append(crop_image(ctx.img, center_crop_rect(ctx.shape)))
+    if not crops:
+        raise SystemExit(f"No images in {args.images}")
+    sides = AvatarOutputs(args.sizes, retina=True).pixel_sizes()
+    print(f"{len(crops)} center crops from {args.images}, sizes {', '.join(map(str, sides))}")
+    start = time.perf_counter()
+    for crop in crops:
+        for side in sides:
+            crop.resize((side, side), resample=Image.LANCZOS, reducing_gap=3)
+    separate = time.perf_counter() - start
+    start = time.perf_counter()
+    rendered = [downscale_progressive(crop, sides) for crop in crops]
+    progressive = time.perf_counter() - start
+    print(f"  separate resizes {separate * 1000 / len(crops):6.1f} ms/image")
+    print(f"  progressive      {progressive * 1000 / len(crops):6.1f} ms/image")
+
+    formats = [fmt for fmt in OUTPUT_FORMATS if fmt != "avif" or AVIF_SUPPORTED]
+    with tempfile.TemporaryDirectory() as tmp:
+        for side in sides:
+            sizes = []
+            for fmt in formats:
+                out_path = Path(tmp) / f"a{OUTPUT_FORMATS[fmt]}"
+                total = 0
+                for avatars in rendered:
+                    save_avatar(avatars[side], out_path, fmt)
+                    total += out_path.stat().st_size
+                sizes.append(f"{fmt} {total / len(rendered) / 1024:5.1f} KB")
+            print(f"  {side:>4}px  " + "  ".join(sizes))
+
+
+def _synthetic_records(slugs: int, per_slug: int, seed: int) -> list[list[dict]]:
+    rng = random.Random(seed)
+    statuses = list(process_staging_headshots.STATUS_BONUS)
+    return [
+        [
+            {
+                "status": rng.choice(statuses),
+                "sharpness": rng.uniform(0, 900),
+                "aspect_ratio": rng.uniform(0.3, 2.0),
+                "face_centrality": rng.random(),
+                "has_text": rng.random() < 0.2,
+                "bad_brightness": rng.random() < 0.1,
+            }
+            for _ in range(per_slug)
+        ]
+        for _ in range(slugs)
+    ]
+
+
+def bench_score(args: argparse.Namespace) -> None:
+    psh = process_staging_headshots
+    groups = _synthetic_records(args.slugs, args.per_slug, args.seed)
+    print(f"{args.slugs} predictors x {args.per_slug} candidates")
+
+    start = time.perf_counter()
+    scalar = []
+    for group in groups:
+        scores = [psh.score_candidate(c) for c in group]
+        scalar.append(max(range(len(group)), key=scores.__getitem__))
+    scalar_s = time.perf_counter() - start
+
+    records = [c for group in groups for c in group]
+    start = time.perf_counter()
+    table = psh.candidate_table(records, [i for i, group in enumerate(groups) for _ in group])
+    table_s = time.perf_counter() - start
+    start = time.perf_counter()
+    best = psh.best_per_slug(table, psh.score_table(table))
+    vector_s = time.perf_counter() - start
+
+    offsets = np.cumsum([0] + [len(group) for group in groups])
+    same = sum(1 for i, pick in enumerate(scalar) if best[i] == offsets[i] + pick)
+    print(f"  score_candidate + max  {scalar_s * 1000:8.1f} ms")
+    print(f"  score_table + groupby  {vector_s * 1000:8.1f} ms  (building the table: {table_s * 1000:.1f} ms)")
+    print(f"  same pick for {same}/{len(groups)} predictors")
+
+
+def bench_search(args: argparse.Namespace) -> None:
+    fmh = fetch_missing_headshots
+    images = start_latency_server(_sample_jpeg(), args.latency)
+    serper = start_serper_mock(f"http://127.0.0.1:{images.server_address[1]}/img", args.search_latency, args.candidates)
+    fmh.SERPER_IMAGES_URL = f"http://127.0.0.1:{serper.server_address[1]}/images"
+    missing = [(f"Person {i}", "Individual", f"person_{i}") for i in range(args.count)]
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_dir = Path(tmp)
+        start = time.perf_counter()
+        serial_ok = 0
+        with httpx.Client(follow_redirects=True, timeout=30) as client:
+            for name, _, predictor_slug in missing:
+                # The old loop: a pause before each search (the rate, on average), then one download at a time
+                time.sleep(1 / args.rate)
+                r = client.post(fmh.SERPER_IMAGES_URL, json={"q": name, "num": args.candidates})
+                for n, url in enumerate(fmh._image_urls(r.json(), args.candidates), start=1):
+                    fetch_image(client, url, tmp_dir / f"serial-{predictor_slug}-{n}.jpg")
+                    serial_ok += 1
+        serial = time.perf_counter() - start
+
+        start = time.perf_counter()
+        staged = asyncio.run(fmh.fetch_all(missing, "bench", tmp_dir / "staging", None, args.rate))
+        pipelined = time.perf_counter() - start
+
+        # Twice through the search cache: the second run should not call the API at all
+        search_cache = SearchCache(tmp_dir / "search.sqlite")
+        asyncio.run(fmh.fetch_all(missing, "bench", tmp_dir / "staging", None, args.rate, search_cache=search_cache))
+        calls = serper.searches
+        start = time.perf_counter()
+        asyncio.run(fmh.fetch_all(missing, "bench", tmp_dir / "staging", None, args.rate, search_cache=search_cache))
+        cached = time.perf_counter() - start
+        cached_calls = serper.searches - calls
+        search_cache.close()
+    images.shutdown()
+    serper.shutdown()
+
+    print(f"\n{args.count} predictors x {args.candidates} candidates; search {args.search_latency * 1000:.0f} ms, "
+          f"image {args.latency * 1000:.0f} ms, {args.rate:g} searches/s")
+    print(f"  serial:    {serial:.2f}s ({serial_ok} staged)")
+    print(f"  pipelined: {pipelined:.2f}s ({sum(staged.values())} staged)")
+    print(f"  speedup:   {serial / pipelined:.1f}x (floor set by the rate: {(args.count - 1) / args.rate:.1f}s)")
+    print(f"  cached:    {cached:.2f}s ({cached_calls} search calls)")
+
+
+def bench_client(args: argparse.Namespace) -> None:
+    tls = None
+    if args.cert:
+        tls = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        tls.load_cert_chain(args.cert, args.key)
+    server = start_latency_server(_sample_jpeg(64), args.latency, tls)
+    url = f"{'https' if tls else 'http'}://127.0.0.1:{server.server_address[1]}/q"
+    verify = str(args.cert) if tls else True
+    per_request, shared = ClientStats(), ClientStats()
+
+    start = time.perf_counter()
+    for i in range(args.count):
+        with create_client(per_request, verify=verify) as client:
+            client.get(f"{url}/{i}").raise_for_status()
+    per_request_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with create_client(shared, verify=verify) as client:
+        for i in range(args.count):
+            client.get(f"{url}/{i}").raise_for_status()
+    shared_s = time.perf_counter() - start
+    server.shutdown()
+
+    print(f"\n{args.count} sequential GETs to {url.rsplit('/', 1)[0]}, {args.latency * 1000:.0f} ms latency")
+    print(f"  client per request: {per_request_s:.2f}s  {per_request.summary()}")
+    print(f"  shared client:      {shared_s:.2f}s  {shared.summary()}")
+
+
+def _download_page_serially(client: httpx.Client, url: str, dest: Path) -> bool:
+    """The old download_image for an HTML result: read the whole page, then try each image in turn."""
+    fgh = fetch_headshots_google
+    with client.stream("GET", url, timeout=30) as r:
+        body = bytearray()
+        for chunk in r.iter_bytes():
+            body += chunk
+            if len(body) >= fgh.PAGE_MAX_BYTES:
+                break
+        text = bytes(body).decode(r.encoding or "utf-8", errors="replace")
+    for img_url in fgh.extract_image_urls_from_html(text, url):
+        try:
+            fetch_image(client, img_url, dest, None, fgh.MAX_DOWNLOAD_MB * 2**20, timeout=30)
+            return True
+        except (DownloadRejected, httpx.HTTPError, httpx.InvalidURL, ValueError, OSError):
+            continue
+    return False
+
+
+def bench_page(args: argparse.Namespace) -> None:
+    server = start_page_server(_sample_jpeg(), args.body_kb, args.trickle, args.slow)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    print(f"Pages: {args.body_kb} KB body at {args.trickle * 1000:.0f} ms/KB; "
+          f"<img>s: 3 missing, 3 HTML, 3 slow ({args.slow:.0f}s), 1 huge, then the image")
+    with (
+        tempfile.TemporaryDirectory() as tmp,
+        create_client() as client,
+        ThreadPoolExecutor(max_workers=fetch_headshots_google.PROBE_WORKERS) as pool,
+    ):
+        for page in ("og", "og-broken", "og-malformed", "plain"):
+            for name, fetch in (
+                ("old", lambda url, dest: _download_page_serially(client, url, dest)),
+                ("streaming", lambda url, dest: fetch_headshots_google.download_image(client, url, dest, None, pool)),
+            ):
+                start = time.perf_counter()
+                ok = fetch(f"{base}/{page}", Path(tmp) / f"{page}-{name}.jpg")
+                print(f"  /{page:<12} {name:<9} {time.perf_counter() - start:6.2f}s  {'ok' if ok else 'failed'}")
+    server.shutdown()
+
+
+def _enhance_chain(img: Image.Image, ref: float) -> Image.Image:
+    """The ImageEnhance sequence normalize_lut / apply_normalize reproduce."""
+    brightness = float(np.median(np.asarray(img)))
+    img = ImageEnhance.Brightness(img).enhance(max(0.7, min(1.3, ref / max(brightness, 1))))
+    img = ImageEnhance.Contrast(img).enhance(1.05)
+    img = ImageEnhance.Color(img).enhance(1.02)
+    return img.filter(ImageFilter.UnsharpMask(radius=0.6, percent=80, threshold=2))
+
+
+def _load_rgb(path: Path) -> Image.Image:
+    with Image.open(path) as im:
+        return im.convert("RGB")
+
+
+def bench_normalize(args: argparse.Namespace) -> None:
+    paths = _image_paths(args.images)
+    if not paths:
+        raise SystemExit(f"No images in {args.images}")
+    print(f"{len(paths)} avatars from {args.images}")
+    with tempfile.TemporaryDirectory() as tmp:
+        out_path = Path(tmp) / "a.jpg"
+        start = time.perf_counter()
+        ref = float(np.median([np.median(np.asarray(_load_rgb(p))) for p in paths]))
+        chain = [_enhance_chain(_load_rgb(p), ref) for p in paths]
+        for img in chain:
+            save_jpeg(img, out_path)
+        chain_s = time.perf_counter() - start
+
+        # The reference from reduced (draft) decodes, as process_headshots computes it
+        start = time.perf_counter()
+        thumb_ref = float(np.median([b for b in map(thumbnail_brightness, paths) if b is not None]))
+        lut = []
+        for p in paths:
+            img = _load_rgb(p)
+            lut.append(apply_normalize(img, normalize_lut(img, thumb_ref)))
+            save_jpeg(lut[-1], out_path)
+        lut_s = time.perf_counter() - start
+
+        images = [_load_rgb(p) for p in paths]
+        start = time.perf_counter()
+        pipeline = []
+        for img in images:
+            pipeline.append(apply_normalize(img, normalize_lut(img, ref)))
+            save_jpeg(pipeline[-1], out_path)
+        pipeline_s = time.perf_counter() - start
+
+    def drift(variant: list[Image.Image]) -> int:
+        """Largest per-pixel difference from the ImageEnhance chain."""
+        return max(int(np.abs(np.asarray(a, dtype=int) - np.asarray(b, dtype=int)).max()) for a, b in zip(chain, variant))
+
+    print(f"  ImageEnhance chain       {chain_s * 1000 / len(paths):6.1f} ms/image  reference {ref:.1f}")
+    print(f"  LUT + thumbnail stats    {lut_s * 1000 / len(paths):6.1f} ms/image  reference {thumb_ref:.1f}, "
+          f"max pixel drift {drift(lut)}")
+    print(f"  LUT in-pipeline          {pipeline_s * 1000 / len(paths):6.1f} ms/image  reference {ref:.1f}, "
+          f"max pixel drift {drift(pipeline)} (already decoded, one encode)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmarks for the headshot scripts (local data only).")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("download", help="Serial vs concurrent download against a local latency server")
+    p.add_argument("-n", "--count", type=int, default=60, help="Number of images (default: 60)")
+    p.add_argument("--latency", type=float, default=0.2, help="Seconds of latency per request (default: 0.2)")
+    p.add_argument("--concurrency", type=int, default=process_headshots.DOWNLOAD_CONCURRENCY)
+    p.add_argument("--per-host", type=int, default=process_headshots.DOWNLOAD_PER_HOST)
+    p.set_defaults(func=bench_download)
+
+    p = sub.add_parser("http-cache", help="Cold vs warm (conditional GET) downloads through the HTTP cache")
+    p.add_argument("-n", "--count", type=int, default=60, help="Number of images (default: 60)")
+    p.add_argument("--latency", type=float, default=0.05, help="Seconds of latency per request (default: 0.05)")
+    p.add_argument("--side", type=int, default=1200, help="Side of the served JPEG in px (default: 1200)")
+    p.set_defaults(func=bench_http_cache)
+
+    p = sub.add_parser("detect", help="Full-resolution vs downscaled face detection on a folder of images")
+    p.add_argument("images", type=Path, nargs="?", default=process_staging_headshots.DEFAULT_STAGING_DIR,
+                   help="Folder of images (default: headshots_staging)")
+    p.add_argument("--max-side", type=int, default=800, help="Longest side for downscaled detection (default: 800)")
+    p.add_argument("--tolerance", type=int, default=8, help="Crop drift (px) counted as identical (default: 8)")
+    p.set_defaults(func=bench_detect)
+
+    p = sub.add_parser("decode", help="Full vs reduced-resolution JPEG decode on a folder of images")
+    p.add_argument("images", type=Path, nargs="?", default=process_staging_headshots.DEFAULT_STAGING_DIR,
+                   help="Folder of images (default: headshots_staging)")
+    p.add_argument("--min-side", type=int, default=800, help="Shorter side to keep when reducing (default: 800)")
+    p.set_defaults(func=bench_decode)
+
+    p = sub.add_parser("backends", help="Throughput and agreement with Haar for each face detector backend")
+    p.add_argument("images", type=Path, nargs="?", default=process_staging_headshots.DEFAULT_STAGING_DIR,
+                   help="Folder of images (default: headshots_staging)")
+    p.add_argument("--yunet", type=Path, help="YuNet .onnx model (enables the yunet backend)")
+    p.add_argument("--ssd-model", type=Path, help="SSD .caffemodel (with --ssd-config, enables ssd)")
+    p.add_argument("--ssd-config", type=Path, help="SSD .prototxt")
+    p.add_argument("--batch", type=int, default=16, help="Images per blobFromImages call for ssd (default: 16)")
+    p.add_argument("--iou", type=float, default=0.5, help="IoU counted as agreement (default: 0.5)")
+    p.set_defaults(func=bench_backends)
+
+    p = sub.add_parser("outputs", help="Separate vs progressive avatar resizes, and bytes per size and format")
+    p.add_argument("images", type=Path, nargs="?", default=process_staging_headshots.DEFAULT_STAGING_DIR,
+                   help="Folder of images (default: headshots_staging)")
+    p.add_argument("--sizes", type=parse_sizes, default=(64, 96, 150, 300),
+                   help="Avatar sizes, 2x variants added (default: 64,96,150,300)")
+    p.set_defaults(func=bench_outputs)
+
+    p = sub.add_parser("score", help="Scalar vs vectorized candidate scoring on synthetic analysis records")
+    p.add_argument("--slugs", type=int, default=5000, help="Number of predictors (default: 5000)")
+    p.add_argument("--per-slug", type=int, default=10, help="Candidates per predictor (default: 10)")
+    p.add_argument("--seed", type=int, default=0)
+    p.set_defaults(func=bench_score)
+
+    p = sub.add_parser("search", help="Serial vs pipelined candidate search + download against a local Serper mock")
+    p.add_argument("-n", "--count", type=int, default=20, help="Number of predictors (default: 20)")
+    p.add_argument("--candidates", type=int, default=10, help="Image results per search (default: 10)")
+    p.add_argument("--rate", type=float, default=4.0, help="Searches per second (default: 4)")
+    p.add_argument("--search-latency", type=float, default=0.3, help="Seconds per search request (default: 0.3)")
+    p.add_argument("--latency", type=float, default=0.1, help="Seconds per image request (default: 0.1)")
+    p.set_defaults(func=bench_search)
+
+    p = sub.add_parser("client", help="New client per request vs one shared pooled client (connections, TLS time)")
+    p.add_argument("-n", "--count", type=int, default=100, help="Number of requests (default: 100)")
+    p.add_argument("--latency", type=float, default=0.0, help="Seconds of latency per request (default: 0)")
+    p.add_argument("--cert", type=Path, help="PEM certificate (for 127.0.0.1) to serve HTTPS; also trusted by the client")
+    p.add_argument("--key", type=Path, help="PEM private key for --cert")
+    p.set_defaults(func=bench_client)
+
+    p = sub.add_parser("page", help="Old vs streaming image extraction from HTML search results")
+    p.add_argument("--body-kb", type=int, default=200, help="Page body after <head>, in KB (default: 200)")
+    p.add_argument("--trickle", type=float, default=0.01, help="Seconds between 1 KB body chunks (default: 0.01)")
+    p.add_argument("--slow", type=float, default=20.0, help="Seconds before a slow image answers (default: 20)")
+    p.set_defaults(func=bench_page)
+
+    p = sub.add_parser("normalize", help="ImageEnhance chain vs LUT normalization on a folder of avatars")
+    p.add_argument("images", type=Path, help="Folder of avatars, e.g. <output-dir>/cropped")
+    p.set_defaults(func=bench_normalize)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
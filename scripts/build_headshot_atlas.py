@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Pack the final avatars (public/portraits/{slug}.jpg) into sprite atlases at a small
+display size, so the Timeline and BrowseAll views load a few images instead of one
+per predictor. Writes public/atlas/headshots-{n}.{hash}.webp plus
+headshots-atlas.json (slug -> atlas file, x, y, w, h). Reruns only re-encode the
+atlases whose members were added, changed or removed.
+"""
+
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+from headshot_processor import ATLAS_FORMATS, ATLAS_INDEX_FILENAME, AtlasLayout, build_atlases
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+REPO_ROOT = SCRIPT_DIR.parent
+PORTRAITS_DIR = REPO_ROOT / "public" / "portraits"
+ATLAS_DIR = REPO_ROOT / "public" / "atlas"
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png", ".webp")
+
+
+def main() -> None:
+    layout = AtlasLayout()
+    parser = argparse.ArgumentParser(description="Pack final avatars into sprite atlases with a JSON index.")
+    parser.add_argument(
+        "-i", "--input-dir",
+        type=Path,
+        default=PORTRAITS_DIR,
+        help=f"Folder of final avatars named {{slug}}.jpg (default: {PORTRAITS_DIR})",
+    )
+    parser.add_argument(
+        "-o", "--output-dir",
+        type=Path,
+        default=ATLAS_DIR,
+        help=f"Folder for the atlases and {ATLAS_INDEX_FILENAME} (default: {ATLAS_DIR})",
+    )
+    parser.add_argument(
+        "--size",
+        type=int,
+        default=layout.sprite_size,
+        help=f"Sprite side in px (default: {layout.sprite_size}; use 2x the CSS size for sharp high-DPI avatars)",
+    )
+    parser.add_argument(
+        "--columns",
+        type=int,
+        default=layout.columns,
+        help=f"Sprites per atlas row (default: {layout.columns})",
+    )
+    parser.add_argument(
+        "--rows",
+        type=int,
+        default=layout.rows,
+        help=f"Rows per atlas; more avatars start a new atlas (default: {layout.rows})",
+    )
+    parser.add_argument(
+        "--format",
+        choices=sorted(ATLAS_FORMATS),
+        default=layout.format,
+        help=f"Atlas encoding (default: {layout.format})",
+    )
+    args = parser.parse_args()
+
+    input_dir = args.input_dir.resolve()
+    if not input_dir.is_dir():
+        raise SystemExit(f"Avatar folder not found: {input_dir}")
+    sources = {p.stem: p for p in sorted(input_dir.iterdir()) if p.suffix.lower() in IMAGE_SUFFIXES}
+    if not sources:
+        raise SystemExit(f"No avatars in {input_dir}")
+
+    layout = AtlasLayout(args.size, args.columns, args.rows, args.format)
+    index, rebuilt = build_atlases(sources, args.output_dir.resolve(), layout)
+    print(f"{len(index['sprites'])} avatars in {len(index['atlases'])} atlases "
+          f"({rebuilt} rebuilt, {len(index['atlases']) - rebuilt} unchanged) -> {args.output_dir / ATLAS_INDEX_FILENAME}")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,7 @@ process_headshots.py on that folder (--skip-download).
 
 from __future__ import annotations
 
+import codecs
 import csv
 import hashlib
 import json
@@ -16,15 +17,38 @@ import os
 import re
 import subprocess
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
+from html.parser import HTMLParser
 from pathlib import Path
 from urllib.parse import urljoin
 
 import httpx
 
+from headshot_processor import (
+    DEFAULT_HTTP_CACHE_DIR,
+    DEFAULT_SEARCH_CACHE_PATH,
+    HTTP_CACHE_MAX_MB,
+    SEARCH_CACHE_TTL_DAYS,
+    SEARCH_RETRY_METHODS,
+    ClientStats,
+    DownloadedImage,
+    DownloadRejected,
+    HttpCache,
+    SearchCache,
+    create_client,
+    fetch_image,
+    save_image_response,
+)
+
 # Config from env (required)
 LANGSEARCH_API_KEY = os.environ.get("LANGSEARCH_API_KEY")
 BREAK_EARLY = os.environ.get("BREAK_EARLY", "1").strip().lower() in ("1", "true", "yes")
+# Reuse cached search results younger than this many days (0 = forever)
+SEARCH_TTL_DAYS = float(os.environ.get("SEARCH_CACHE_TTL_DAYS", SEARCH_CACHE_TTL_DAYS))
+# Trim the HTTP cache to this size after the run (least recently used first)
+HTTP_CACHE_MAX_BYTES = int(float(os.environ.get("HTTP_CACHE_MAX_MB", HTTP_CACHE_MAX_MB)) * 2**20)
 
 SCRIPT_DIR = Path(__file__).resolve().parent
 REPO_ROOT = SCRIPT_DIR.parent
@@ -32,11 +56,25 @@ CSV_PATH = REPO_ROOT / "data" / "predictions.csv"
 HEADSHOTS_BASE = SCRIPT_DIR / "headshots"
 DOWNLOADED_DIR = HEADSHOTS_BASE / "downloaded"
 LOGS_DIR = REPO_ROOT / "logs"
-SEARCH_CACHE_DIR = LOGS_DIR / "search"
+SEARCH_CACHE_DIR = LOGS_DIR / "search"  # old one-JSON-per-query cache, imported into SEARCH_CACHE_PATH
+SEARCH_CACHE_PATH = DEFAULT_SEARCH_CACHE_PATH  # LangSearch responses (see headshot_processor.search_cache)
 API_URL = "https://api.langsearch.com/v1/web-search"
 NUM_RESULTS = 15
+API_COUNT = min(NUM_RESULTS, 10)  # the API returns at most 10 results per call
+SEARCH_PROVIDER = f"langsearch/count={API_COUNT}"
 MIN_IMAGE_BYTES = 0  # accept any image when extracting from HTML (set higher to skip tiny icons)
+MAX_DOWNLOAD_MB = 15  # larger images are dropped mid-stream
+PAGE_MAX_BYTES = 2 * 1024 * 1024  # HTML read for image extraction (reading stops earlier at an og:image)
+# Wall-clock budget per search result (page read, probes and image downloads), so a slow
+# page cannot hold the run for minutes; each request also gets at most the time left
+RESULT_DEADLINE = 30.0
+PAGE_TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+# <img> candidates are checked with HEAD (or a 1-byte ranged GET) before any full download
+PROBE_TIMEOUT = 5.0
+PROBE_WORKERS = 8
+MAX_PROBES = 16
 EXCLUDED_DOMAINS = ("alamy.com",)  # search result URLs containing these are skipped
+HTTP_CACHE_DIR = DEFAULT_HTTP_CACHE_DIR  # conditional GETs for result pages/images (see headshot_processor.http_cache)
 
 
 def slug(s: str) -> str:
@@ -65,7 +103,7 @@ def build_query(name: str, predictor_type: str) -> str:
 
 
 def _query_hash(query: str) -> str:
-    """Stable hash of the search query for cache filenames."""
+    """Stable hash of the search query (file name in the old SEARCH_CACHE_DIR cache)."""
     return hashlib.sha256(query.strip().encode("utf-8")).hexdigest()
 
 
@@ -92,66 +130,86 @@ def _urls_from_response(data: dict, count: int) -> list[str]:
     return urls[:count]
 
 
-def search_urls(query: str, api_key: str, count: int = NUM_RESULTS) -> tuple[list[str], dict]:
-    """Call LangSearch API or load cached result; return (url list, raw response)."""
-    SEARCH_CACHE_DIR.mkdir(parents=True, exist_ok=True)
-    h = _query_hash(query)
-    cache_path = SEARCH_CACHE_DIR / f"{h}.json"
-
-    if cache_path.exists():
-        try:
-            data = json.loads(cache_path.read_text(encoding="utf-8"))
-            urls = _urls_from_response(data, count)
-            print("  (using cached search result)")
-            return urls, data
-        except (json.JSONDecodeError, KeyError):
-            pass
-
-    payload = {"query": query, "count": min(count, 10), "freshness": "noLimit"}
+def search_urls(
+    query: str,
+    api_key: str,
+    client: httpx.Client,
+    count: int = NUM_RESULTS,
+    search_cache: SearchCache | None = None,
+    cached: dict | None = None,
+) -> tuple[list[str], dict]:
+    """
+    Return (url list, raw response) for query: from cached (a response already looked up
+    in the search cache) when given, else from the LangSearch API, storing the response
+    in search_cache. client is the shared one (create_client), so searches reuse its
+    connection to the API instead of a new TLS handshake per query.
+    """
+    if cached is not None:
+        print("  (using cached search result)")
+        return _urls_from_response(cached, count), cached
+
+    payload = {"query": query, "count": API_COUNT, "freshness": "noLimit"}
     headers = {
         "Authorization": f"Bearer {api_key}",
         "Content-Type": "application/json",
     }
-    with httpx.Client(timeout=15) as client:
-        r = client.post(API_URL, json=payload, headers=headers)
-        if r.status_code != 200:
-            raise RuntimeError(f"LangSearch API {r.status_code}: {r.text}")
-        data = r.json()
+    r = client.post(API_URL, json=payload, headers=headers, timeout=15)
+    if r.status_code != 200:
+        raise RuntimeError(f"LangSearch API {r.status_code}: {r.text}")
+    data = r.json()
 
-    cache_path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    if search_cache is not None:
+        search_cache.put(SEARCH_PROVIDER, query, data)
     urls = _urls_from_response(data, count)
     return urls, data
 
 
+class PageImageParser(HTMLParser):
+    """
+    Incremental (feed per chunk) collector of image URLs in a page: og:image /
+    twitter:image <meta> content (either attribute order) and <img src>, skipping data:
+    URIs and URLs that cannot be joined to the page's. found_meta turns true at the
+    first share image, so readers can stop there.
+    """
+
+    def __init__(self, base_url: str):
+        super().__init__(convert_charrefs=True)
+        self.base = base_url.strip()
+        self.meta_images: list[str] = []
+        self.img_srcs: list[str] = []
+
+    @property
+    def found_meta(self) -> bool:
+        return bool(self.meta_images)
+
+    def _join(self, url: str, into: list[str]) -> None:
+        try:
+            into.append(urljoin(self.base, url))
+        except ValueError:  # e.g. an unterminated IPv6 host: "http://[::1/x.png"
+            pass
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        a = {k.lower(): (v or "").strip() for k, v in attrs}
+        if tag == "meta":
+            key = (a.get("property") or a.get("name") or "").lower()
+            if key in ("og:image", "twitter:image") and a.get("content"):
+                self._join(a["content"], self.meta_images)
+        elif tag == "img":
+            src = a.get("src", "")
+            if src and not src.startswith("data:"):
+                self._join(src, self.img_srcs)
+
+    def candidates(self) -> list[str]:
+        """Share images first, then <img> sources, without duplicates."""
+        return list(dict.fromkeys(self.meta_images + self.img_srcs))
+
+
 def extract_image_urls_from_html(html: str, base_url: str) -> list[str]:
     """Parse HTML and return candidate image URLs in preference order: og:image first, then img src."""
-    candidates: list[str] = []
-    base = base_url.strip()
-
-    # og:image (often the main share image)
-    for m in re.finditer(
-        r'<meta[^>]+(?:property|name)=["\'](?:og:image|twitter:image)["\'][^>]+content=["\']([^"\']+)["\']',
-        html,
-        re.I,
-    ):
-        candidates.append(urljoin(base, m.group(1).strip()))
-    if not candidates:
-        for m in re.finditer(
-            r'<meta[^>]+content=["\']([^"\']+)["\'][^>]+(?:property|name)=["\'](?:og:image|twitter:image)["\']',
-            html,
-            re.I,
-        ):
-            candidates.append(urljoin(base, m.group(1).strip()))
-
-    # img src (skip data: and very small-looking paths like icons)
-    for m in re.finditer(r'<img[^>]+src=["\']([^"\']+)["\']', html, re.I):
-        src = m.group(1).strip()
-        if src.startswith("data:"):
-            continue
-        full = urljoin(base, src)
-        if full not in candidates:
-            candidates.append(full)
-    return candidates
+    parser = PageImageParser(base_url)
+    parser.feed(html)
+    parser.close()
+    return parser.candidates()
 
 
 def ext_from_url(url: str, content_type: str | None = None) -> str:
@@ -173,47 +231,180 @@ def ext_from_url(url: str, content_type: str | None = None) -> str:
     return ".jpg"
 
 
-def download_image(client: httpx.Client, url: str, dest: Path) -> bool:
-    """Download url to dest. If url is HTML, fetch page and download best image from it."""
-    try:
-        r = client.get(url, follow_redirects=True, timeout=30)
-        r.raise_for_status()
-        ct = (r.headers.get("content-type") or "").split(";")[0].strip().lower()
-        if ct.startswith("image/"):
-            ext = ext_from_url(url, r.headers.get("content-type"))
-            out = dest.parent / (dest.stem + ext)
-            out.write_bytes(r.content)
-            if out != dest and dest.exists():
-                dest.unlink()
-            return True
-        if "text/html" not in ct:
-            return False
-        # Page is HTML: extract image URLs and try each
+def _save_as(image: DownloadedImage, dest: Path) -> None:
+    """Move a finished download to dest's stem plus the sniffed format's extension."""
+    out = dest.parent / (dest.stem + image.extension)
+    os.replace(image.path, out)
+    if out != dest and dest.exists():
+        dest.unlink()
+
+
+def _remaining(deadline: float, cap: float) -> float:
+    """Seconds left before deadline, at most cap (never below a token 0.1 s)."""
+    return max(0.1, min(cap, deadline - time.monotonic()))
+
+
+class PageScan:
+    """
+    A streamed HTML response fed to a PageImageParser chunk by chunk, so a page is only
+    read as far as needed. scan(stop_at_meta=True) stops at the first og:image /
+    twitter:image (normally in <head>); a later scan() resumes from there for the body's
+    <img> tags. Reading always ends after PAGE_MAX_BYTES, at the deadline, or when the
+    connection fails (what was parsed so far is kept).
+    """
+
+    def __init__(self, r: httpx.Response, base_url: str):
+        self.parser = PageImageParser(base_url)
+        self.read = 0
+        self.done = False
+        self._chunks = r.iter_bytes()
         try:
-            text = r.text
-        except Exception:
-            return False
-        candidates = extract_image_urls_from_html(text, url)
-        for img_url in candidates:
-            try:
-                ir = client.get(img_url, follow_redirects=True, timeout=30)
-                ir.raise_for_status()
-                ict = (ir.headers.get("content-type") or "").split(";")[0].strip().lower()
-                if not ict.startswith("image/"):
-                    continue
-                if len(ir.content) < MIN_IMAGE_BYTES:
-                    continue
-                ext = ext_from_url(img_url, ir.headers.get("content-type"))
-                out = dest.parent / (dest.stem + ext)
-                out.write_bytes(ir.content)
-                if out != dest and dest.exists():
-                    dest.unlink()
+            self._decoder = codecs.getincrementaldecoder(r.encoding or "utf-8")(errors="replace")
+        except LookupError:
+            self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    def scan(self, deadline: float, stop_at_meta: bool = False) -> PageImageParser:
+        if self.done or (stop_at_meta and self.parser.found_meta):
+            return self.parser
+        try:
+            for chunk in self._chunks:
+                self.parser.feed(self._decoder.decode(chunk[: PAGE_MAX_BYTES - self.read]))
+                self.read += len(chunk)
+                if self.read >= PAGE_MAX_BYTES or time.monotonic() >= deadline:
+                    self.done = True
+                    break
+                if stop_at_meta and self.parser.found_meta:
+                    break
+            else:
+                self.done = True
+        except httpx.HTTPError:
+            self.done = True
+        return self.parser
+
+
+def probe_image(client: httpx.Client, url: str, deadline: float, max_bytes: int) -> bool:
+    """
+    True if url looks like a usable image without downloading it: a HEAD (or, when HEAD
+    is refused or says nothing, a 1-byte ranged GET) answers with an image/* or unknown
+    content type and a size, if given, between MIN_IMAGE_BYTES and max_bytes.
+    """
+    timeout = _remaining(deadline, PROBE_TIMEOUT)
+    try:
+        r = client.head(url, timeout=timeout)
+        status, headers = r.status_code, r.headers
+        if status >= 400 or not headers.get("content-type"):
+            with client.stream("GET", url, headers={"Range": "bytes=0-0"}, timeout=timeout) as r:
+                status, headers = r.status_code, r.headers
+    except (httpx.HTTPError, httpx.InvalidURL, ValueError):
+        return False
+    if status >= 400:
+        return False
+    ct = (headers.get("content-type") or "").split(";")[0].strip().lower()
+    if ct and not ct.startswith("image/"):
+        return False
+    # 206: "bytes 0-0/<total>"; otherwise Content-Length is the full body
+    total = headers.get("content-range", "").rpartition("/")[2] if status == 206 else headers.get("content-length", "")
+    if total.isdigit() and not MIN_IMAGE_BYTES <= int(total) <= max_bytes:
+        return False
+    return True
+
+
+def _try_image(
+    client: httpx.Client, img_url: str, part: Path, dest: Path, cache: HttpCache | None, deadline: float
+) -> bool:
+    """Download img_url to dest within deadline (see download_image); True on success."""
+    max_bytes = MAX_DOWNLOAD_MB * 2**20
+    timeout = _remaining(deadline, 30.0)
+    try:
+        image = fetch_image(client, img_url, part, cache, max_bytes, follow_redirects=True, timeout=timeout)
+    except (DownloadRejected, httpx.HTTPError, httpx.InvalidURL, ValueError, OSError):
+        return False
+    if image.size < MIN_IMAGE_BYTES:
+        part.unlink()
+        return False
+    _save_as(image, dest)
+    return True
+
+
+def _probe_in_order(
+    client: httpx.Client,
+    urls: list[str],
+    part: Path,
+    dest: Path,
+    cache: HttpCache | None,
+    deadline: float,
+    pool: ThreadPoolExecutor | None,
+) -> bool:
+    """
+    Probe urls (concurrently on pool, else one by one) and download the first one in page
+    order that passes; a later candidate is only used once every earlier probe has failed,
+    so the pick does not depend on which host answers first. Probes not yet started when
+    this returns are cancelled; running ones end within PROBE_TIMEOUT.
+    """
+    max_bytes = MAX_DOWNLOAD_MB * 2**20
+    if pool is None:
+        return any(
+            time.monotonic() < deadline
+            and probe_image(client, u, deadline, max_bytes)
+            and _try_image(client, u, part, dest, cache, deadline)
+            for u in urls
+        )
+    futures = [pool.submit(probe_image, client, u, deadline, max_bytes) for u in urls]
+    try:
+        for u, future in zip(urls, futures):
+            if future.result(timeout=max(0.0, deadline - time.monotonic())) and _try_image(
+                client, u, part, dest, cache, deadline
+            ):
                 return True
-            except Exception:
-                continue
+    except TimeoutError:
+        pass
+    finally:
+        for future in futures:
+            future.cancel()
+    return False
+
+
+def download_image(
+    client: httpx.Client,
+    url: str,
+    dest: Path,
+    cache: HttpCache | None = None,
+    pool: ThreadPoolExecutor | None = None,
+) -> bool:
+    """
+    Download url to dest. If url is HTML, stream the page only until its og:image /
+    twitter:image and download that; if there is none, or none of them downloads, read
+    on and probe the page's <img> candidates (HEAD / ranged GET, concurrently on pool,
+    the run's shared PROBE_WORKERS threads) and download the first in page order to pass.
+    Images are streamed to a temp file and dropped early when they are not an image, over
+    MAX_DOWNLOAD_MB or of unusable size; cached images are revalidated (304). Everything
+    for one url finishes within RESULT_DEADLINE.
+    """
+    deadline = time.monotonic() + RESULT_DEADLINE
+    part = dest.parent / f".{dest.stem}.download"
+    max_bytes = MAX_DOWNLOAD_MB * 2**20
+    try:
+        headers = cache.request_headers(url) if cache is not None else {}
+        with client.stream("GET", url, headers=headers, follow_redirects=True, timeout=PAGE_TIMEOUT) as r:
+            ct = (r.headers.get("content-type") or "").split(";")[0].strip().lower()
+            if r.status_code != 200 or "text/html" not in ct:
+                _save_as(save_image_response(r, url, part, cache, max_bytes), dest)
+                return True
+            page = PageScan(r, url)
+            meta_images = list(page.scan(deadline, stop_at_meta=True).meta_images)
+            for img_url in meta_images:
+                if time.monotonic() >= deadline:
+                    return False
+                if _try_image(client, img_url, part, dest, cache, deadline):
+                    return True
+            # No usable share image: the candidates are the <img> tags further down the page
+            candidates = page.scan(deadline).candidates()
+    except (DownloadRejected, httpx.HTTPError, httpx.InvalidURL, ValueError, OSError):
         return False
-    except Exception:
+    probes = [u for u in candidates if u not in meta_images][:MAX_PROBES]
+    if not probes or time.monotonic() >= deadline:
         return False
+    return _probe_in_order(client, probes, part, dest, cache, deadline, pool)
 
 
 def main() -> None:
@@ -235,12 +426,29 @@ def main() -> None:
     print(f"Downloading up to {NUM_RESULTS} image results per predictor into {DOWNLOADED_DIR}")
     api_log_entries: list[dict] = []
 
-    with httpx.Client(follow_redirects=True, timeout=30) as client:
+    # One bulk lookup for every query up front (after importing the old per-query files)
+    search_cache = SearchCache(SEARCH_CACHE_PATH, SEARCH_TTL_DAYS)
+    queries = [build_query(name, ptype) for name, ptype in predictors]
+    legacy = {q: SEARCH_CACHE_DIR / f"{_query_hash(q)}.json" for q in queries}
+    imported = search_cache.import_files(SEARCH_PROVIDER, legacy)
+    if imported:
+        print(f"Imported {imported} search results from {SEARCH_CACHE_DIR}")
+    cached_searches = search_cache.get_many(SEARCH_PROVIDER, queries)
+    print(f"{len(cached_searches)}/{len(queries)} searches cached")
+
+    cache = HttpCache(HTTP_CACHE_DIR, HTTP_CACHE_MAX_BYTES)
+    stats = ClientStats()
+    with (
+        create_client(stats, retry_methods=SEARCH_RETRY_METHODS) as client,
+        ThreadPoolExecutor(max_workers=PROBE_WORKERS) as probe_pool,
+    ):
         for name, ptype in predictors:
             query = build_query(name, ptype)
             print(f"\n{name} ({ptype}) -> {query}")
             try:
-                urls, raw_response = search_urls(query, LANGSEARCH_API_KEY)
+                urls, raw_response = search_urls(
+                    query, LANGSEARCH_API_KEY, client, search_cache=search_cache, cached=cached_searches.get(query)
+                )
                 api_log_entries.append({"query": query, "name": name, "type": ptype, "response": raw_response})
             except Exception as e:
                 print(f"  search error: {e}")
@@ -259,7 +467,7 @@ def main() -> None:
             for i, url in enumerate(urls, start=1):
                 ext = ext_from_url(url)
                 dest = DOWNLOADED_DIR / f"{name_slug}_{i}{ext}"
-                if download_image(client, url, dest):
+                if download_image(client, url, dest, cache, probe_pool):
                     print(f"  -> {dest.name}")
                 else:
                     print(f"  -> skip {url[:100]}...")
@@ -267,6 +475,12 @@ def main() -> None:
             if BREAK_EARLY:
                 break
 
+    print(f"\n{stats.summary()}")
+    cache.evict()
+    print(cache.summary())
+    cache.close()
+    search_cache.close()
+
     # Write API results log
     log_path = LOGS_DIR / f"langsearch_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}.json"
     log_path.write_text(json.dumps(api_log_entries, indent=2), encoding="utf-8")
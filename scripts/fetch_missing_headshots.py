@@ -6,20 +6,40 @@ search the web for up to 10 headshot/logo candidates and download them into
 scripts/headshots_staging/ as {predictor_slug}-{n}.jpg.
 
 Uses Serper (serper.dev) image search. Set SERPER_API_KEY in your environment.
+Searches and candidate downloads overlap: searches are paced by a token bucket and
+each predictor's candidates are downloaded in parallel as soon as its search returns.
 """
 
 from __future__ import annotations
 
+import argparse
+import asyncio
 import csv
 import os
-import random
 import re
 import time
 from pathlib import Path
+from urllib.parse import urlsplit
 
 import httpx
 
-SERPER_IMAGES_URL = "https://google.serper.dev/images"
+from headshot_processor import (
+    DEFAULT_HTTP_CACHE_DIR,
+    DEFAULT_SEARCH_CACHE_PATH,
+    HTTP_CACHE_MAX_MB,
+    SEARCH_CACHE_TTL_DAYS,
+    SEARCH_RETRY_METHODS,
+    ClientStats,
+    DownloadRejected,
+    HttpCache,
+    SearchCache,
+    TokenBucket,
+    create_async_client,
+    fetch_image_async,
+)
+
+# Override (e.g. http://127.0.0.1:8000/images) to run against a local mock of the endpoint
+SERPER_IMAGES_URL = os.environ.get("SERPER_IMAGES_URL", "https://google.serper.dev/images")
 
 SCRIPT_DIR = Path(__file__).resolve().parent
 REPO_ROOT = SCRIPT_DIR.parent
@@ -27,8 +47,13 @@ CSV_PATH = REPO_ROOT / "data" / "predictions-v2.csv"
 HEADSHOTS_DIR = REPO_ROOT / "public" / "headshots"
 STAGING_DIR = SCRIPT_DIR / "headshots_staging"
 NUM_CANDIDATES = 10
-REQUEST_DELAY_MIN = 0.5  # seconds between Serper requests (polite)
-REQUEST_DELAY_MAX = 1.5
+SEARCH_RATE = 1.0  # Serper requests per second on average (polite; token bucket, no sleeping threads)
+SEARCH_BURST = 1
+DOWNLOAD_CONCURRENCY = 16  # candidate downloads in flight overall
+DOWNLOAD_PER_HOST = 4  # ... and per hostname
+MAX_DOWNLOAD_MB = 15  # larger candidates are dropped mid-stream
+HTTP_CACHE_DIR = DEFAULT_HTTP_CACHE_DIR  # conditional GETs for candidate images (see headshot_processor.http_cache)
+SEARCH_CACHE_PATH = DEFAULT_SEARCH_CACHE_PATH  # Serper responses (see headshot_processor.search_cache)
 
 
 def slug(name: str) -> str:
@@ -66,16 +91,45 @@ def has_staging_images(staging_dir: Path, predictor_slug: str) -> bool:
     return any(staging_dir.glob(f"{predictor_slug}-*.jpg"))
 
 
-def search_image_urls(
+def _image_urls(data: dict, max_results: int) -> list[str]:
+    """Distinct image URLs from a Serper /images response, in result order."""
+    urls: list[str] = []
+    for item in (data.get("images") or data.get("imageResults") or [])[:max_results]:
+        url = (
+            (
+                item.get("imageUrl")
+                or item.get("original_image_url")
+                or item.get("image")
+                or item.get("link")
+                or item.get("original")
+            )
+            or ""
+        ).strip()
+        if url and url not in urls:
+            urls.append(url)
+    return urls[:max_results]
+
+
+def _search_provider(max_results: int) -> str:
+    """SearchCache provider key: the result count changes the response."""
+    return f"serper-images/num={max_results}"
+
+
+async def search_image_urls(
     query: str,
     api_key: str,
-    client: httpx.Client,
+    client: httpx.AsyncClient,
+    limiter: TokenBucket,
     max_results: int = NUM_CANDIDATES,
+    search_cache: SearchCache | None = None,
 ) -> list[str]:
-    """Search Serper for images. Returns list of image URLs (up to max_results)."""
-    urls: list[str] = []
+    """
+    Search Serper for images once limiter allows. Returns list of image URLs (up to
+    max_results); a successful response is stored in search_cache.
+    """
+    await limiter.acquire()
     try:
-        r = client.post(
+        r = await client.post(
             SERPER_IMAGES_URL,
             json={"q": query, "num": max_results},
             headers={
@@ -86,22 +140,12 @@ def search_image_urls(
         )
         r.raise_for_status()
         data = r.json()
-        for item in (data.get("images") or data.get("imageResults") or [])[:max_results]:
-            url = (
-                (
-                    item.get("imageUrl")
-                    or item.get("original_image_url")
-                    or item.get("image")
-                    or item.get("link")
-                    or item.get("original")
-                )
-                or ""
-            ).strip()
-            if url and url not in urls:
-                urls.append(url)
     except Exception as e:
         print(f"    search error: {e}")
-    return urls[:max_results]
+        return []
+    if search_cache is not None:
+        search_cache.put(_search_provider(max_results), query, data)
+    return _image_urls(data, max_results)
 
 
 def build_query(name: str, predictor_type: str) -> str:
@@ -111,36 +155,132 @@ def build_query(name: str, predictor_type: str) -> str:
     return f"{name} {predictor_type}"
 
 
-def download_image(client: httpx.Client, url: str, dest: Path) -> bool:
-    """Download url to dest as JPEG; return True on success."""
+def _to_jpeg(dest: Path) -> None:
+    """Normalize to .jpg: convert other formats in place."""
     try:
-        r = client.get(url, follow_redirects=True, timeout=20)
-        r.raise_for_status()
-        content = r.content
-        ct = (r.headers.get("content-type") or "").split(";")[0].strip().lower()
-        if not (ct.startswith("image/") or len(content) > 100):
-            return False
-        dest.parent.mkdir(parents=True, exist_ok=True)
-        # Normalize to .jpg: write bytes as-is if already jpeg, else try to convert
-        if "jpeg" in ct or "jpg" in ct or url.lower().split("?")[0].endswith((".jpg", ".jpeg")):
-            dest.write_bytes(content)
-            return True
-        try:
-            from PIL import Image
-            import io
-            img = Image.open(io.BytesIO(content))
-            if img.mode in ("RGBA", "P"):
-                img = img.convert("RGB")
-            img.save(dest, "JPEG", quality=90)
-            return True
-        except Exception:
-            dest.write_bytes(content)
-            return True
+        from PIL import Image
+        with Image.open(dest) as src:
+            img = src.convert("RGB") if src.mode in ("RGBA", "P") else src.copy()
+        img.save(dest, "JPEG", quality=90)
     except Exception:
+        pass
+
+
+async def download_image(client: httpx.AsyncClient, url: str, dest: Path, cache: HttpCache | None = None) -> bool:
+    """
+    Download url to dest as JPEG; return True on success. The body is streamed and
+    dropped early if it is not an image, over MAX_DOWNLOAD_MB or of unusable size.
+    """
+    try:
+        image = await fetch_image_async(
+            client, url, dest, cache, MAX_DOWNLOAD_MB * 2**20, follow_redirects=True, timeout=20
+        )
+    except (DownloadRejected, httpx.HTTPError, httpx.InvalidURL, ValueError, OSError):
         return False
+    if image.format != "JPEG":
+        await asyncio.to_thread(_to_jpeg, dest)
+    return True
+
+
+async def fetch_all(
+    missing: list[tuple[str, str, str]],
+    api_key: str,
+    staging_dir: Path,
+    cache: HttpCache | None = None,
+    search_rate: float = SEARCH_RATE,
+    concurrency: int = DOWNLOAD_CONCURRENCY,
+    per_host: int = DOWNLOAD_PER_HOST,
+    search_cache: SearchCache | None = None,
+    stats: ClientStats | None = None,
+) -> dict[str, int]:
+    """
+    Search and stage candidates for every (name, type, slug) in missing. All predictors
+    start at once: searches wait for the token bucket (search_rate per second) while
+    earlier predictors' candidates download, at most `concurrency` overall and `per_host`
+    per hostname. Each predictor's lines are printed together once it is done.
+    Queries found in search_cache (one bulk lookup up front) skip the API and the bucket.
+    Searches and downloads share one pooled client (create_async_client; stats collects
+    its counters; rate-limited or failed searches are retried with backoff).
+    Returns {slug: candidates staged}.
+    """
+    limiter = TokenBucket(search_rate, SEARCH_BURST)
+    queries = [build_query(name, ptype) for name, ptype, _ in missing]
+    cached = search_cache.get_many(_search_provider(NUM_CANDIDATES), queries) if search_cache is not None else {}
+    global_limit = asyncio.Semaphore(max(1, concurrency))
+    host_limits: dict[str, asyncio.Semaphore] = {}
+
+    async def download(client: httpx.AsyncClient, url: str, dest: Path) -> bool:
+        try:
+            host = urlsplit(url).hostname or ""
+        except ValueError:
+            return False
+        host_limit = host_limits.setdefault(host, asyncio.Semaphore(max(1, per_host)))
+        # Host slot first: downloads queued behind a busy host must not hold global slots
+        async with host_limit, global_limit:
+            return await download_image(client, url, dest, cache)
+
+    async def predictor(client: httpx.AsyncClient, name: str, ptype: str, predictor_slug: str) -> int:
+        query = build_query(name, ptype)
+        lines = [f"{name} ({ptype}) -> “{query}”"]
+        if query in cached:
+            lines[0] += " (cached search)"
+            urls = _image_urls(cached[query], NUM_CANDIDATES)
+        else:
+            urls = await search_image_urls(query, api_key, client, limiter, NUM_CANDIDATES, search_cache)
+        if not urls:
+            lines.append("  -> no image results")
+        dests = [staging_dir / f"{predictor_slug}-{n}.jpg" for n in range(1, len(urls) + 1)]
+        ok = await asyncio.gather(*(download(client, url, dest) for url, dest in zip(urls, dests)))
+        for n, (dest, saved) in enumerate(zip(dests, ok), start=1):
+            lines.append(f"  -> {dest.name}" if saved else f"  -> skip #{n}")
+        print("\n".join(lines))
+        return sum(ok)
+
+    # One connection for searches on top of the download limit
+    async with create_async_client(stats, concurrency + 1, retry_methods=SEARCH_RETRY_METHODS) as client:
+        staged = await asyncio.gather(*(predictor(client, *m) for m in missing))
+    return {m[2]: n for m, n in zip(missing, staged)}
 
 
 def main() -> None:
+    parser = argparse.ArgumentParser(description="Search and stage headshot candidates for predictors without one.")
+    parser.add_argument(
+        "--search-rate",
+        type=float,
+        default=SEARCH_RATE,
+        help=f"Serper requests per second (default: {SEARCH_RATE})",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DOWNLOAD_CONCURRENCY,
+        help=f"Candidate downloads in flight overall (default: {DOWNLOAD_CONCURRENCY})",
+    )
+    parser.add_argument(
+        "--per-host",
+        type=int,
+        default=DOWNLOAD_PER_HOST,
+        help=f"Candidate downloads in flight per hostname (default: {DOWNLOAD_PER_HOST})",
+    )
+    parser.add_argument(
+        "--search-ttl-days",
+        type=float,
+        default=SEARCH_CACHE_TTL_DAYS,
+        help=f"Reuse cached Serper results younger than this (default: {SEARCH_CACHE_TTL_DAYS}; 0 = forever)",
+    )
+    parser.add_argument(
+        "--http-cache-max-mb",
+        type=float,
+        default=HTTP_CACHE_MAX_MB,
+        help=f"Evict least-recently-used HTTP cache entries above this size (default: {HTTP_CACHE_MAX_MB})",
+    )
+    parser.add_argument(
+        "--no-search-cache",
+        action="store_true",
+        help="Call Serper for every predictor without reading or writing the search cache",
+    )
+    args = parser.parse_args()
+
     api_key = os.environ.get("SERPER_API_KEY", "").strip()
     if not api_key:
         raise SystemExit("Set SERPER_API_KEY in your environment (get one at https://serper.dev/api-key)")
@@ -159,6 +299,9 @@ def main() -> None:
             continue
         if has_staging_images(STAGING_DIR, s):
             continue
+        if ptype == "Survey":
+            print(f"Skipping survey: {name} ({ptype})")
+            continue
         missing.append((name, ptype, s))
 
     if not missing:
@@ -169,28 +312,33 @@ def main() -> None:
     print(f"Staging dir: {STAGING_DIR}")
     print(f"Fetching up to {NUM_CANDIDATES} candidates per predictor (Serper).\n")
 
-    with httpx.Client(follow_redirects=True, timeout=30) as client:
-        for name, ptype, predictor_slug in missing:
-            if ptype == "Survey":
-                print(f"Skipping survey: {name} ({ptype})")
-                continue
-            query = build_query(name, ptype)
-            print(f"{name} ({ptype}) -> “{query}”")
-
-            time.sleep(random.uniform(REQUEST_DELAY_MIN, REQUEST_DELAY_MAX))
-
-            urls = search_image_urls(query, api_key, client, max_results=NUM_CANDIDATES)
-            if not urls:
-                print("  -> no image results")
-                continue
-            for n, url in enumerate(urls, start=1):
-                dest = STAGING_DIR / f"{predictor_slug}-{n}.jpg"
-                if download_image(client, url, dest):
-                    print(f"  -> {dest.name}")
-                else:
-                    print(f"  -> skip #{n}")
-
-    print(f"\nDone. Staged files in {STAGING_DIR}")
+    cache = HttpCache(HTTP_CACHE_DIR, int(args.http_cache_max_mb * 2**20))
+    search_cache = None if args.no_search_cache else SearchCache(SEARCH_CACHE_PATH, args.search_ttl_days)
+    stats = ClientStats()
+    start = time.perf_counter()
+    staged = asyncio.run(
+        fetch_all(
+            missing,
+            api_key,
+            STAGING_DIR,
+            cache,
+            args.search_rate,
+            args.concurrency,
+            args.per_host,
+            search_cache,
+            stats,
+        )
+    )
+    print(f"\nStaged {sum(staged.values())} candidates for {len(staged)} predictors "
+          f"in {time.perf_counter() - start:.1f}s")
+    print(stats.summary())
+    cache.evict()
+    print(cache.summary())
+    cache.close()
+    if search_cache is not None:
+        print(search_cache.summary())
+        search_cache.close()
+    print(f"Done. Staged files in {STAGING_DIR}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,148 @@
+"""
+Shared headshot pipeline core used by process_headshots.py and
+process_staging_headshots.py: one decode path (ImageContext), cached face
+detectors, profile-driven crop geometry, crop/resize/encode, brightness/color
+normalization, the download layer (streamed, size-capped image fetches through an
+HTTP response cache, one pooled/retrying httpx client factory, a token-bucket rate
+limiter and a TTL cache for search APIs), and sprite atlases of the final avatars
+for the frontend.
+"""
+
+from headshot_processor.atlas import ATLAS_FORMATS, ATLAS_INDEX_FILENAME, AtlasLayout, assign_slots, build_atlases
+from headshot_processor.crop import (
+    AVIF_SUPPORTED,
+    JPEG_QUALITY,
+    OUTPUT_FORMATS,
+    AvatarOutputs,
+    crop_and_resize,
+    crop_image,
+    downscale_progressive,
+    parse_formats,
+    parse_sizes,
+    save_avatar,
+    save_avatar_set,
+    save_jpeg,
+)
+from headshot_processor.dedup import DEDUP_MAX_DISTANCE, dhash, dhash_image, hamming, near_duplicate_keep
+from headshot_processor.detectors import (
+    DETECTOR_BACKENDS,
+    FaceDetector,
+    HaarDetector,
+    SsdDetector,
+    YuNetDetector,
+    create_detector,
+    get_detector,
+)
+from headshot_processor.geometry import (
+    PROFILES,
+    GeometryProfile,
+    center_crop_rect,
+    classify_face_scale,
+    compute_crop_region,
+    compute_crop_regions,
+    face_centrality,
+)
+from headshot_processor.download import (
+    MAX_DOWNLOAD_MB,
+    DownloadedImage,
+    DownloadRejected,
+    ImageSniffer,
+    fetch_image,
+    fetch_image_async,
+    image_from_cache,
+    save_image_response,
+    save_image_response_async,
+)
+from headshot_processor.http_cache import (
+    DEFAULT_HTTP_CACHE_DIR,
+    HTTP_CACHE_MAX_MB,
+    HttpCache,
+    cached_get,
+    cached_get_async,
+)
+from headshot_processor.http_client import (
+    HTTP2_AVAILABLE,
+    SEARCH_RETRY_METHODS,
+    ClientStats,
+    create_async_client,
+    create_client,
+)
+from headshot_processor.image import ImageContext, reduction_for
+from headshot_processor.normalize import (
+    apply_normalize,
+    median_brightness,
+    normalize_image,
+    normalize_lut,
+    thumbnail_brightness,
+)
+from headshot_processor.ratelimit import TokenBucket
+from headshot_processor.search_cache import DEFAULT_SEARCH_CACHE_PATH, SEARCH_CACHE_TTL_DAYS, SearchCache
+
+__all__ = [
+    "ATLAS_FORMATS",
+    "ATLAS_INDEX_FILENAME",
+    "AVIF_SUPPORTED",
+    "DEDUP_MAX_DISTANCE",
+    "DEFAULT_HTTP_CACHE_DIR",
+    "DEFAULT_SEARCH_CACHE_PATH",
+    "DETECTOR_BACKENDS",
+    "HTTP2_AVAILABLE",
+    "HTTP_CACHE_MAX_MB",
+    "JPEG_QUALITY",
+    "MAX_DOWNLOAD_MB",
+    "OUTPUT_FORMATS",
+    "PROFILES",
+    "SEARCH_CACHE_TTL_DAYS",
+    "SEARCH_RETRY_METHODS",
+    "AtlasLayout",
+    "AvatarOutputs",
+    "ClientStats",
+    "DownloadRejected",
+    "DownloadedImage",
+    "FaceDetector",
+    "GeometryProfile",
+    "HaarDetector",
+    "HttpCache",
+    "ImageSniffer",
+    "ImageContext",
+    "SearchCache",
+    "SsdDetector",
+    "TokenBucket",
+    "YuNetDetector",
+    "apply_normalize",
+    "assign_slots",
+    "build_atlases",
+    "cached_get",
+    "cached_get_async",
+    "center_crop_rect",
+    "classify_face_scale",
+    "compute_crop_region",
+    "compute_crop_regions",
+    "create_async_client",
+    "create_client",
+    "create_detector",
+    "crop_and_resize",
+    "crop_image",
+    "dhash",
+    "dhash_image",
+    "downscale_progressive",
+    "face_centrality",
+    "fetch_image",
+    "fetch_image_async",
+    "get_detector",
+    "hamming",
+    "image_from_cache",
+    "median_brightness",
+    "near_duplicate_keep",
+    "normalize_image",
+    "normalize_lut",
+    "parse_formats",
+    "parse_sizes",
+    "reduction_for",
+    "save_avatar",
+    "save_avatar_set",
+    "save_image_response",
+    "save_image_response_async",
+    "save_jpeg",
+    "thumbnail_brightness",
+]
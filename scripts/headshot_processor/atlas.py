@@ -0,0 +1,145 @@
+"""
+Sprite atlases of the final avatars for the frontend: every avatar is resized to one
+small display size and packed into fixed grids, with a JSON index of slug -> atlas
+and rectangle. Slots are stable across runs, so adding, changing or removing an
+avatar only rebuilds the atlas that holds it.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+
+from PIL import Image
+
+ATLAS_INDEX_VERSION = 1
+ATLAS_SPRITE_SIZE = 48
+ATLAS_COLUMNS = 8
+ATLAS_ROWS = 8
+ATLAS_FORMATS = {"webp": ("WEBP", ".webp", {"quality": 85, "method": 6}), "jpeg": ("JPEG", ".jpg", {"quality": 90})}
+ATLAS_INDEX_FILENAME = "headshots-atlas.json"
+
+
+@dataclass(frozen=True)
+class AtlasLayout:
+    """Sprite side (px), grid shape and encoding; the per-atlas capacity is columns × rows."""
+
+    sprite_size: int = ATLAS_SPRITE_SIZE
+    columns: int = ATLAS_COLUMNS
+    rows: int = ATLAS_ROWS
+    format: str = "webp"
+
+    @property
+    def capacity(self) -> int:
+        return self.columns * self.rows
+
+    def slot_rect(self, slot: int) -> tuple[int, int, int, int]:
+        """(x, y, w, h) of a slot within its atlas."""
+        local = slot % self.capacity
+        s = self.sprite_size
+        return (local % self.columns) * s, (local // self.columns) * s, s, s
+
+    def as_dict(self) -> dict:
+        return {"sprite_size": self.sprite_size, "columns": self.columns, "rows": self.rows, "format": self.format}
+
+
+def _file_sha256(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def assign_slots(previous: dict[str, int], slugs: list[str]) -> dict[str, int]:
+    """
+    Global slot per slug (atlas = slot // capacity): slugs keep their previous slot;
+    new ones take the lowest free slots, in sorted order.
+    """
+    wanted = set(slugs)
+    slots = {slug: slot for slug, slot in previous.items() if slug in wanted}
+    taken = set(slots.values())
+    free = (i for i in range(len(slugs) + len(taken) + 1) if i not in taken)
+    for slug in sorted(s for s in slugs if s not in slots):
+        slots[slug] = next(free)
+    return slots
+
+
+def _render_atlas(members: dict[str, Path], slots: dict[str, int], layout: AtlasLayout) -> Image.Image:
+    s = layout.sprite_size
+    used_rows = max(layout.slot_rect(slots[slug])[1] for slug in members) // s + 1
+    atlas = Image.new("RGB", (layout.columns * s, used_rows * s), (255, 255, 255))
+    for slug, path in members.items():
+        x, y, _, _ = layout.slot_rect(slots[slug])
+        with Image.open(path) as im:
+            im.draft("RGB", (s, s))
+            atlas.paste(im.convert("RGB").resize((s, s), resample=Image.LANCZOS, reducing_gap=3), (x, y))
+    return atlas
+
+
+def build_atlases(
+    sources: dict[str, Path],
+    out_dir: Path,
+    layout: AtlasLayout = AtlasLayout(),
+    prefix: str = "headshots",
+) -> tuple[dict, int]:
+    """
+    Pack sources ({slug: avatar path}) into out_dir/{prefix}-{n}.{hash}{ext} and write
+    out_dir/ATLAS_INDEX_FILENAME. An atlas is re-encoded only when its members (slug or
+    file content) or the layout changed, or its file is missing; the content hash in
+    the file name lets the frontend cache atlases forever. Atlases no longer indexed
+    are deleted. Returns (index, number of atlases rebuilt).
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    index_path = out_dir / ATLAS_INDEX_FILENAME
+    try:
+        old = json.loads(index_path.read_text())
+    except (OSError, ValueError):
+        old = {}
+    if old.get("version") != ATLAS_INDEX_VERSION or old.get("layout") != layout.as_dict():
+        old = {}
+    old_sprites = old.get("sprites", {})
+    old_atlases = {a["index"]: a for a in old.get("atlases", [])}
+
+    hashes = {slug: _file_sha256(path) for slug, path in sources.items()}
+    slots = assign_slots({slug: sp["slot"] for slug, sp in old_sprites.items()}, list(sources))
+    members: dict[int, dict[str, Path]] = {}
+    for slug, slot in slots.items():
+        members.setdefault(slot // layout.capacity, {})[slug] = sources[slug]
+
+    _, ext, options = ATLAS_FORMATS[layout.format]
+    atlases, rebuilt = [], 0
+    for n in sorted(members):
+        # Fingerprint of (slot, slug, content) for every member: equal -> the atlas is unchanged
+        key = hashlib.sha256(
+            json.dumps(sorted((slots[slug], slug, hashes[slug]) for slug in members[n])).encode()
+        ).hexdigest()
+        previous = old_atlases.get(n)
+        if previous and previous["members_sha256"] == key and (out_dir / previous["file"]).exists():
+            atlases.append(previous)
+            continue
+        image = _render_atlas(members[n], slots, layout)
+        tmp = out_dir / f".{prefix}-{n}.tmp{ext}"
+        image.save(str(tmp), ATLAS_FORMATS[layout.format][0], **options)
+        name = f"{prefix}-{n}.{_file_sha256(tmp)[:10]}{ext}"
+        os.replace(tmp, out_dir / name)
+        atlases.append({"index": n, "file": name, "width": image.width, "height": image.height, "members_sha256": key})
+        rebuilt += 1
+
+    files = {a["index"]: a["file"] for a in atlases}
+    sprites = {}
+    for slug in sorted(slots):
+        x, y, w, h = layout.slot_rect(slots[slug])
+        n = slots[slug] // layout.capacity
+        sprites[slug] = {"file": files[n], "x": x, "y": y, "w": w, "h": h,
+                         "atlas": n, "slot": slots[slug], "sha256": hashes[slug]}
+    index = {"version": ATLAS_INDEX_VERSION, "layout": layout.as_dict(), "atlases": atlases, "sprites": sprites}
+    tmp = index_path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(index, indent=1))
+    tmp.replace(index_path)
+
+    keep = {a["file"] for a in atlases}
+    for _, old_ext, _ in ATLAS_FORMATS.values():
+        for path in out_dir.glob(f"{prefix}-*{old_ext}"):
+            if path.name not in keep:
+                path.unlink()
+    return index, rebuilt
@@ -0,0 +1,131 @@
+"""Crop, resize and encode avatars from an already-decoded image."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+
+import cv2
+import numpy as np
+from PIL import Image, features
+
+JPEG_QUALITY = 92
+WEBP_QUALITY = 85
+AVIF_QUALITY = 60
+# AVIF needs a Pillow built with libavif (recent wheels are); otherwise it is skipped
+AVIF_SUPPORTED = features.check("avif")
+# Output format name -> file extension
+OUTPUT_FORMATS = {"jpeg": ".jpg", "webp": ".webp", "avif": ".avif"}
+
+
+@dataclass(frozen=True)
+class AvatarOutputs:
+    """
+    Extra avatar files written next to the main {id}.jpg: every size in sizes (plus
+    double-size variants with retina) in every format, named {id}-{px}{ext}.
+    The default (no sizes) writes nothing extra.
+    """
+
+    sizes: tuple[int, ...] = ()
+    retina: bool = False
+    formats: tuple[str, ...] = ("jpeg",)
+
+    def pixel_sizes(self) -> tuple[int, ...]:
+        """Distinct output sides in px, largest first (a 2x variant can coincide with a size)."""
+        sides = set(self.sizes)
+        if self.retina:
+            sides.update(2 * s for s in self.sizes)
+        return tuple(sorted(sides, reverse=True))
+
+    def as_dict(self) -> dict:
+        """JSON-ready (lists, not tuples) so it compares equal after a manifest round trip."""
+        return {"sizes": list(self.sizes), "retina": self.retina, "formats": list(self.formats)}
+
+
+def parse_sizes(text: str) -> tuple[int, ...]:
+    """--sizes argument: comma-separated positive px sides ("64,96,150,300")."""
+    sizes = tuple(int(part) for part in text.split(",") if part.strip())
+    if any(size <= 0 for size in sizes):
+        raise ValueError(text)
+    return sizes
+
+
+def parse_formats(text: str) -> tuple[str, ...]:
+    """--formats argument: comma-separated OUTPUT_FORMATS names ("jpeg,webp,avif")."""
+    formats = tuple(part.strip().lower() for part in text.split(",") if part.strip())
+    if not formats or any(fmt not in OUTPUT_FORMATS for fmt in formats):
+        raise ValueError(text)
+    return formats
+
+
+def crop_image(img: np.ndarray, crop_rect: tuple[int, int, int, int]) -> Image.Image | None:
+    """Crop a BGR image to crop_rect (x1, y1, x2, y2) as an RGB PIL image, or None for an empty crop."""
+    x1, y1, x2, y2 = crop_rect
+    crop = img[y1:y2, x1:x2]
+    if crop.size == 0:
+        return None
+    return Image.fromarray(cv2.cvtColor(crop, cv2.COLOR_BGR2RGB))
+
+
+def crop_and_resize(img: np.ndarray, crop_rect: tuple[int, int, int, int], size: int) -> Image.Image | None:
+    """
+    Crop a BGR image to crop_rect (x1, y1, x2, y2) and resize to size×size with
+    antialiasing (Pillow LANCZOS). Returns an RGB PIL image, or None for an empty crop.
+    """
+    pil_crop = crop_image(img, crop_rect)
+    if pil_crop is None:
+        return None
+    return pil_crop.resize((size, size), resample=Image.LANCZOS, reducing_gap=3)
+
+
+def downscale_progressive(crop: Image.Image, sizes: tuple[int, ...]) -> dict[int, Image.Image]:
+    """
+    {size: size×size image} for every size, largest first: each one is resized from the
+    smallest of crop and the already rendered images at least twice its size, so a large
+    crop is resampled once instead of once per size (and an upscaled size is never a source).
+    """
+    rendered: dict[int, Image.Image] = {}
+    for size in sorted(set(sizes), reverse=True):
+        bases = [crop] + [im for side, im in rendered.items() if side >= 2 * size]
+        base = min(bases, key=lambda im: im.width)
+        rendered[size] = base.resize((size, size), resample=Image.LANCZOS, reducing_gap=3)
+    return rendered
+
+
+def save_jpeg(img: Image.Image, out_path: Path, quality: int = JPEG_QUALITY) -> None:
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    img.save(str(out_path), "JPEG", quality=quality)
+
+
+def save_avatar(img: Image.Image, out_path: Path, fmt: str) -> None:
+    """Encode img as one of OUTPUT_FORMATS with that format's quality setting."""
+    if fmt == "jpeg":
+        save_jpeg(img, out_path)
+        return
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    if fmt == "webp":
+        img.save(str(out_path), "WEBP", quality=WEBP_QUALITY, method=6)
+    else:
+        img.save(str(out_path), "AVIF", quality=AVIF_QUALITY)
+
+
+def save_avatar_set(
+    avatars: dict[int, Image.Image],
+    out_dir: Path,
+    stem: str,
+    outputs: AvatarOutputs,
+) -> list[Path]:
+    """
+    Write outputs.pixel_sizes() x outputs.formats from avatars (see downscale_progressive)
+    as out_dir/{stem}-{px}{ext}. AVIF is skipped when Pillow cannot encode it. Returns
+    the paths written.
+    """
+    written = []
+    for side in outputs.pixel_sizes():
+        for fmt in outputs.formats:
+            if fmt == "avif" and not AVIF_SUPPORTED:
+                continue
+            out_path = out_dir / f"{stem}-{side}{OUTPUT_FORMATS[fmt]}"
+            save_avatar(avatars[side], out_path, fmt)
+            written.append(out_path)
+    return written
@@ -0,0 +1,61 @@
+"""
+Near-duplicate detection for staged candidates: a 64-bit difference hash (dHash) per
+image and a greedy clustering that keeps the highest-resolution copy of each cluster.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+# Hamming distance (of 64 bits) at or below which two dHashes count as the same picture;
+# recompression / rescaling of one photo stays within ~4, different photos are >10 apart
+DEDUP_MAX_DISTANCE = 6
+# Decode JPEGs at a reduced scale for hashing; the hash only looks at 9x8 pixels
+_DRAFT_SIZE = (64, 64)
+
+
+def dhash(path: Path) -> tuple[int, int] | None:
+    """(64-bit dHash, source pixel count) of an image, or None if it cannot be read."""
+    try:
+        with Image.open(path) as im:
+            pixels = im.width * im.height
+            im.draft("L", _DRAFT_SIZE)
+            return dhash_image(im), pixels
+    except (OSError, ValueError):
+        return None
+
+
+def dhash_image(im: Image.Image) -> int:
+    """64-bit dHash of an already opened (or cropped) image."""
+    arr = np.asarray(im.convert("L").resize((9, 8), Image.LANCZOS), dtype=np.int16)
+    bits = (arr[:, 1:] > arr[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming(a: int, b: int) -> int:
+    """Number of differing bits between two dHashes."""
+    return (a ^ b).bit_count()
+
+
+def near_duplicate_keep(
+    hashes: np.ndarray,
+    pixels: np.ndarray,
+    max_distance: int = DEDUP_MAX_DISTANCE,
+) -> np.ndarray:
+    """
+    Boolean keep-mask over images given their dHashes (uint64) and pixel counts. Visits
+    images from highest to lowest resolution (stable, so ties keep the earlier one); an
+    image is dropped when it is within max_distance of one already kept.
+    """
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    keep = np.zeros(len(hashes), dtype=bool)
+    kept_hashes = np.empty(0, dtype=np.uint64)
+    for i in np.argsort(-np.asarray(pixels, dtype=np.int64), kind="stable"):
+        if len(kept_hashes) and np.bitwise_count(kept_hashes ^ hashes[i]).min() <= max_distance:
+            continue
+        keep[i] = True
+        kept_hashes = np.append(kept_hashes, hashes[i])
+    return keep
@@ -0,0 +1,264 @@
+"""
+Face detector backends.
+
+Every backend returns faces as (x, y, w, h) in full-resolution pixel coordinates,
+sorted by area descending, and runs CPU-only:
+
+- haar  – OpenCV Haar cascade (the original detector); optional downscaled detection.
+- yunet – OpenCV FaceDetectorYN with a local YuNet .onnx model.
+- ssd   – OpenCV DNN ResNet-10 SSD (Caffe .prototxt + .caffemodel); detect_batch runs
+          a whole list of images through the network in one blobFromImages call.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+Rect = tuple[int, int, int, int]
+
+CASCADE_PATH = cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
+DETECTOR_BACKENDS = ("haar", "yunet", "ssd")
+# YuNet/SSD: drop detections below this confidence
+DNN_SCORE_THRESHOLD = 0.6
+# YuNet runs on a copy capped at this longest side (it is trained on moderate input sizes)
+YUNET_MAX_SIDE = 640
+# SSD input size and BGR mean of the ResNet-10 face model
+SSD_INPUT_SIZE = 300
+SSD_MEAN = (104.0, 177.0, 123.0)
+
+
+def _by_area(rects: list[Rect]) -> list[Rect]:
+    return sorted(rects, key=lambda r: r[2] * r[3], reverse=True)
+
+
+class FaceDetector(ABC):
+    """Base class: detect() one image, detect_batch() many (loops unless a backend can batch)."""
+
+    name = "base"
+
+    @abstractmethod
+    def detect(self, img: np.ndarray, gray: np.ndarray | None = None) -> list[Rect]:
+        """Faces in a BGR image; pass gray when the caller already has it."""
+
+    def detect_batch(self, images: list[np.ndarray]) -> list[list[Rect]]:
+        return [self.detect(img) for img in images]
+
+    def config(self) -> dict:
+        """Settings that change results (used in cache fingerprints)."""
+        return {"backend": self.name}
+
+    def fingerprint(self) -> str:
+        """Hash of config() plus the model file bytes."""
+        h = hashlib.sha256(json.dumps(self.config(), sort_keys=True).encode("utf-8"))
+        for path in self._model_files():
+            h.update(Path(path).read_bytes())
+        return h.hexdigest()[:16]
+
+    def _model_files(self) -> list[str]:
+        return []
+
+
+class HaarDetector(FaceDetector):
+    """
+    Haar cascade. When the longest side exceeds max_side (0 = off), detection runs on a
+    downscaled copy and rects are mapped back; with refine, each rect is re-detected in
+    a full-resolution ROI.
+    """
+
+    name = "haar"
+
+    def __init__(self, cascade_path: str = CASCADE_PATH, max_side: int = 0, refine: bool = False):
+        self.cascade_path = cascade_path
+        self.cascade = cv2.CascadeClassifier(cascade_path)
+        self.max_side = max_side
+        self.refine = refine
+
+    def config(self) -> dict:
+        return {"backend": self.name, "max_side": self.max_side, "refine": self.refine}
+
+    def _model_files(self) -> list[str]:
+        return [self.cascade_path]
+
+    def _detect_rects(self, gray: np.ndarray, min_side: int = 30, max_side: int | None = None) -> list[Rect]:
+        kwargs = {"maxSize": (max_side, max_side)} if max_side else {}
+        faces = self.cascade.detectMultiScale(
+            gray,
+            scaleFactor=1.1,
+            minNeighbors=5,
+            minSize=(min_side, min_side),
+            flags=cv2.CASCADE_SCALE_IMAGE,
+            **kwargs,
+        )
+        return [(int(x), int(y), int(w), int(h)) for (x, y, w, h) in faces]
+
+    def _refine_rect(self, gray: np.ndarray, rect: Rect) -> Rect:
+        """Re-detect one face at full resolution inside a padded ROI around rect; keep rect if nothing is found."""
+        x, y, w, h = rect
+        pad = w // 4
+        x1, y1 = max(0, x - pad), max(0, y - pad)
+        x2, y2 = min(gray.shape[1], x + w + pad), min(gray.shape[0], y + h + pad)
+        found = self._detect_rects(gray[y1:y2, x1:x2], max(24, int(w * 0.7)), int(w * 1.4))
+        if not found:
+            return rect
+        fx, fy, fw, fh = max(found, key=lambda r: r[2] * r[3])
+        return (fx + x1, fy + y1, fw, fh)
+
+    def detect(self, img: np.ndarray, gray: np.ndarray | None = None) -> list[Rect]:
+        if gray is None:
+            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        h, w = gray.shape[:2]
+        if not self.max_side or max(h, w) <= self.max_side:
+            return _by_area(self._detect_rects(gray))
+        scale = self.max_side / max(h, w)
+        small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        # 24px is the cascade's native window; keep minSize proportional above that
+        rects = [
+            (int(round(x / scale)), int(round(y / scale)), int(round(rw / scale)), int(round(rh / scale)))
+            for (x, y, rw, rh) in self._detect_rects(small, max(24, round(30 * scale)))
+        ]
+        if self.refine:
+            rects = [self._refine_rect(gray, r) for r in rects]
+        return _by_area(rects)
+
+
+class YuNetDetector(FaceDetector):
+    """OpenCV FaceDetectorYN (YuNet ONNX model), CPU target."""
+
+    name = "yunet"
+
+    def __init__(self, model_path: str, score_threshold: float = DNN_SCORE_THRESHOLD, max_side: int = YUNET_MAX_SIDE):
+        self.model_path = model_path
+        self.score_threshold = score_threshold
+        self.max_side = max_side
+        self._net = cv2.FaceDetectorYN.create(
+            model_path,
+            "",
+            (320, 320),
+            score_threshold,
+            0.3,
+            5000,
+            cv2.dnn.DNN_BACKEND_OPENCV,
+            cv2.dnn.DNN_TARGET_CPU,
+        )
+
+    def config(self) -> dict:
+        return {"backend": self.name, "score": self.score_threshold, "max_side": self.max_side}
+
+    def _model_files(self) -> list[str]:
+        return [self.model_path]
+
+    def detect(self, img: np.ndarray, gray: np.ndarray | None = None) -> list[Rect]:
+        h, w = img.shape[:2]
+        scale = min(1.0, self.max_side / max(h, w)) if self.max_side else 1.0
+        if scale < 1.0:
+            img = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        self._net.setInputSize((img.shape[1], img.shape[0]))
+        _, faces = self._net.detect(img)
+        if faces is None:
+            return []
+        rects = []
+        for row in faces:
+            x, y, fw, fh = (float(v) / scale for v in row[:4])
+            x1, y1 = max(0, int(round(x))), max(0, int(round(y)))
+            x2, y2 = min(w, int(round(x + fw))), min(h, int(round(y + fh)))
+            if x2 > x1 and y2 > y1:
+                rects.append((x1, y1, x2 - x1, y2 - y1))
+        return _by_area(rects)
+
+
+class SsdDetector(FaceDetector):
+    """OpenCV DNN ResNet-10 SSD face model (res10_300x300_ssd), CPU target, batchable."""
+
+    name = "ssd"
+
+    def __init__(self, model_path: str, config_path: str, score_threshold: float = DNN_SCORE_THRESHOLD):
+        self.model_path = model_path
+        self.config_path = config_path
+        self.score_threshold = score_threshold
+        self._net = cv2.dnn.readNetFromCaffe(config_path, model_path)
+        self._net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        self._net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+
+    def config(self) -> dict:
+        return {"backend": self.name, "score": self.score_threshold}
+
+    def _model_files(self) -> list[str]:
+        return [self.model_path, self.config_path]
+
+    def detect(self, img: np.ndarray, gray: np.ndarray | None = None) -> list[Rect]:
+        return self.detect_batch([img])[0]
+
+    def detect_batch(self, images: list[np.ndarray]) -> list[list[Rect]]:
+        if not images:
+            return []
+        size = (SSD_INPUT_SIZE, SSD_INPUT_SIZE)
+        blob = cv2.dnn.blobFromImages(images, 1.0, size, SSD_MEAN, swapRB=False, crop=False)
+        self._net.setInput(blob)
+        # (1, 1, N, 7): [image_id, label, confidence, x1, y1, x2, y2] with normalized coords
+        detections = self._net.forward().reshape(-1, 7)
+        out: list[list[Rect]] = [[] for _ in images]
+        for image_id, _, score, x1, y1, x2, y2 in detections:
+            if score < self.score_threshold or not (0 <= int(image_id) < len(images)):
+                continue
+            h, w = images[int(image_id)].shape[:2]
+            px1, py1 = max(0, int(x1 * w)), max(0, int(y1 * h))
+            px2, py2 = min(w, int(x2 * w)), min(h, int(y2 * h))
+            if px2 > px1 and py2 > py1:
+                out[int(image_id)].append((px1, py1, px2 - px1, py2 - py1))
+        return [_by_area(rects) for rects in out]
+
+
+def _load_model(backend: str, paths: list[str], load) -> FaceDetector:
+    """load() once every path is a file; cv2.error from a corrupt model becomes ValueError."""
+    for path in paths:
+        if not Path(path).is_file():
+            raise ValueError(f"--detector {backend}: model file not found: {path}")
+    try:
+        return load()
+    except cv2.error as e:
+        raise ValueError(f"--detector {backend}: cannot load {', '.join(paths)}: {getattr(e, 'err', None) or e}") from e
+
+
+def create_detector(
+    backend: str = "haar",
+    model: str | None = None,
+    model_config: str | None = None,
+    max_side: int = 0,
+    refine: bool = False,
+) -> FaceDetector:
+    """
+    Build a detector by backend name. yunet needs model (.onnx); ssd needs model
+    (.caffemodel) and model_config (.prototxt). max_side/refine apply to haar.
+    Raises ValueError for an unknown backend, or model files that are missing, do not
+    exist or that OpenCV cannot load.
+    """
+    if backend == "haar":
+        return HaarDetector(max_side=max_side, refine=refine)
+    if backend == "yunet":
+        if not model:
+            raise ValueError("--detector yunet needs --detector-model path/to/face_detection_yunet.onnx")
+        return _load_model(backend, [model], lambda: YuNetDetector(model))
+    if backend == "ssd":
+        if not model or not model_config:
+            raise ValueError("--detector ssd needs --detector-model (.caffemodel) and --detector-config (.prototxt)")
+        return _load_model(backend, [model, model_config], lambda: SsdDetector(model, model_config))
+    raise ValueError(f"Unknown detector backend: {backend} (choose from {', '.join(DETECTOR_BACKENDS)})")
+
+
+@lru_cache(maxsize=None)
+def get_detector(
+    backend: str = "haar",
+    model: str | None = None,
+    model_config: str | None = None,
+    max_side: int = 0,
+    refine: bool = False,
+) -> FaceDetector:
+    """create_detector, cached per process: each configuration loads its cascade/model once."""
+    return create_detector(backend, model, model_config, max_side, refine)
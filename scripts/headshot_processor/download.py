@@ -0,0 +1,275 @@
+"""
+Streamed image downloads: responses are written to a temp file in chunks, capped at a
+maximum size, and dropped as soon as the first bytes or the image header show they are
+not a usable image. ImageSniffer and the temp-file sink are sans-IO, so the sync and
+async fetchers share them.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+
+import httpx
+from PIL import Image, ImageFile
+
+from headshot_processor.http_cache import HttpCache
+
+MAX_DOWNLOAD_MB = 20
+# Shorter side below MIN_IMAGE_SIDE is useless for a 300px avatar; either side above
+# MAX_IMAGE_SIDE is a poster/panorama (or a decompression bomb)
+MIN_IMAGE_SIDE = 64
+MAX_IMAGE_SIDE = 12000
+CHUNK_SIZE = 64 * 1024
+# Give up looking for the dimensions after this many bytes (format is already known)
+HEADER_MAX_BYTES = 512 * 1024
+
+# Magic numbers of the formats we accept: (offset, bytes) -> PIL format name
+IMAGE_MAGIC = (
+    ((0, b"\xff\xd8\xff"), "JPEG"),
+    ((0, b"\x89PNG\r\n\x1a\n"), "PNG"),
+    ((0, b"GIF87a"), "GIF"),
+    ((0, b"GIF89a"), "GIF"),
+    ((8, b"WEBP"), "WEBP"),
+)
+MAGIC_BYTES = 12
+FORMAT_EXTENSIONS = {"JPEG": ".jpg", "PNG": ".png", "GIF": ".gif", "WEBP": ".webp"}
+
+
+class DownloadRejected(Exception):
+    """Response dropped before or while streaming (not an image, too large, bad dimensions)."""
+
+
+@dataclass
+class DownloadedImage:
+    path: Path
+    format: str
+    width: int | None
+    height: int | None
+    size: int
+    from_cache: bool = False
+
+    @property
+    def extension(self) -> str:
+        return FORMAT_EXTENSIONS.get(self.format, ".jpg")
+
+
+def sniff_format(head: bytes) -> str | None:
+    """PIL format name for the first MAGIC_BYTES of a file, or None if not an accepted image."""
+    for (offset, magic), fmt in IMAGE_MAGIC:
+        if head[offset:offset + len(magic)] == magic:
+            if fmt == "WEBP" and head[:4] != b"RIFF":
+                continue
+            return fmt
+    return None
+
+
+class ImageSniffer:
+    """
+    Feed the body as it arrives: rejects on the magic number of the first bytes, then on
+    the dimensions once the header has been parsed (PIL ImageFile.Parser). Raises
+    DownloadRejected; format / width / height are set as soon as they are known.
+    """
+
+    def __init__(self, min_side: int = MIN_IMAGE_SIDE, max_side: int = MAX_IMAGE_SIDE):
+        self.min_side = min_side
+        self.max_side = max_side
+        self.format: str | None = None
+        self.width: int | None = None
+        self.height: int | None = None
+        self._head = b""
+        self._parser: ImageFile.Parser | None = ImageFile.Parser()
+        self._fed = 0
+
+    def feed(self, chunk: bytes) -> None:
+        if self.format is None:
+            self._head = (self._head + chunk)[:MAGIC_BYTES]
+            if len(self._head) == MAGIC_BYTES:
+                self.format = sniff_format(self._head)
+                if self.format is None:
+                    raise DownloadRejected(f"not an image (starts with {self._head[:8]!r})")
+        self._feed_parser(chunk)
+
+    def _feed_parser(self, chunk: bytes) -> None:
+        if self._parser is None:
+            return
+        try:
+            self._parser.feed(chunk)
+        except Exception as e:  # DecompressionBombError, corrupt header
+            raise DownloadRejected(f"bad image header: {e}") from e
+        self._fed += len(chunk)
+        if self._parser.image is not None:
+            self.width, self.height = self._parser.image.size
+            self._parser = None
+            self._check_size()
+        elif self._fed > HEADER_MAX_BYTES:
+            self._parser = None
+
+    def _check_size(self) -> None:
+        if min(self.width, self.height) < self.min_side:
+            raise DownloadRejected(f"too small ({self.width}x{self.height})")
+        if max(self.width, self.height) > self.max_side:
+            raise DownloadRejected(f"too large ({self.width}x{self.height})")
+
+    def finish(self) -> None:
+        """End of body: reject what never showed an accepted magic number."""
+        if self.format is None:
+            self.format = sniff_format(self._head)
+            if self.format is None:
+                raise DownloadRejected("not an image")
+
+
+class _TempFileSink:
+    """Chunks -> temp file next to dest, with byte cap, sniffing and SHA-256; commit() renames."""
+
+    def __init__(self, dest: Path, max_bytes: int, sniffer: ImageSniffer):
+        self.dest = dest
+        self.max_bytes = max_bytes
+        self.sniffer = sniffer
+        self.size = 0
+        self.sha256 = hashlib.sha256()
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        fd, self.tmp = tempfile.mkstemp(dir=dest.parent, prefix=f".{dest.name}.", suffix=".part")
+        self.file = os.fdopen(fd, "wb")
+
+    def write(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise DownloadRejected(f"larger than {self.max_bytes / 2**20:.0f} MB")
+        self.sniffer.feed(chunk)
+        self.sha256.update(chunk)
+        self.file.write(chunk)
+
+    def commit(self) -> DownloadedImage:
+        self.sniffer.finish()
+        self.file.close()
+        os.replace(self.tmp, self.dest)
+        s = self.sniffer
+        return DownloadedImage(self.dest, s.format, s.width, s.height, self.size)
+
+    def discard(self) -> None:
+        self.file.close()
+        try:
+            os.remove(self.tmp)
+        except FileNotFoundError:
+            pass
+
+
+def _open_sink(response: httpx.Response, dest: Path, max_bytes: int, min_side: int, max_side: int) -> _TempFileSink:
+    response.raise_for_status()
+    length = response.headers.get("content-length")
+    if length and length.isdigit() and int(length) > max_bytes:
+        raise DownloadRejected(f"Content-Length {int(length) / 2**20:.1f} MB over the limit")
+    return _TempFileSink(dest, max_bytes, ImageSniffer(min_side, max_side))
+
+
+def image_from_cache(cache: HttpCache, url: str, dest: Path) -> DownloadedImage | None:
+    """Answer a 304 by copying the cached body to dest (never read into memory); None if not cached."""
+    cached = cache.hit(url)
+    if cached is None:
+        return None
+    with open(cached[0], "rb") as f:
+        if sniff_format(f.read(MAGIC_BYTES)) is None:
+            return None
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(cached[0], dest)
+    with Image.open(dest) as im:
+        width, height, fmt = im.width, im.height, im.format
+    return DownloadedImage(dest, fmt, width, height, dest.stat().st_size, from_cache=True)
+
+
+def save_image_response(
+    response: httpx.Response,
+    url: str,
+    dest: Path,
+    cache: HttpCache | None = None,
+    max_bytes: int = MAX_DOWNLOAD_MB * 2**20,
+    min_side: int = MIN_IMAGE_SIDE,
+    max_side: int = MAX_IMAGE_SIDE,
+) -> DownloadedImage:
+    """
+    Write an open streaming response (client.stream) for url to dest: a 304 is answered
+    from cache, a 200 is streamed in chunks and stored in cache. Raises DownloadRejected
+    (dest untouched) as soon as the body is known to be unusable; the rest is never read.
+    """
+    if response.status_code == 304 and cache is not None:
+        image = image_from_cache(cache, url, dest)
+        if image is not None:
+            return image
+    sink = _open_sink(response, dest, max_bytes, min_side, max_side)
+    try:
+        for chunk in response.iter_bytes(CHUNK_SIZE):
+            sink.write(chunk)
+        image = sink.commit()
+    except BaseException:
+        sink.discard()
+        raise
+    if cache is not None:
+        cache.put_file(url, response.headers, dest, sink.sha256.hexdigest())
+    return image
+
+
+async def save_image_response_async(
+    response: httpx.Response,
+    url: str,
+    dest: Path,
+    cache: HttpCache | None = None,
+    max_bytes: int = MAX_DOWNLOAD_MB * 2**20,
+    min_side: int = MIN_IMAGE_SIDE,
+    max_side: int = MAX_IMAGE_SIDE,
+) -> DownloadedImage:
+    """Async save_image_response."""
+    if response.status_code == 304 and cache is not None:
+        image = image_from_cache(cache, url, dest)
+        if image is not None:
+            return image
+    sink = _open_sink(response, dest, max_bytes, min_side, max_side)
+    try:
+        async for chunk in response.aiter_bytes(CHUNK_SIZE):
+            sink.write(chunk)
+        image = sink.commit()
+    except BaseException:
+        sink.discard()
+        raise
+    if cache is not None:
+        cache.put_file(url, response.headers, dest, sink.sha256.hexdigest())
+    return image
+
+
+def fetch_image(
+    client: httpx.Client,
+    url: str,
+    dest: Path,
+    cache: HttpCache | None = None,
+    max_bytes: int = MAX_DOWNLOAD_MB * 2**20,
+    min_side: int = MIN_IMAGE_SIDE,
+    max_side: int = MAX_IMAGE_SIDE,
+    **kwargs,
+) -> DownloadedImage:
+    """
+    Streamed (and, when cached, conditional) GET of an image to dest. Raises
+    DownloadRejected or httpx errors; dest is only written on success.
+    """
+    headers = cache.request_headers(url) if cache is not None else {}
+    with client.stream("GET", url, headers=headers, **kwargs) as r:
+        return save_image_response(r, url, dest, cache, max_bytes, min_side, max_side)
+
+
+async def fetch_image_async(
+    client: httpx.AsyncClient,
+    url: str,
+    dest: Path,
+    cache: HttpCache | None = None,
+    max_bytes: int = MAX_DOWNLOAD_MB * 2**20,
+    min_side: int = MIN_IMAGE_SIDE,
+    max_side: int = MAX_IMAGE_SIDE,
+    **kwargs,
+) -> DownloadedImage:
+    """Async fetch_image."""
+    headers = cache.request_headers(url) if cache is not None else {}
+    async with client.stream("GET", url, headers=headers, **kwargs) as r:
+        return await save_image_response_async(r, url, dest, cache, max_bytes, min_side, max_side)
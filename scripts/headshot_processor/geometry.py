@@ -0,0 +1,114 @@
+"""
+Crop geometry: square head+bust crops around a detected face, parameterized by a
+GeometryProfile so each front-end keeps its own framing from one implementation.
+"""
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+
+import numpy as np
+
+Rect = tuple[int, int, int, int]
+
+
+@dataclass(frozen=True)
+class GeometryProfile:
+    """
+    Framing for one kind of avatar. Crop side = face height * crop_face_scale (at least
+    target_size // 2); face_offset_up shifts the crop center up for headroom. Face height
+    as a fraction of the crop side outside [ideal_face_frac_min, ideal_face_frac_max]
+    is flagged too_far / too_close.
+    """
+
+    name: str
+    crop_face_scale: float
+    face_offset_up: float
+    target_size: int = 300
+    ideal_face_frac_min: float = 0.22
+    ideal_face_frac_max: float = 0.45
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+PROFILES = {
+    # process_headshots.py: curated source photos, tighter framing
+    "headshots": GeometryProfile("headshots", crop_face_scale=2.6, face_offset_up=0.35),
+    # process_staging_headshots.py: search results; larger crop and more headroom because
+    # the detector often misses the forehead
+    "staging": GeometryProfile("staging", crop_face_scale=2.8, face_offset_up=0.55),
+}
+
+
+def compute_crop_regions(img_shape: tuple[int, ...], faces: np.ndarray, profile: GeometryProfile) -> np.ndarray:
+    """
+    Vectorized compute_crop_region: faces is an (N, 4) array of (x, y, w, h); returns
+    an (N, 4) int array of square (x1, y1, x2, y2) crops clamped to the image.
+    """
+    h_img, w_img = img_shape[:2]
+    faces = np.asarray(faces, dtype=np.float64).reshape(-1, 4)
+    fx, fy, fw, fh = faces.T
+    fcx = fx + fw / 2
+    fcy = fy + fh / 2
+    side = np.maximum(np.trunc(fh * profile.crop_face_scale), profile.target_size // 2).astype(np.int64)
+    # Center vertically: face in upper part (head), rest bust
+    cy = fcy - side * (profile.face_offset_up - 0.5)
+    x1 = np.trunc(fcx - side / 2).astype(np.int64)
+    y1 = np.trunc(cy - side / 2).astype(np.int64)
+    # Clamp to image
+    x1 = np.maximum(0, np.minimum(x1, w_img - side))
+    y1 = np.maximum(0, np.minimum(y1, h_img - side))
+    x2 = np.minimum(w_img, x1 + side)
+    y2 = np.minimum(h_img, y1 + side)
+    # Ensure we have a square (trim the longer dimension symmetrically)
+    w_crop = x2 - x1
+    h_crop = y2 - y1
+    excess_w = np.maximum(w_crop - h_crop, 0)
+    excess_h = np.maximum(h_crop - w_crop, 0)
+    x1 = x1 + excess_w // 2
+    x2 = x2 - (excess_w - excess_w // 2)
+    y1 = y1 + excess_h // 2
+    y2 = y2 - (excess_h - excess_h // 2)
+    return np.stack([x1, y1, x2, y2], axis=1)
+
+
+def compute_crop_region(img_shape: tuple[int, ...], face: Rect, profile: GeometryProfile) -> Rect:
+    """Compute (x1, y1, x2, y2) square crop for head+bust from face (x, y, w, h)."""
+    x1, y1, x2, y2 = compute_crop_regions(img_shape, np.array([face]), profile)[0]
+    return (int(x1), int(y1), int(x2), int(y2))
+
+
+def center_crop_rect(img_shape: tuple[int, ...]) -> Rect:
+    """Square center crop (x1, y1, x2, y2) for image with no face."""
+    h_img, w_img = img_shape[:2]
+    side = min(h_img, w_img)
+    x1 = (w_img - side) // 2
+    y1 = (h_img - side) // 2
+    return (x1, y1, x1 + side, y1 + side)
+
+
+def classify_face_scale(face_height: int, crop_side: int, profile: GeometryProfile) -> tuple[float, str]:
+    """(face_frac, status) where status is ok / too_far / too_close."""
+    face_frac = face_height / crop_side if crop_side else 0
+    if face_frac < profile.ideal_face_frac_min:
+        return face_frac, "too_far"
+    if face_frac > profile.ideal_face_frac_max:
+        return face_frac, "too_close"
+    return face_frac, "ok"
+
+
+def face_centrality(face: Rect, img_shape: tuple[int, ...]) -> float:
+    """
+    Normalized distance from face center to image center (0 = centered, 1 = corner).
+    Lower is better for a portrait.
+    """
+    h_img, w_img = img_shape[:2]
+    fx, fy, fw, fh = face
+    fcx = fx + fw / 2
+    fcy = fy + fh / 2
+    img_cx = w_img / 2
+    img_cy = h_img / 2
+    dist = ((fcx - img_cx) ** 2 + (fcy - img_cy) ** 2) ** 0.5
+    diag = (w_img**2 + h_img**2) ** 0.5
+    return dist / diag if diag > 0 else 0.0
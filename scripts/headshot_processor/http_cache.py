@@ -0,0 +1,230 @@
+"""
+On-disk HTTP response cache shared by the download paths: an SQLite index of
+validators (ETag / Last-Modified) per URL plus a content-addressed body store.
+Reruns send If-None-Match / If-Modified-Since and a 304 is answered from the store.
+The store is bounded: evict() drops least-recently-used entries above a size limit.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+# scripts/.http_cache, shared by process_headshots.py and the fetch_* scripts
+DEFAULT_HTTP_CACHE_DIR = Path(__file__).resolve().parent.parent / ".http_cache"
+# Body store size above which evict() drops least-recently-used entries
+HTTP_CACHE_MAX_MB = 512
+
+
+class HttpCache:
+    """
+    Validators and bodies of successful GETs, keyed by URL. Use request_headers(url)
+    for the conditional headers and resolve(url, response) on the result: a 304 comes
+    back as the stored 200 response, a fresh 200 with a validator is stored. Bodies
+    are stored once per content hash and deleted when no URL refers to them any more.
+    evict() trims least-recently-used URLs until the bodies fit in max_bytes. Safe to
+    open from several processes at once (WAL, autocommit); counters are per instance.
+    """
+
+    def __init__(self, directory: Path = DEFAULT_HTTP_CACHE_DIR, max_bytes: int = HTTP_CACHE_MAX_MB * 2**20):
+        self.directory = directory
+        self.objects = directory / "objects"
+        self.objects.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.bytes_downloaded = 0
+        self.bytes_saved = 0
+        self._db = sqlite3.connect(str(directory / "index.sqlite"), timeout=30, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                content_type TEXT,
+                sha256 TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                fetched_at REAL NOT NULL
+            )"""
+        )
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(responses)")}
+        if "last_used" not in columns:
+            # Indexes created before eviction: entries count as last used when fetched
+            self._db.execute("ALTER TABLE responses ADD COLUMN last_used REAL")
+            self._db.execute("UPDATE responses SET last_used = fetched_at")
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_sha256 ON responses (sha256)")
+
+    def _object_path(self, sha256: str) -> Path:
+        return self.objects / sha256[:2] / sha256
+
+    def _entry(self, url: str) -> tuple | None:
+        """(etag, last_modified, content_type, sha256, size) if the body is still in the store."""
+        row = self._db.execute(
+            "SELECT etag, last_modified, content_type, sha256, size FROM responses WHERE url = ?", (url,)
+        ).fetchone()
+        if row is None or not self._object_path(row[3]).exists():
+            return None
+        return row
+
+    def request_headers(self, url: str) -> dict[str, str]:
+        """If-None-Match / If-Modified-Since for url, or {} when nothing usable is cached."""
+        entry = self._entry(url)
+        if entry is None:
+            return {}
+        etag, last_modified = entry[0], entry[1]
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        return headers
+
+    def hit(self, url: str) -> tuple[Path, str | None] | None:
+        """(body path, content type) to answer a 304 for url, counted as a hit; None if not cached."""
+        entry = self._entry(url)
+        if entry is None:
+            return None
+        _, _, content_type, sha256, size = entry
+        self.hits += 1
+        self.bytes_saved += size
+        self._db.execute("UPDATE responses SET last_used = ? WHERE url = ?", (time.time(), url))
+        return self._object_path(sha256), content_type
+
+    def resolve(self, url: str, response: httpx.Response) -> httpx.Response:
+        """
+        Turn the response to a (possibly conditional) GET into the one the caller should
+        use: a 304 becomes a 200 carrying the stored body (a hit); a 200 with an ETag or
+        Last-Modified is stored (a miss). Anything else is returned unchanged.
+        """
+        if response.status_code == 304:
+            cached = self.hit(url)
+            if cached is None:
+                return response
+            path, content_type = cached
+            return httpx.Response(
+                200,
+                headers={"content-type": content_type} if content_type else {},
+                content=path.read_bytes(),
+                request=response.request,
+                extensions={"from_cache": True},
+            )
+        if response.status_code == 200:
+            self.put(url, response.headers, response.content)
+        return response
+
+    def put(self, url: str, headers: httpx.Headers, body: bytes) -> None:
+        """Count a download of body and store it if url has validators."""
+        self.misses += 1
+        self.bytes_downloaded += len(body)
+        if not headers.get("etag") and not headers.get("last-modified"):
+            return
+        sha256 = hashlib.sha256(body).hexdigest()
+        path = self._object_path(sha256)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(body)
+            os.replace(tmp, path)
+        self._index(url, headers, sha256, len(body))
+
+    def put_file(self, url: str, headers: httpx.Headers, source: Path, sha256: str) -> None:
+        """put() for a body already streamed to source (sha256 computed while streaming); copies it."""
+        size = source.stat().st_size
+        self.misses += 1
+        self.bytes_downloaded += size
+        if not headers.get("etag") and not headers.get("last-modified"):
+            return
+        path = self._object_path(sha256)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            os.close(fd)
+            shutil.copyfile(source, tmp)
+            os.replace(tmp, path)
+        self._index(url, headers, sha256, size)
+
+    def _index(self, url: str, headers: httpx.Headers, sha256: str, size: int) -> None:
+        old = self._db.execute("SELECT sha256 FROM responses WHERE url = ?", (url,)).fetchone()
+        now = time.time()
+        self._db.execute(
+            "INSERT OR REPLACE INTO responses "
+            "(url, etag, last_modified, content_type, sha256, size, fetched_at, last_used) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (url, headers.get("etag"), headers.get("last-modified"), headers.get("content-type"), sha256, size, now, now),
+        )
+        if old is not None and old[0] != sha256:
+            self._release(old[0])
+
+    def _release(self, sha256: str) -> bool:
+        """Delete the stored body sha256 if no URL refers to it any more. True if it was unreferenced."""
+        if self._db.execute("SELECT 1 FROM responses WHERE sha256 = ? LIMIT 1", (sha256,)).fetchone():
+            return False
+        self._object_path(sha256).unlink(missing_ok=True)
+        return True
+
+    def stored_bytes(self) -> int:
+        """Size of the bodies the index refers to (each stored body counted once)."""
+        return self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM (SELECT MAX(size) AS size FROM responses GROUP BY sha256)"
+        ).fetchone()[0]
+
+    def evict(self) -> int:
+        """
+        Delete least-recently-used URLs (and bodies no other URL shares) until the stored
+        bodies total <= max_bytes. Returns URLs removed.
+        """
+        total = self.stored_bytes()
+        if total <= self.max_bytes:
+            return 0
+        deleted = 0
+        rows = self._db.execute("SELECT url, sha256, size FROM responses ORDER BY last_used, rowid").fetchall()
+        self._db.execute("BEGIN")
+        for url, sha256, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM responses WHERE url = ?", (url,))
+            if self._release(sha256):
+                total -= size
+            deleted += 1
+        self._db.execute("COMMIT")
+        self.evicted += deleted
+        return deleted
+
+    def summary(self) -> str:
+        return (
+            f"HTTP cache: {self.hits} hits (304), {self.misses} misses, "
+            f"{self.bytes_saved / 2**20:.1f} MB saved, {self.bytes_downloaded / 2**20:.1f} MB downloaded"
+            + (f", evicted {self.evicted} entries" if self.evicted else "")
+        )
+
+    def close(self) -> None:
+        self._db.close()
+
+
+def cached_get(client: httpx.Client, url: str, cache: HttpCache | None = None, **kwargs) -> httpx.Response:
+    """client.get(url) with conditional headers from cache; a 304 returns the cached 200."""
+    if cache is None:
+        return client.get(url, **kwargs)
+    headers = {**cache.request_headers(url), **kwargs.pop("headers", {})}
+    return cache.resolve(url, client.get(url, headers=headers, **kwargs))
+
+
+async def cached_get_async(
+    client: httpx.AsyncClient, url: str, cache: HttpCache | None = None, **kwargs
+) -> httpx.Response:
+    """Async cached_get."""
+    if cache is None:
+        return await client.get(url, **kwargs)
+    headers = {**cache.request_headers(url), **kwargs.pop("headers", {})}
+    return cache.resolve(url, await client.get(url, headers=headers, **kwargs))
@@ -0,0 +1,230 @@
+"""
+One tuned httpx client factory for every script: keep-alive pool limits, the same
+timeouts, HTTP/2 when the h2 package is installed, retries with exponential backoff,
+and per-client stats (requests, connections opened, reuse ratio, time in TLS).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import random
+import ssl
+import time
+
+import httpx
+
+# HTTP/2 needs the optional h2 package (pip install "httpx[http2]"); otherwise HTTP/1.1
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+TIMEOUT = httpx.Timeout(30.0, connect=10.0)
+MAX_CONNECTIONS = 32  # pool size; all of them may stay open for reuse
+KEEPALIVE_EXPIRY = 30.0  # seconds an idle pooled connection is kept
+# Retries per request: connection failures for any method (nothing was sent; not TLS
+# errors), RETRY_STATUSES and dropped keep-alive connections only for RETRY_METHODS. Delays: RETRY_BACKOFF * 2**n
+# with jitter, or the server's Retry-After (seconds) up to MAX_RETRY_AFTER.
+RETRIES = 3
+RETRY_BACKOFF = 0.5
+MAX_RETRY_AFTER = 30.0
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+RETRY_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+# For clients that also POST to search APIs: those requests only read, so they are safe to repeat
+SEARCH_RETRY_METHODS = RETRY_METHODS | {"POST"}
+
+
+class ClientStats:
+    """
+    Counters filled by a create_client / create_async_client transport: request attempts,
+    retries, connections opened (TCP connects) and seconds spent connecting and in TLS
+    handshakes, from httpcore trace events (summed over connections, so concurrent
+    handshakes add up to more than the wall time).
+    """
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.retries = 0
+        self.connections = 0
+        self.tls_handshakes = 0
+        self.connect_seconds = 0.0
+        self.tls_seconds = 0.0
+
+    @property
+    def reuse_ratio(self) -> float:
+        """Share of requests sent on an already open connection."""
+        return max(0.0, 1 - self.connections / self.requests) if self.requests else 0.0
+
+    def _event(self, started: dict[str, float], name: str) -> None:
+        step, _, phase = name.rpartition(".")
+        now = time.perf_counter()
+        if phase == "started":
+            started[step] = now
+            return
+        elapsed = now - started.pop(step, now)
+        if phase != "complete":
+            return
+        if step == "connection.connect_tcp":
+            self.connections += 1
+            self.connect_seconds += elapsed
+        elif step == "connection.start_tls":
+            self.tls_handshakes += 1
+            self.tls_seconds += elapsed
+
+    def tracer(self):
+        """httpcore "trace" extension for one request (sync transports)."""
+        started: dict[str, float] = {}
+        return lambda name, info: self._event(started, name)
+
+    def async_tracer(self):
+        """httpcore "trace" extension for one request (async transports)."""
+        started: dict[str, float] = {}
+
+        async def trace(name: str, info: dict) -> None:
+            self._event(started, name)
+
+        return trace
+
+    def summary(self) -> str:
+        return (
+            f"HTTP client: {self.requests} requests ({self.retries} retries) over {self.connections} "
+            f"connections, {self.reuse_ratio:.0%} reused; {self.connect_seconds:.2f}s connecting, "
+            f"{self.tls_seconds:.2f}s in {self.tls_handshakes} TLS handshakes"
+        )
+
+
+def _retry_delay(attempt: int, response: httpx.Response | None = None) -> float:
+    retry_after = response.headers.get("retry-after", "") if response is not None else ""
+    if retry_after.strip().isdigit():
+        return min(float(retry_after), MAX_RETRY_AFTER)
+    return RETRY_BACKOFF * 2**attempt * random.uniform(0.5, 1.5)
+
+
+def _retry_reason(
+    request: httpx.Request,
+    methods: frozenset[str],
+    response: httpx.Response | None = None,
+    error: Exception | None = None,
+) -> bool:
+    """True if this outcome of request is worth another attempt."""
+    if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout)):
+        # A certificate or TLS protocol failure will not go away on retry
+        cause = error.__cause__
+        while cause is not None and not isinstance(cause, ssl.SSLError):
+            cause = cause.__cause__
+        return cause is None
+    if request.method not in methods:
+        return False
+    if error is not None:
+        return isinstance(error, httpx.RemoteProtocolError)
+    return response.status_code in RETRY_STATUSES
+
+
+class RetryTransport(httpx.BaseTransport):
+    """Wrap a transport with retries (see RETRIES) and ClientStats tracing."""
+
+    def __init__(self, transport: httpx.BaseTransport, stats: ClientStats, retries: int, methods: frozenset[str]):
+        self.transport = transport
+        self.stats = stats
+        self.retries = retries
+        self.methods = methods
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        for attempt in range(self.retries + 1):
+            self.stats.requests += 1
+            request.extensions["trace"] = self.stats.tracer()
+            try:
+                response = self.transport.handle_request(request)
+            except httpx.TransportError as e:
+                if attempt == self.retries or not _retry_reason(request, self.methods, error=e):
+                    raise
+                delay = _retry_delay(attempt)
+            else:
+                if attempt == self.retries or not _retry_reason(request, self.methods, response):
+                    return response
+                delay = _retry_delay(attempt, response)
+                response.close()
+            self.stats.retries += 1
+            time.sleep(delay)
+        raise AssertionError("unreachable")
+
+    def close(self) -> None:
+        self.transport.close()
+
+
+class AsyncRetryTransport(httpx.AsyncBaseTransport):
+    """Async RetryTransport."""
+
+    def __init__(
+        self, transport: httpx.AsyncBaseTransport, stats: ClientStats, retries: int, methods: frozenset[str]
+    ):
+        self.transport = transport
+        self.stats = stats
+        self.retries = retries
+        self.methods = methods
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        for attempt in range(self.retries + 1):
+            self.stats.requests += 1
+            request.extensions["trace"] = self.stats.async_tracer()
+            try:
+                response = await self.transport.handle_async_request(request)
+            except httpx.TransportError as e:
+                if attempt == self.retries or not _retry_reason(request, self.methods, error=e):
+                    raise
+                delay = _retry_delay(attempt)
+            else:
+                if attempt == self.retries or not _retry_reason(request, self.methods, response):
+                    return response
+                delay = _retry_delay(attempt, response)
+                await response.aclose()
+            self.stats.retries += 1
+            await asyncio.sleep(delay)
+        raise AssertionError("unreachable")
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+def _limits(max_connections: int) -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_connections,
+        keepalive_expiry=KEEPALIVE_EXPIRY,
+    )
+
+
+def create_client(
+    stats: ClientStats | None = None,
+    max_connections: int = MAX_CONNECTIONS,
+    retries: int = RETRIES,
+    retry_methods: frozenset[str] = RETRY_METHODS,
+    verify: ssl.SSLContext | str | bool = True,
+    **kwargs,
+) -> httpx.Client:
+    """
+    httpx.Client with the shared pool limits, TIMEOUT, redirects followed, HTTP/2 when
+    available and retries; stats (if given) collects its counters. verify is the
+    transport's TLS verification (CA bundle path, SSLContext or False); kwargs go to
+    httpx.Client.
+    """
+    transport = httpx.HTTPTransport(http2=HTTP2_AVAILABLE, limits=_limits(max_connections), verify=verify)
+    kwargs.setdefault("timeout", TIMEOUT)
+    kwargs.setdefault("follow_redirects", True)
+    return httpx.Client(
+        transport=RetryTransport(transport, stats or ClientStats(), retries, retry_methods), **kwargs
+    )
+
+
+def create_async_client(
+    stats: ClientStats | None = None,
+    max_connections: int = MAX_CONNECTIONS,
+    retries: int = RETRIES,
+    retry_methods: frozenset[str] = RETRY_METHODS,
+    verify: ssl.SSLContext | str | bool = True,
+    **kwargs,
+) -> httpx.AsyncClient:
+    """Async create_client."""
+    transport = httpx.AsyncHTTPTransport(http2=HTTP2_AVAILABLE, limits=_limits(max_connections), verify=verify)
+    kwargs.setdefault("timeout", TIMEOUT)
+    kwargs.setdefault("follow_redirects", True)
+    return httpx.AsyncClient(
+        transport=AsyncRetryTransport(transport, stats or ClientStats(), retries, retry_methods), **kwargs
+    )
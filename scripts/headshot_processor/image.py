@@ -0,0 +1,132 @@
+"""Single decode path: every stage works on one ImageContext per source file."""
+
+from __future__ import annotations
+
+import io
+from functools import cached_property
+from pathlib import Path
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# libjpeg can decode straight to 1/2, 1/4 or 1/8 scale (DCT scaling), far cheaper than
+# a full decode plus resize; other formats always decode at full size
+_REDUCED_FLAGS = {2: cv2.IMREAD_REDUCED_COLOR_2, 4: cv2.IMREAD_REDUCED_COLOR_4, 8: cv2.IMREAD_REDUCED_COLOR_8}
+# EXIF orientations that swap width and height (cv2 applies EXIF rotation on decode)
+_TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}
+
+
+def reduction_for(size: int, min_size: int) -> int:
+    """Largest JPEG reduction (8, 4, 2, else 1) that keeps `size` source px at >= min_size."""
+    for factor in (8, 4, 2):
+        if size // factor >= min_size:
+            return factor
+    return 1
+
+
+def _header(source) -> tuple[int, int, str | None] | None:
+    """(width, height, format) from the file header only, as cv2 would orient it; None if unreadable."""
+    try:
+        with Image.open(source) as im:
+            w, h = im.size
+            if im.getexif().get(0x0112) in _TRANSPOSED_ORIENTATIONS:
+                w, h = h, w
+            return w, h, im.format
+    except (OSError, SyntaxError, ValueError):
+        return None
+
+
+class ImageContext:
+    """
+    One decoded image plus derived views, shared by every stage so a source is read
+    from disk and converted to gray exactly once.
+
+    A context may hold a reduced decode (see load_reduced): img is then smaller than the
+    source by `reduce`, and full_shape / rect_to_full / rect_from_full convert between
+    source pixels (what reports and crop rects use) and decoded pixels.
+    """
+
+    def __init__(self, path: Path, img: np.ndarray, full_size: tuple[int, int] | None = None, reduce: int = 1):
+        self.path = path
+        self.img = img
+        self.reduce = reduce
+        h, w = img.shape[:2]
+        self.full_w, self.full_h = full_size if full_size is not None else (w, h)
+        self._sx = self.full_w / w
+        self._sy = self.full_h / h
+
+    @classmethod
+    def load(cls, path: Path, reduce: int = 1) -> ImageContext | None:
+        """Decode path (BGR), at 1/reduce scale for JPEGs. Returns None if the image cannot be read."""
+        return cls._decode(path, None, reduce)
+
+    @classmethod
+    def from_bytes(cls, path: Path, data: bytes, reduce: int = 1) -> ImageContext | None:
+        """Decode already-read file bytes (BGR). Returns None if they are not an image."""
+        return cls._decode(path, data, reduce)
+
+    @classmethod
+    def load_reduced(cls, path: Path, min_side: int, data: bytes | None = None) -> ImageContext | None:
+        """
+        Decode at the largest JPEG reduction that keeps the shorter side >= min_side
+        (min_side 0 = full decode). Pass data to decode already-read bytes.
+        """
+        if min_side <= 0:
+            return cls._decode(path, data, 1)
+        header = _header(io.BytesIO(data) if data is not None else path)
+        reduce = reduction_for(min(header[0], header[1]), min_side) if header is not None else 1
+        return cls._decode(path, data, reduce, header)
+
+    @classmethod
+    def _decode(cls, path: Path, data: bytes | None, reduce: int, header=None) -> ImageContext | None:
+        if reduce > 1:
+            header = header or _header(io.BytesIO(data) if data is not None else path)
+            if header is None or header[2] != "JPEG":
+                reduce = 1
+        flags = _REDUCED_FLAGS.get(reduce, cv2.IMREAD_COLOR)
+        if data is None:
+            img = cv2.imread(str(path), flags)
+        else:
+            img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), flags)
+        if img is None:
+            return None
+        return cls(path, img, header[:2] if reduce > 1 else None, reduce)
+
+    def for_crop(self, crop_side: int, size: int) -> ImageContext | None:
+        """
+        Context to crop a crop_side (source px) square from and resize to size: self if
+        its decode keeps at least size px across the crop, else the source re-decoded at
+        the largest reduction that does.
+        """
+        reduce = reduction_for(crop_side, size)
+        if self.reduce <= reduce:
+            return self
+        return ImageContext.load(self.path, reduce)
+
+    @property
+    def shape(self) -> tuple[int, ...]:
+        return self.img.shape
+
+    @property
+    def full_shape(self) -> tuple[int, ...]:
+        """Shape of the source image at full resolution."""
+        return (self.full_h, self.full_w) + self.img.shape[2:]
+
+    def rect_to_full(self, rect: tuple[int, int, int, int]) -> tuple[int, int, int, int]:
+        """Map an (x, y, w, h) rect in decoded pixels to source pixels."""
+        if self.reduce == 1:
+            return rect
+        x, y, w, h = rect
+        return (round(x * self._sx), round(y * self._sy), round(w * self._sx), round(h * self._sy))
+
+    def rect_from_full(self, crop_rect: tuple[int, int, int, int]) -> tuple[int, int, int, int]:
+        """Map an (x1, y1, x2, y2) crop rect in source pixels to decoded pixels."""
+        if self.reduce == 1:
+            return crop_rect
+        x1, y1, x2, y2 = crop_rect
+        return (round(x1 / self._sx), round(y1 / self._sy), round(x2 / self._sx), round(y2 / self._sy))
+
+    @cached_property
+    def gray(self) -> np.ndarray:
+        return cv2.cvtColor(self.img, cv2.COLOR_BGR2GRAY)
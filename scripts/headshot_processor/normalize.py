@@ -0,0 +1,89 @@
+"""
+Brightness/contrast/color normalization of avatars toward a shared reference brightness,
+matching the ImageEnhance chain (Brightness, Contrast, Color, then UnsharpMask) in fewer
+passes: Brightness and Contrast act on each channel alone, so they compose into one
+256-entry lookup table; Color is one vectorized blend with the luma image.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import cv2
+import numpy as np
+from PIL import Image, ImageFilter
+
+CONTRAST = 1.05
+COLOR = 1.02
+UNSHARP = ImageFilter.UnsharpMask(radius=0.6, percent=80, threshold=2)
+# Brightness ratio clamps: toward a reference median, or toward mid-gray without one
+REF_RATIO_RANGE = (0.7, 1.3)
+TARGET_BRIGHTNESS = 128
+TARGET_RATIO_RANGE = (0.85, 1.15)
+# Reference statistics come from JPEG draft decodes at least this large (px, shorter side)
+THUMBNAIL_MIN_SIDE = 64
+
+_LEVELS = np.arange(256, dtype=np.float32)
+
+
+def median_brightness(arr: np.ndarray) -> float:
+    """np.median of a uint8 array (all channels), from a 256-bin histogram instead of a sort."""
+    counts = np.cumsum(np.bincount(arr.ravel(), minlength=256))
+    n = int(counts[-1])
+    lower = int(np.searchsorted(counts, (n - 1) // 2, side="right"))
+    upper = int(np.searchsorted(counts, n // 2, side="right"))
+    return (lower + upper) / 2
+
+
+def thumbnail_brightness(path: Path) -> float | None:
+    """median_brightness of a reduced (JPEG draft) decode of path, or None if unreadable."""
+    try:
+        with Image.open(path) as im:
+            im.draft("RGB", (THUMBNAIL_MIN_SIDE, THUMBNAIL_MIN_SIDE))
+            return median_brightness(np.asarray(im.convert("RGB")))
+    except OSError:
+        return None
+
+
+def brightness_ratio(brightness: float, ref_median_brightness: float | None = None) -> float:
+    """Brightness factor toward the reference median (or mid-gray), clamped."""
+    if ref_median_brightness is not None:
+        ratio, (lo, hi) = ref_median_brightness / max(brightness, 1), REF_RATIO_RANGE
+    else:
+        ratio, (lo, hi) = TARGET_BRIGHTNESS / max(brightness, 1), TARGET_RATIO_RANGE
+    return max(lo, min(hi, ratio))
+
+
+def _blend_lut(base: float, factor: float) -> np.ndarray:
+    """Image.blend(solid base, image, factor) per level: clipped, then truncated like Pillow."""
+    return np.clip(base + factor * (_LEVELS - base), 0, 255).astype(np.uint8)
+
+
+def normalize_lut(img: Image.Image, ref_median_brightness: float | None = None) -> np.ndarray:
+    """
+    Lookup table (uint8[256]) applying Brightness toward the reference, then Contrast
+    (around the brightened image's rounded mean luma, as ImageEnhance does) to each channel.
+    """
+    arr = np.asarray(img)
+    brightness = _blend_lut(0.0, brightness_ratio(median_brightness(arr), ref_median_brightness))
+    luma = np.asarray(Image.fromarray(cv2.LUT(arr, brightness)).convert("L"))
+    mean = int(float(luma.mean()) + 0.5)
+    return _blend_lut(float(mean), CONTRAST)[brightness]
+
+
+def apply_normalize(img: Image.Image, lut: np.ndarray) -> Image.Image:
+    """Apply a normalize_lut to an RGB image, then the Color blend and UNSHARP."""
+    arr = cv2.LUT(np.asarray(img), lut)
+    luma = np.asarray(Image.fromarray(arr).convert("L"), dtype=np.float32)[..., None]
+    out = luma + np.float32(COLOR) * (arr - luma)
+    np.clip(out, 0, 255, out=out)
+    return Image.fromarray(out.astype(np.uint8)).filter(UNSHARP)
+
+
+def normalize_image(pil_img: Image.Image, ref_median_brightness: float | None = None) -> Image.Image:
+    """
+    Normalize brightness/color toward a consistent headshot style (auto-filter-like).
+    Optional ref_median_brightness to match other images.
+    """
+    img = pil_img.convert("RGB")
+    return apply_normalize(img, normalize_lut(img, ref_median_brightness))
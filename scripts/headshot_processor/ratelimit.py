@@ -0,0 +1,42 @@
+"""Async token-bucket rate limiter for search API calls made by the fetch scripts."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+
+class TokenBucket:
+    """
+    At most `rate` acquisitions per second on average, with up to `burst` back to back
+    after an idle period. acquire() awaits the next token instead of sleeping a thread,
+    so other tasks (downloads) keep running; waiters are served in arrival order.
+    A rate <= 0 disables the limit.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.acquired = 0
+        self.waited = 0.0
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        self.acquired += 1
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                wait = (1 - self._tokens) / self.rate
+                self.waited += wait
+                await asyncio.sleep(wait)
+                self._refill()
+            self._tokens -= 1
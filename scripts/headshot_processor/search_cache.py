@@ -0,0 +1,117 @@
+"""
+Search-result cache shared by the fetch scripts: one SQLite table of raw API responses
+keyed by (provider, query), with a TTL. get_many() answers a whole predictor list in
+one pass at startup, so a fully cached run makes no search calls at all.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import time
+from pathlib import Path
+
+from headshot_processor.http_cache import DEFAULT_HTTP_CACHE_DIR
+
+# Next to the HTTP cache index (scripts/.http_cache, git-ignored)
+DEFAULT_SEARCH_CACHE_PATH = DEFAULT_HTTP_CACHE_DIR / "search.sqlite"
+# Search results older than this are fetched again (0 = keep forever)
+SEARCH_CACHE_TTL_DAYS = 30
+# Queries per SELECT ... IN (...) in get_many (well under SQLite's variable limit)
+_BULK_CHUNK = 500
+
+
+class SearchCache:
+    """
+    Raw JSON responses of search APIs. `provider` names the endpoint and any request
+    parameters that change the result (e.g. "serper-images/num=10"); queries are
+    stripped before use. Safe to open from several processes at once (WAL, autocommit);
+    counters are per instance.
+    """
+
+    def __init__(self, path: Path = DEFAULT_SEARCH_CACHE_PATH, ttl_days: float = SEARCH_CACHE_TTL_DAYS):
+        self.path = path
+        self.ttl = ttl_days * 86400
+        self.hits = 0
+        self.misses = 0
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(path), timeout=30, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS searches (
+                provider TEXT NOT NULL,
+                query TEXT NOT NULL,
+                response TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (provider, query)
+            )"""
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS searches_fetched_at ON searches (fetched_at)")
+
+    def _oldest(self) -> float:
+        """fetched_at below which an entry is expired."""
+        return time.time() - self.ttl if self.ttl > 0 else float("-inf")
+
+    def get_many(self, provider: str, queries: list[str]) -> dict[str, dict]:
+        """{query: response} for every query with a fresh entry (keys as passed in); counts hits and misses."""
+        wanted: dict[str, list[str]] = {}
+        for query in queries:
+            wanted.setdefault(query.strip(), []).append(query)
+        keys = list(wanted)
+        found: dict[str, dict] = {}
+        for i in range(0, len(keys), _BULK_CHUNK):
+            chunk = keys[i:i + _BULK_CHUNK]
+            rows = self._db.execute(
+                f"SELECT query, response FROM searches WHERE provider = ? AND fetched_at >= ? "
+                f"AND query IN ({','.join('?' * len(chunk))})",
+                (provider, self._oldest(), *chunk),
+            )
+            for key, response in rows:
+                data = json.loads(response)
+                for query in wanted[key]:
+                    found[query] = data
+        self.hits += len(found)
+        self.misses += len(queries) - len(found)
+        return found
+
+    def get(self, provider: str, query: str) -> dict | None:
+        """Fresh response for query, or None."""
+        return self.get_many(provider, [query]).get(query)
+
+    def put(self, provider: str, query: str, response: dict, fetched_at: float | None = None) -> None:
+        self._db.execute(
+            "INSERT OR REPLACE INTO searches VALUES (?, ?, ?, ?)",
+            (provider, query.strip(), json.dumps(response), time.time() if fetched_at is None else fetched_at),
+        )
+
+    def import_files(self, provider: str, files: dict[str, Path]) -> int:
+        """
+        Import {query: JSON file} (the old one-file-per-query caches) for queries not yet
+        stored, dated by file mtime so the TTL still applies. Returns entries imported.
+        """
+        imported = 0
+        for query, path in files.items():
+            if not path.exists():
+                continue
+            exists = self._db.execute(
+                "SELECT 1 FROM searches WHERE provider = ? AND query = ?", (provider, query.strip())
+            ).fetchone()
+            if exists:
+                continue
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            self.put(provider, query, data, fetched_at=path.stat().st_mtime)
+            imported += 1
+        return imported
+
+    def prune(self) -> int:
+        """Delete expired entries. Returns the number removed."""
+        return self._db.execute("DELETE FROM searches WHERE fetched_at < ?", (self._oldest(),)).rowcount
+
+    def summary(self) -> str:
+        return f"Search cache: {self.hits} hits, {self.misses} misses"
+
+    def close(self) -> None:
+        self._db.close()
@@ -7,27 +7,79 @@ Download images from a CSV source, detect faces, crop to consistent 300×300 hea
 from __future__ import annotations
 
 import argparse
+import asyncio
 import csv
+import hashlib
 import json
+import os
 import re
+import time
 from pathlib import Path
+from typing import Iterator
+from urllib.parse import urlsplit
 
-import cv2
 import httpx
 import numpy as np
-import pandas as pd
-from PIL import Image, ImageEnhance, ImageFilter
-
-# Target headshot size (fits nicely in a circle; head + part of bust)
-TARGET_SIZE = 300
-# Face height in crop as fraction of TARGET_SIZE for "ideal" headshot
-IDEAL_FACE_FRAC_MIN = 0.22  # face too small → "too far"
-IDEAL_FACE_FRAC_MAX = 0.45  # face too large → "too close"
-# Head+bust crop: expand face box to include head and shoulders
-# (scale from face center; face sits in upper ~40% of crop)
-CROP_FACE_SCALE = 2.6  # crop side = face_height * this
-FACE_OFFSET_UP = 0.35   # crop top: face center - (crop_height * this)
-FACE_OFFSET_DOWN = 0.65  # crop bottom: face center + (crop_height * (1 - FACE_OFFSET_UP))
+from PIL import Image
+
+from headshot_processor import (
+    AVIF_SUPPORTED,
+    DEFAULT_HTTP_CACHE_DIR,
+    DETECTOR_BACKENDS,
+    HTTP_CACHE_MAX_MB,
+    JPEG_QUALITY,
+    MAX_DOWNLOAD_MB,
+    OUTPUT_FORMATS,
+    PROFILES,
+    AvatarOutputs,
+    ClientStats,
+    FaceDetector,
+    HttpCache,
+    ImageContext,
+    apply_normalize,
+    classify_face_scale,
+    compute_crop_region,
+    create_async_client,
+    crop_image,
+    downscale_progressive,
+    fetch_image_async,
+    get_detector,
+    median_brightness,
+    normalize_image,
+    normalize_lut,
+    parse_formats,
+    parse_sizes,
+    save_avatar_set,
+    save_jpeg,
+    thumbnail_brightness,
+)
+
+# Crop geometry: target size, framing and "ideal" face scale (see headshot_processor.geometry.PROFILES)
+PROFILE = PROFILES["headshots"]
+# Face detector backend (see headshot_processor/detectors.py); yunet/ssd need local model files
+DETECTOR = "haar"
+DETECTOR_MODEL: str | None = None
+DETECTOR_CONFIG: str | None = None
+# Haar detection on images larger than this (longest side, px) runs on a downscaled copy
+# (0 = always full resolution); DETECT_REFINE re-detects each face in a full-resolution ROI
+DETECT_MAX_SIDE = 0
+DETECT_REFINE = False
+# Decode JPEGs at 1/2, 1/4 or 1/8 scale while the shorter side stays >= this (0 = full decode);
+# the crop is re-decoded larger if needed so it keeps >= PROFILE.target_size source px
+DECODE_MIN_SIDE = 0
+# Extra avatar sizes/formats written next to {id}.jpg (default: none, see AvatarOutputs)
+OUTPUTS = AvatarOutputs()
+# Normalize brightness/contrast/color toward the batch's median brightness before the
+# first encode (avatars are held in memory until every image is cropped, ~0.3 MB each)
+NORMALIZE = False
+# Each output stores the reference brightness it was normalized against; on reruns, reused
+# outputs whose reference is further than this (0-255 levels) from the batch's are re-encoded
+NORMALIZE_REF_TOLERANCE = 1.0
+# Download concurrency: requests in flight overall, and per hostname (polite to a single site)
+DOWNLOAD_CONCURRENCY = 16
+DOWNLOAD_PER_HOST = 4
+# Bump when the manifest layout changes; old manifests are then ignored
+MANIFEST_VERSION = 1
 
 
 def slug(s: str) -> str:
@@ -35,44 +87,116 @@ def slug(s: str) -> str:
     return re.sub(r"[^\w\-]", "_", s.strip()).strip("_") or "unknown"
 
 
-def download_images(csv_path: Path, out_dir: Path, url_column: str = "image_url", id_column: str = "id") -> list[dict]:
-    """Download each image from CSV into out_dir, named by id. Returns list of {id, path}. Deduplicates by id (first row wins)."""
-    out_dir.mkdir(parents=True, exist_ok=True)
+def _plan_downloads(
+    csv_path: Path, out_dir: Path, url_column: str, id_column: str
+) -> list[tuple[str, str, Path]]:
+    """Read CSV and return (id, url, dest_path) per download. Deduplicates by id (first row wins)."""
+    # pandas is only needed to read the CSV; importing it lazily keeps --skip-download reruns fast
+    import pandas as pd
+
     df = pd.read_csv(csv_path)
     if url_column not in df.columns or id_column not in df.columns:
         raise SystemExit(f"CSV must have columns: {id_column}, {url_column}")
     # Deduplicate by id (e.g. predictor_name) so we download one image per person
     seen: set[str] = set()
-    results = []
-    with httpx.Client(follow_redirects=True, timeout=30) as client:
-        for _, row in df.iterrows():
-            uid = slug(str(row[id_column]))
-            if uid in seen:
-                continue
-            url = str(row[url_column]).strip()
-            if not url or url.lower() in ("nan", "none", ""):
-                continue
-            seen.add(uid)
-            ext = Path(url).suffix or ".jpg"
-            if "?" in ext:
-                ext = ".jpg"
-            path = out_dir / f"{uid}{ext}"
+    jobs = []
+    for _, row in df.iterrows():
+        uid = slug(str(row[id_column]))
+        if uid in seen:
+            continue
+        url = str(row[url_column]).strip()
+        if not url or url.lower() in ("nan", "none", ""):
+            continue
+        seen.add(uid)
+        ext = Path(url).suffix or ".jpg"
+        if "?" in ext:
+            ext = ".jpg"
+        jobs.append((uid, url, out_dir / f"{uid}{ext}"))
+    return jobs
+
+
+async def _download_all(
+    jobs: list[tuple[str, str, Path]],
+    concurrency: int,
+    per_host: int,
+    cache: HttpCache | None = None,
+    max_bytes: int = MAX_DOWNLOAD_MB * 2**20,
+    stats: ClientStats | None = None,
+) -> list[dict | None]:
+    """
+    Fetch all jobs with at most `concurrency` requests in flight overall and `per_host`
+    per hostname, over one pooled client (create_async_client; stats collects its
+    counters). Returns one {id, path, elapsed} (or None on failure) per job, in job order.
+    With a cache, unchanged images are revalidated (304) instead of downloaded again.
+    Bodies are streamed to disk; non-images, bodies over max_bytes and images with
+    unusable dimensions are dropped as soon as that is known.
+    """
+    global_limit = asyncio.Semaphore(max(1, concurrency))
+    host_limits: dict[str, asyncio.Semaphore] = {}
+
+    async def fetch(client: httpx.AsyncClient, uid: str, url: str, path: Path) -> dict | None:
+        try:
+            host = urlsplit(url).hostname or ""
+        except ValueError as e:
+            print(f"Skip {uid}: {e}")
+            return None
+        host_limit = host_limits.setdefault(host, asyncio.Semaphore(max(1, per_host)))
+        # Host slot first: jobs queued behind a busy host must not hold global slots
+        async with host_limit, global_limit:
+            start = time.perf_counter()
             try:
-                r = client.get(url)
-                r.raise_for_status()
-                path.write_bytes(r.content)
-                results.append({"id": uid, "path": str(path)})
-                print(f"Downloaded: {path.name}")
+                await fetch_image_async(client, url, path, cache, max_bytes)
             except Exception as e:
-                print(f"Skip {uid}: {e}")
+                print(f"Skip {uid}: {e} ({time.perf_counter() - start:.2f}s)")
+                return None
+            elapsed = time.perf_counter() - start
+            print(f"Downloaded: {path.name} ({elapsed:.2f}s)")
+            return {"id": uid, "path": str(path), "elapsed": elapsed}
+
+    async with create_async_client(stats, max_connections=max(1, concurrency)) as client:
+        return await asyncio.gather(*(fetch(client, uid, url, path) for uid, url, path in jobs))
+
+
+def download_images(
+    csv_path: Path,
+    out_dir: Path,
+    url_column: str = "image_url",
+    id_column: str = "id",
+    concurrency: int = DOWNLOAD_CONCURRENCY,
+    per_host: int = DOWNLOAD_PER_HOST,
+    http_cache_dir: Path | None = DEFAULT_HTTP_CACHE_DIR,
+    max_download_mb: float = MAX_DOWNLOAD_MB,
+    http_cache_max_mb: float = HTTP_CACHE_MAX_MB,
+) -> list[dict]:
+    """
+    Download each image from CSV into out_dir, named by id. Returns list of {id, path}
+    in CSV order. Deduplicates by id (first row wins). Requests run concurrently,
+    bounded by `concurrency` overall and `per_host` per hostname. Responses are cached
+    in http_cache_dir (None = no cache, trimmed to http_cache_max_mb afterwards) and
+    revalidated with conditional GETs; bodies larger than max_download_mb are not downloaded.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    jobs = _plan_downloads(csv_path, out_dir, url_column, id_column)
+    cache = HttpCache(http_cache_dir, int(http_cache_max_mb * 2**20)) if http_cache_dir is not None else None
+    stats = ClientStats()
+    start = time.perf_counter()
+    fetched = asyncio.run(_download_all(jobs, concurrency, per_host, cache, int(max_download_mb * 2**20), stats))
+    wall = time.perf_counter() - start
+    results = [{"id": f["id"], "path": f["path"]} for f in fetched if f is not None]
+    timings = [f["elapsed"] for f in fetched if f is not None]
+    if timings:
+        print(f"Downloaded {len(results)}/{len(jobs)} in {wall:.2f}s wall "
+              f"(sum of requests {sum(timings):.2f}s, slowest {max(timings):.2f}s)")
+    print(stats.summary())
+    if cache is not None:
+        cache.evict()
+        print(cache.summary())
+        cache.close()
     return results
 
 
-def _face_detector():
-    cascade = cv2.CascadeClassifier(
-        cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
-    )
-    return cascade
+def _face_detector() -> FaceDetector:
+    return get_detector(DETECTOR, DETECTOR_MODEL, DETECTOR_CONFIG, DETECT_MAX_SIDE, DETECT_REFINE)
 
 
 def _best_face(face_rects: list[tuple[int, int, int, int]]) -> tuple[int, int, int, int] | None:
@@ -82,181 +206,206 @@ def _best_face(face_rects: list[tuple[int, int, int, int]]) -> tuple[int, int, i
     return max(face_rects, key=lambda r: r[2] * r[3])
 
 
-def detect_face(image_path: Path, cascade) -> tuple[int, int, int, int] | None:
+def detect_face(image_path: Path, detector: FaceDetector) -> tuple[int, int, int, int] | None:
     """Return (x, y, w, h) of best face in image, or None."""
-    img = cv2.imread(str(image_path))
-    if img is None:
+    ctx = ImageContext.load(image_path)
+    if ctx is None:
         return None
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    faces = cascade.detectMultiScale(
-        gray,
-        scaleFactor=1.1,
-        minNeighbors=5,
-        minSize=(30, 30),
-        flags=cv2.CASCADE_SCALE_IMAGE,
-    )
-    return _best_face([(int(x), int(y), int(w), int(h)) for (x, y, w, h) in faces])
-
-
-def compute_crop_region(
-    img_shape: tuple[int, int],
-    face: tuple[int, int, int, int],
-) -> tuple[int, int, int, int]:
-    """Compute (x1, y1, x2, y2) square crop for head+bust from face (x,y,w,h)."""
-    h_img, w_img = img_shape[:2]
-    fx, fy, fw, fh = face
-    fcx = fx + fw / 2
-    fcy = fy + fh / 2
-    side = int(fh * CROP_FACE_SCALE)
-    side = max(side, TARGET_SIZE // 2)
-    # Center vertically: face in upper part (head), rest bust
-    cy = fcy - side * (FACE_OFFSET_UP - 0.5)
-    cx = fcx
-    x1 = int(cx - side / 2)
-    y1 = int(cy - side / 2)
-    x2 = x1 + side
-    y2 = y1 + side
-    # Clamp to image
-    x1 = max(0, min(x1, w_img - side))
-    y1 = max(0, min(y1, h_img - side))
-    x2 = min(w_img, x1 + side)
-    y2 = min(h_img, y1 + side)
-    # Ensure we have a square (trim to min dimension)
-    w_crop = x2 - x1
-    h_crop = y2 - y1
-    if w_crop > h_crop:
-        d = (w_crop - h_crop) // 2
-        x1 += d
-        x2 -= w_crop - h_crop - d
-    elif h_crop > w_crop:
-        d = (h_crop - w_crop) // 2
-        y1 += d
-        y2 -= h_crop - w_crop - d
-    return (x1, y1, x2, y2)
+    return _best_face(detector.detect(ctx.img, ctx.gray))
+
+
+def _detect_record(item: dict, ctx: ImageContext | None, detector: FaceDetector) -> dict:
+    """Detect the best face in an already-decoded image, compute crop region, flag scale issues."""
+    path = Path(item["path"])
+    face = _best_face(detector.detect(ctx.img, ctx.gray)) if ctx is not None else None
+    if face is not None:
+        face = ctx.rect_to_full(face)
+    if face is None:
+        return {
+            "id": item["id"],
+            "path": str(path),
+            "face": None,
+            "crop_rect": None,
+            "face_height_in_crop": None,
+            "status": "no_face",
+        }
+    crop_rect = compute_crop_region(ctx.full_shape, face, PROFILE)
+    x1, y1, x2, y2 = crop_rect
+    crop_side = min(x2 - x1, y2 - y1)
+    # Face height in the crop (approx)
+    face_in_crop_h = face[3]
+    face_frac, status = classify_face_scale(face_in_crop_h, crop_side, PROFILE)
+    return {
+        "id": item["id"],
+        "path": str(path),
+        "face": list(face),
+        "crop_rect": list(crop_rect),
+        "face_height_in_crop": int(face_in_crop_h),
+        "crop_side": crop_side,
+        "face_frac": round(face_frac, 3),
+        "status": status,
+    }
+
+
+def _output_side() -> int:
+    """Largest avatar side written (the crop must keep at least this many source px)."""
+    return max((PROFILE.target_size,) + OUTPUTS.pixel_sizes())
+
+
+def _save_avatars(rec: dict, avatars: dict[int, Image.Image], cropped_dir: Path) -> None:
+    out_path = cropped_dir / f"{rec['id']}.jpg"
+    save_jpeg(avatars[PROFILE.target_size], out_path)
+    rec["out_path"] = str(out_path)
+    if OUTPUTS.sizes:
+        rec["outputs"] = [str(p) for p in save_avatar_set(avatars, cropped_dir, rec["id"], OUTPUTS)]
+
+
+def _crop_record(
+    rec: dict,
+    ctx: ImageContext,
+    cropped_dir: Path,
+    pending: list[tuple[dict, dict[int, Image.Image]]] | None = None,
+) -> None:
+    """
+    Crop an already-decoded image to rec's crop_rect (source px), resize, save; sets
+    rec['out_path'] and, with OUTPUTS sizes, rec['outputs'] (every size/format variant,
+    all downscaled progressively from the one crop). With pending (NORMALIZE), sets
+    rec['brightness'] and appends (rec, avatars) there instead of saving: the
+    normalization needs the reference brightness of the whole batch (save_normalized).
+    """
+    crop = crop_image(ctx.img, ctx.rect_from_full(rec["crop_rect"]))
+    if crop is None:
+        return
+    avatars = downscale_progressive(crop, (PROFILE.target_size,) + OUTPUTS.pixel_sizes())
+    if pending is None:
+        _save_avatars(rec, avatars, cropped_dir)
+        return
+    rec["brightness"] = median_brightness(np.asarray(avatars[PROFILE.target_size]))
+    pending.append((rec, avatars))
+
+
+def process_image(
+    item: dict,
+    detector: FaceDetector,
+    cropped_dir: Path,
+    pending: list[tuple[dict, dict[int, Image.Image]]] | None = None,
+) -> dict:
+    """
+    One unit of work: decode once, detect, crop, resize, encode. Returns the report
+    record; the decoded image is released when this returns. With DECODE_MIN_SIDE the
+    decode is reduced, and only a crop too small for that reduction is decoded again.
+    With pending the encode is deferred (see _crop_record).
+    """
+    ctx = ImageContext.load_reduced(Path(item["path"]), DECODE_MIN_SIDE)
+    rec = _detect_record(item, ctx, detector)
+    if rec["crop_rect"] is not None:
+        crop_ctx = ctx.for_crop(rec["crop_side"], _output_side())
+        if crop_ctx is not None:
+            _crop_record(rec, crop_ctx, cropped_dir, pending)
+    return rec
+
+
+def iter_pipeline(
+    downloaded: list[dict],
+    detector: FaceDetector,
+    cropped_dir: Path,
+    pending: list[tuple[dict, dict[int, Image.Image]]] | None = None,
+) -> Iterator[dict]:
+    """
+    Streaming pipeline: yield each image's record as soon as it is cropped. Only one
+    decoded image is alive at a time, so memory does not grow with the CSV (except for
+    the small avatars held in pending when normalizing).
+    """
+    cropped_dir.mkdir(parents=True, exist_ok=True)
+    for item in downloaded:
+        yield process_image(item, detector, cropped_dir, pending)
 
 
 def pass1_detect(
     downloaded: list[dict],
-    cascade,
+    detector: FaceDetector,
 ) -> list[dict]:
     """
     First pass: detect face in each image, compute crop region, flag scale issues.
     Returns list of {id, path, face, crop_rect, face_height_in_crop, status}.
+    Kept for callers that want detection only; main() uses iter_pipeline.
     """
-    records = []
-    for item in downloaded:
-        path = Path(item["path"])
-        face = detect_face(path, cascade)
-        if face is None:
-            records.append({
-                "id": item["id"],
-                "path": str(path),
-                "face": None,
-                "crop_rect": None,
-                "face_height_in_crop": None,
-                "status": "no_face",
-            })
-            continue
-        img = cv2.imread(str(path))
-        crop_rect = compute_crop_region(img.shape, face)
-        x1, y1, x2, y2 = crop_rect
-        crop_side = min(x2 - x1, y2 - y1)
-        # Face height in the crop (approx)
-        face_in_crop_h = face[3]
-        face_frac = face_in_crop_h / crop_side if crop_side else 0
-        if face_frac < IDEAL_FACE_FRAC_MIN:
-            status = "too_far"
-        elif face_frac > IDEAL_FACE_FRAC_MAX:
-            status = "too_close"
-        else:
-            status = "ok"
-        records.append({
-            "id": item["id"],
-            "path": str(path),
-            "face": list(face),
-            "crop_rect": list(crop_rect),
-            "face_height_in_crop": int(face_in_crop_h),
-            "crop_side": crop_side,
-            "face_frac": round(face_frac, 3),
-            "status": status,
-        })
-    return records
+    return [_detect_record(item, ImageContext.load(Path(item["path"])), detector) for item in downloaded]
 
 
 def pass2_crop(
     records: list[dict],
     cropped_dir: Path,
 ) -> list[dict]:
-    """Crop each image to 300×300 and save to cropped_dir. Adds out_path to each record."""
+    """Crop each image to the profile's target size and save to cropped_dir. Adds out_path to each record."""
     cropped_dir.mkdir(parents=True, exist_ok=True)
     for rec in records:
         if rec.get("crop_rect") is None:
             continue
-        path = Path(rec["path"])
-        img = cv2.imread(str(path))
-        if img is None:
-            continue
-        x1, y1, x2, y2 = rec["crop_rect"]
-        crop = img[y1:y2, x1:x2]
-        if crop.size == 0:
+        ctx = ImageContext.load(Path(rec["path"]))
+        if ctx is None:
             continue
-        # Resize with antialiasing: BGR -> RGB, Pillow LANCZOS, then save
-        crop_rgb = cv2.cvtColor(crop, cv2.COLOR_BGR2RGB)
-        pil_crop = Image.fromarray(crop_rgb)
-        resized = pil_crop.resize(
-            (TARGET_SIZE, TARGET_SIZE),
-            resample=Image.LANCZOS,
-            reducing_gap=3,
-        )
-        out_path = cropped_dir / f"{rec['id']}.jpg"
-        resized.save(str(out_path), "JPEG", quality=92)
-        rec["out_path"] = str(out_path)
+        _crop_record(rec, ctx, cropped_dir)
     return records
 
 
-def normalize_image(pil_img: Image.Image, ref_median_brightness: float | None = None) -> Image.Image:
+def reference_brightness(records: list[dict]) -> float:
+    """Median of the records' avatar brightness (see median_brightness), 128 without any."""
+    values = [r["brightness"] for r in records if r and r.get("brightness") is not None]
+    return float(np.median(values)) if values else 128.0
+
+
+def save_normalized(pending: list[tuple[dict, dict[int, Image.Image]]], cropped_dir: Path, ref_median: float) -> None:
     """
-    Normalize brightness/color toward a consistent headshot style (auto-filter-like).
-    Optional ref_median_brightness to match other images.
+    Encode avatars held back by the pipeline (NORMALIZE): each record's images get the
+    normalization computed from its target-size avatar, so every file is encoded once.
     """
-    img = pil_img
-    arr = np.array(img)
-    brightness = float(np.median(arr))
-    if ref_median_brightness is not None:
-        ratio = ref_median_brightness / max(brightness, 1)
-        ratio = max(0.7, min(1.3, ratio))
-    else:
-        target = 128
-        ratio = target / max(brightness, 1)
-        ratio = max(0.85, min(1.15, ratio))
-    img = ImageEnhance.Brightness(img).enhance(ratio)
-    img = ImageEnhance.Contrast(img).enhance(1.05)
-    img = ImageEnhance.Color(img).enhance(1.02)
-    img = img.filter(ImageFilter.UnsharpMask(radius=0.6, percent=80, threshold=2))
-    return img
+    for rec, avatars in pending:
+        lut = normalize_lut(avatars[PROFILE.target_size], ref_median)
+        avatars = {side: apply_normalize(im, lut) for side, im in avatars.items()}
+        _save_avatars(rec, avatars, cropped_dir)
+        rec["normalize_ref"] = ref_median
+
+
+def stale_normalized(records: list[dict | None], ref_median: float) -> list[int]:
+    """
+    Indices of cropped records whose outputs were normalized against a reference more
+    than NORMALIZE_REF_TOLERANCE away from ref_median (or against none recorded).
+    """
+    return [
+        i for i, rec in enumerate(records)
+        if rec and rec.get("brightness") is not None
+        and abs(rec.get("normalize_ref", float("inf")) - ref_median) > NORMALIZE_REF_TOLERANCE
+    ]
+
+
+def recrop_record(
+    rec: dict,
+    cropped_dir: Path,
+    pending: list[tuple[dict, dict[int, Image.Image]]],
+) -> None:
+    """Crop a reused record again from its source (stored crop_rect, no detection) into pending."""
+    ctx = ImageContext.load_reduced(Path(rec["path"]), DECODE_MIN_SIDE)
+    crop_ctx = ctx.for_crop(rec["crop_side"], _output_side()) if ctx is not None else None
+    if crop_ctx is not None:
+        _crop_record(rec, crop_ctx, cropped_dir, pending)
 
 
 def pass3_normalize(cropped_dir: Path, records: list[dict]) -> None:
-    """Overwrite cropped images with normalized versions (consistent brightness/color)."""
-    paths = [Path(r["out_path"]) for r in records if r.get("out_path")]
+    """
+    Overwrite cropped images with normalized versions (consistent brightness/color).
+    The reference brightness comes from reduced (draft) decodes, so each file is fully
+    decoded once; prefer NORMALIZE, which also avoids the second JPEG encode.
+    """
+    paths = [Path(r["out_path"]) for r in records if r.get("out_path") and Path(r["out_path"]).exists()]
     if not paths:
         return
-    # First pass: compute reference median brightness from all cropped images
-    brightnesses = []
-    for p in paths:
-        if not p.exists():
-            continue
-        img = Image.open(p).convert("RGB")
-        arr = np.array(img)
-        brightnesses.append(float(np.median(arr)))
+    brightnesses = [b for b in map(thumbnail_brightness, paths) if b is not None]
     ref_median = float(np.median(brightnesses)) if brightnesses else 128.0
-    # Second pass: normalize each image
     for p in paths:
-        if not p.exists():
-            continue
-        img = Image.open(p).convert("RGB")
-        img = normalize_image(img, ref_median_brightness=ref_median)
-        img.save(p, "JPEG", quality=92)
+        with Image.open(p) as im:
+            img = normalize_image(im, ref_median_brightness=ref_median)
+        save_jpeg(img, p)
     print(f"Normalized {len(paths)} images (reference brightness ≈ {ref_median:.0f})")
 
 
@@ -289,7 +438,131 @@ def write_report(records: list[dict], report_path: Path) -> None:
               f"{summary['too_far']} too far, {summary['no_face']} no face")
 
 
+def _file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def manifest_config(detector: FaceDetector) -> dict:
+    """Everything besides the source bytes that changes a record or crop; a mismatch rebuilds all."""
+    return {
+        "version": MANIFEST_VERSION,
+        "geometry": PROFILE.as_dict(),
+        "detector": detector.fingerprint(),
+        "decode_min_side": DECODE_MIN_SIDE,
+        "jpeg_quality": JPEG_QUALITY,
+        "outputs": OUTPUTS.as_dict(),
+        "normalize": NORMALIZE,
+    }
+
+
+class BuildManifest:
+    """
+    manifest.json next to report.json: per source path, its size, mtime, SHA-256, id,
+    output path and report record, plus the config they were built with. lookup() returns
+    the stored record when the source and its output are unchanged, so reruns only
+    process new or changed files. Sources are compared by (mtime, size) first and only
+    hashed when those differ (a touched but identical file still counts as unchanged).
+    """
+
+    def __init__(self, path: Path, config: dict, force: bool = False):
+        self.path = path
+        self.config = config
+        self.entries: dict[str, dict] = {}
+        if path.exists() and not force:
+            try:
+                data = json.loads(path.read_text())
+            except (OSError, ValueError):
+                data = {}
+            if data.get("config") == config:
+                self.entries = data.get("entries", {})
+
+    def lookup(self, item: dict) -> dict | None:
+        """Stored record for item if its source and output are unchanged, else None."""
+        path = Path(item["path"])
+        entry = self.entries.get(str(path))
+        if entry is None or entry["id"] != item["id"]:
+            return None
+        outputs = [entry["out_path"]] + entry["record"].get("outputs", [])
+        if any(out_path and not Path(out_path).exists() for out_path in outputs):
+            return None
+        try:
+            st = path.stat()
+        except OSError:
+            return None
+        if st.st_size != entry["size"]:
+            return None
+        if st.st_mtime_ns != entry["mtime_ns"]:
+            if _file_sha256(path) != entry["sha256"]:
+                return None
+            entry["mtime_ns"] = st.st_mtime_ns
+        return entry["record"]
+
+    def store(self, rec: dict) -> None:
+        path = Path(rec["path"])
+        try:
+            st = path.stat()
+            sha = _file_sha256(path)
+        except OSError:
+            return
+        self.entries[str(path)] = {
+            "id": rec["id"],
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "sha256": sha,
+            "out_path": rec.get("out_path"),
+            "record": rec,
+        }
+
+    def collect_garbage(self) -> int:
+        """Delete outputs (and entries) whose source file is gone. Returns outputs removed."""
+        removed = 0
+        for source, entry in list(self.entries.items()):
+            if os.path.exists(source):
+                continue
+            for out_path in [entry["out_path"]] + entry["record"].get("outputs", []):
+                if not out_path:
+                    continue
+                try:
+                    os.remove(out_path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+            del self.entries[source]
+        return removed
+
+    def sweep_outputs(self, out_dir: Path) -> int:
+        """
+        Delete image files in out_dir that no entry references: outputs of sources whose
+        entries were dropped by --force or a config change (other ids, sizes, formats).
+        Returns files removed.
+        """
+        keep = {
+            os.path.abspath(out_path)
+            for entry in self.entries.values()
+            for out_path in [entry["out_path"]] + entry["record"].get("outputs", [])
+            if out_path
+        }
+        suffixes = set(OUTPUT_FORMATS.values())
+        removed = 0
+        for path in out_dir.iterdir() if out_dir.is_dir() else ():
+            if path.suffix.lower() in suffixes and path.is_file() and os.path.abspath(path) not in keep:
+                path.unlink(missing_ok=True)
+                removed += 1
+        return removed
+
+    def save(self) -> None:
+        data = {"config": self.config, "entries": self.entries}
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(data))
+        tmp.replace(self.path)
+
+
 def main() -> None:
+    global DETECTOR, DETECTOR_MODEL, DETECTOR_CONFIG, DETECT_MAX_SIDE, DETECT_REFINE, DECODE_MIN_SIDE, PROFILE, OUTPUTS, NORMALIZE
     parser = argparse.ArgumentParser(
         description="Download images from CSV, crop to 300×300 headshots, normalize style."
     )
@@ -317,6 +590,11 @@ def main() -> None:
         action="store_true",
         help="Skip download; use existing files in output-dir/downloaded",
     )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Re-detect and re-crop every image, ignoring manifest.json",
+    )
     parser.add_argument(
         "--url-column",
         default="headshot_url",
@@ -327,7 +605,116 @@ def main() -> None:
         default="predictor_name",
         help="CSV column for identifier (default: predictor_name for data/predictions.csv)",
     )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DOWNLOAD_CONCURRENCY,
+        help=f"Max downloads in flight overall (default: {DOWNLOAD_CONCURRENCY})",
+    )
+    parser.add_argument(
+        "--per-host",
+        type=int,
+        default=DOWNLOAD_PER_HOST,
+        help=f"Max downloads in flight per hostname (default: {DOWNLOAD_PER_HOST})",
+    )
+    parser.add_argument(
+        "--max-download-mb",
+        type=float,
+        default=MAX_DOWNLOAD_MB,
+        help=f"Drop downloads larger than this many MB (default: {MAX_DOWNLOAD_MB})",
+    )
+    parser.add_argument(
+        "--http-cache",
+        type=Path,
+        default=DEFAULT_HTTP_CACHE_DIR,
+        help="HTTP response cache for downloads (default: scripts/.http_cache)",
+    )
+    parser.add_argument(
+        "--http-cache-max-mb",
+        type=float,
+        default=HTTP_CACHE_MAX_MB,
+        help=f"Evict least-recently-used HTTP cache entries above this size (default: {HTTP_CACHE_MAX_MB})",
+    )
+    parser.add_argument(
+        "--no-http-cache",
+        action="store_true",
+        help="Always download in full; do not read or write the HTTP cache",
+    )
+    parser.add_argument(
+        "--profile",
+        choices=sorted(PROFILES),
+        default=PROFILE.name,
+        help=f"Crop geometry profile (default: {PROFILE.name})",
+    )
+    parser.add_argument(
+        "--detector",
+        choices=DETECTOR_BACKENDS,
+        default=DETECTOR,
+        help="Face detector backend (default: haar; yunet/ssd need --detector-model)",
+    )
+    parser.add_argument(
+        "--detector-model",
+        help="Model file: YuNet .onnx, or SSD .caffemodel",
+    )
+    parser.add_argument(
+        "--detector-config",
+        help="SSD .prototxt (ssd backend only)",
+    )
+    parser.add_argument(
+        "--detect-max-side",
+        type=int,
+        default=DETECT_MAX_SIDE,
+        help="Detect faces on a copy downscaled to this longest side, mapping rects back (default: 0, full resolution)",
+    )
+    parser.add_argument(
+        "--detect-refine",
+        action="store_true",
+        help="With --detect-max-side, re-detect each face in a full-resolution ROI (haar)",
+    )
+    parser.add_argument(
+        "--decode-min-side",
+        type=int,
+        default=DECODE_MIN_SIDE,
+        help="Decode JPEGs at 1/2-1/8 scale while the shorter side stays >= this (default: 0, full decode)",
+    )
+    parser.add_argument(
+        "--sizes",
+        type=parse_sizes,
+        default=OUTPUTS.sizes,
+        help="Also write these avatar sizes as <id>-<px>.<ext>, e.g. 64,96,150,300 (default: none)",
+    )
+    parser.add_argument(
+        "--retina",
+        action="store_true",
+        help="With --sizes, also write 2x variants (e.g. 128 for 64)",
+    )
+    parser.add_argument(
+        "--formats",
+        type=parse_formats,
+        default=OUTPUTS.formats,
+        help="Formats for --sizes outputs: jpeg,webp,avif (default: jpeg; avif only if Pillow supports it)",
+    )
+    parser.add_argument(
+        "--normalize",
+        action="store_true",
+        help="Normalize brightness/contrast/color toward the batch median before encoding",
+    )
     args = parser.parse_args()
+    PROFILE = PROFILES[args.profile]
+    OUTPUTS = AvatarOutputs(args.sizes, args.retina, args.formats)
+    if OUTPUTS.sizes and "avif" in OUTPUTS.formats and not AVIF_SUPPORTED:
+        print("Note: this Pillow build cannot encode AVIF; writing the other formats only.")
+    DETECTOR = args.detector
+    DETECTOR_MODEL = args.detector_model
+    DETECTOR_CONFIG = args.detector_config
+    DETECT_MAX_SIDE = args.detect_max_side
+    DETECT_REFINE = args.detect_refine
+    DECODE_MIN_SIDE = args.decode_min_side
+    NORMALIZE = args.normalize
+    try:
+        detector = _face_detector()
+    except ValueError as e:
+        parser.error(str(e))
 
     base = args.output_dir.resolve()
     downloaded_dir = base / "downloaded"
@@ -346,7 +733,17 @@ def main() -> None:
     elif not args.skip_download:
         if not args.sources.exists():
             raise SystemExit(f"Sources CSV not found: {args.sources}")
-        downloaded = download_images(args.sources, downloaded_dir, args.url_column, args.id_column)
+        downloaded = download_images(
+            args.sources,
+            downloaded_dir,
+            args.url_column,
+            args.id_column,
+            concurrency=args.concurrency,
+            per_host=args.per_host,
+            http_cache_dir=None if args.no_http_cache else args.http_cache,
+            max_download_mb=args.max_download_mb,
+            http_cache_max_mb=args.http_cache_max_mb,
+        )
         if not downloaded:
             raise SystemExit("No images downloaded.")
     else:
@@ -359,14 +756,42 @@ def main() -> None:
         if not downloaded:
             raise SystemExit("No images in downloaded dir. Run without --skip-download first.")
 
-    cascade = _face_detector()
-    print("Pass 1: Detecting faces and computing crop regions...")
-    records = pass1_detect(downloaded, cascade)
-    print("Pass 2: Cropping to 300×300...")
-    pass2_crop(records, cropped_dir)
+    print(f"Detecting faces and cropping to {PROFILE.target_size}×{PROFILE.target_size}...")
+    manifest = BuildManifest(base / "manifest.json", manifest_config(detector), force=args.force)
+    removed = manifest.collect_garbage()
+    if removed:
+        print(f"Removed {removed} outputs whose source is gone")
+    records = [manifest.lookup(item) for item in downloaded]
+    todo = [i for i, rec in enumerate(records) if rec is None]
+    pending = [] if NORMALIZE else None
+    stale: list[int] = []
+    for i, rec in zip(todo, iter_pipeline([downloaded[i] for i in todo], detector, cropped_dir, pending)):
+        print(f"  {rec['id']}: {rec['status']}")
+        records[i] = rec
+    if NORMALIZE:
+        # Unchanged records keep their stored brightness, so the reference covers the whole
+        # batch; reused outputs normalized against a different reference are re-encoded
+        ref_median = reference_brightness(records)
+        rebuilt = set(todo)
+        stale = [i for i in stale_normalized(records, ref_median) if i not in rebuilt]
+        for i in stale:
+            recrop_record(records[i], cropped_dir, pending)
+        if stale:
+            print(f"  {len(stale)} unchanged images renormalized (reference brightness changed)")
+        if pending:
+            save_normalized(pending, cropped_dir, ref_median)
+            print(f"Normalized {len(pending)} images (reference brightness ≈ {ref_median:.0f})")
+    for i in todo + stale:
+        manifest.store(records[i])
+    if args.file is None:
+        # A single-file run does not see the other sources, so it must not sweep their outputs
+        swept = manifest.sweep_outputs(cropped_dir)
+        if swept:
+            print(f"Removed {swept} outputs no manifest entry produces")
+    manifest.save()
+    if len(todo) < len(records):
+        print(f"  {len(records) - len(todo)} unchanged (from manifest)")
     write_report(records, report_path)
-    # print("Pass 3: Normalizing brightness/color...")
-    # pass3_normalize(cropped_dir, records)
     print("Done. Cropped headshots in:", cropped_dir)
 
 
@@ -11,33 +11,84 @@ writing headshots_staging/cropped/{slug}.jpg. Skips when that file already exist
 from __future__ import annotations
 
 import argparse
+import csv
+import hashlib
+import json
+import queue
+import sqlite3
 import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 
 import cv2
 import numpy as np
-from PIL import Image
 
-# Optional: OCR to reject images with text/words (requires tesseract installed)
+from headshot_processor import (
+    AVIF_SUPPORTED,
+    DEDUP_MAX_DISTANCE,
+    DETECTOR_BACKENDS,
+    PROFILES,
+    AvatarOutputs,
+    FaceDetector,
+    ImageContext,
+    center_crop_rect,
+    classify_face_scale,
+    compute_crop_region,
+    crop_and_resize,
+    crop_image,
+    dhash,
+    dhash_image,
+    downscale_progressive,
+    face_centrality,
+    get_detector,
+    hamming,
+    near_duplicate_keep,
+    parse_formats,
+    parse_sizes,
+    reduction_for,
+    save_avatar_set,
+    save_jpeg,
+)
+
+# Optional: OCR to reject images with text/words (requires tesseract installed).
+# tesserocr binds the Tesseract C API (engines stay loaded); pytesseract runs the CLI per call.
 try:
     import pytesseract
     _HAS_PYTESSERACT = True
 except ImportError:
     _HAS_PYTESSERACT = False
+try:
+    import tesserocr
+    _HAS_TESSEROCR = True
+except ImportError:
+    _HAS_TESSEROCR = False
 
-# Reuse same geometry as process_headshots.py for consistent avatars
-TARGET_SIZE = 300
-IDEAL_FACE_FRAC_MIN = 0.22
-IDEAL_FACE_FRAC_MAX = 0.45
-# Slightly larger crop to include full head (face detector often misses forehead)
-CROP_FACE_SCALE = 2.8
-# Higher = crop center shifts up, more headroom (avoids cutting off top of head)
-FACE_OFFSET_UP = 0.55
+# Crop geometry (see headshot_processor.geometry.PROFILES); staging adds headroom for search results
+PROFILE = PROFILES["staging"]
 
 SCRIPT_DIR = Path(__file__).resolve().parent
 DEFAULT_STAGING_DIR = SCRIPT_DIR / "headshots_staging"
 CROPPED_SUBDIR = "cropped"
 
+# Face detector backend (see headshot_processor/detectors.py); yunet/ssd need local model files
+DETECTOR = "haar"
+DETECTOR_MODEL: str | None = None
+DETECTOR_CONFIG: str | None = None
+# Haar detection on images larger than this (longest side, px) runs on a downscaled copy
+# (0 = always full resolution); DETECT_REFINE re-detects each face in a full-resolution ROI
+DETECT_MAX_SIDE = 0
+DETECT_REFINE = False
+# Decode JPEG candidates at 1/2, 1/4 or 1/8 scale while the shorter side stays >= this
+# (0 = full decode). Faces and crops stay in source pixels; sharpness, brightness and OCR
+# run on the reduced pixels. The winner's crop is decoded with >= PROFILE.target_size px.
+DECODE_MIN_SIDE = 0
+
+# Extra avatar sizes/formats written next to cropped/{slug}.jpg (default: none, see AvatarOutputs)
+OUTPUTS = AvatarOutputs()
+
 # Minimum face height (px) to consider image acceptable
 MIN_FACE_HEIGHT = 40
 # Brightness: reject if mean gray outside this range (avoid near-black or blown out)
@@ -46,101 +97,325 @@ BRIGHTNESS_MAX = 232
 # Text: reject if OCR finds at least this many words (or this many alpha chars)
 TEXT_WORD_THRESHOLD = 2
 TEXT_CHAR_THRESHOLD = 12
+# Text pre-filter: skip OCR unless lines of >= TEXT_LINE_MIN_GLYPHS character-like blobs hold
+# >= TEXT_MIN_GLYPHS in total (two 2-letter words, on one line or two, are the least text
+# that can pass the thresholds above)
+TEXT_PREFILTER = True
+TEXT_LINE_MIN_GLYPHS = 2
+TEXT_MIN_GLYPHS = 4
+TEXT_DETECT_MAX_SIDE = 1000
+# If detected lines cover more than this fraction of the image, OCR the whole frame instead
+TEXT_REGION_MAX_COVER = 0.5
 
+# Analysis cache: analyze_candidate results keyed by file content + detector/config fingerprint
+ANALYSIS_CACHE_FILENAME = ".analysis_cache.sqlite"
+ANALYSIS_CACHE_MAX_MB = 64
 
-def _face_detector():
-    return cv2.CascadeClassifier(
-        cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
-    )
+# Near-duplicate candidates (same picture under different URLs) are dropped before analysis:
+# "slug" within each predictor, "global" across predictors too, "off" analyzes every file
+DEDUP = "slug"
+DEDUP_MODES = ("off", "slug", "global")
+
+# Candidate scoring (score_candidate, and score_table for many candidates at once)
+STATUS_BONUS = {
+    "ok": 2.0,
+    "too_close": 1.0,
+    "too_far": 0.5,
+    "face_too_small": 0.3,
+    "multi_face": 0.2,
+    "no_face": 0.0,
+}
+SHARPNESS_FULL = 500.0  # Laplacian variance that earns the full sharpness point
+TEXT_PENALTY = 1.5
+BRIGHTNESS_PENALTY = 0.5
+# Prefer portrait or square (h/w >= 1); penalize very wide (group/crowd)
+ASPECT_WIDE = 0.55
+ASPECT_BONUS = 0.3
+ASPECT_WIDE_PENALTY = 0.5
+# Prefer face near center of frame (face_centrality: 0 = centered, 1 = at the edge)
+CENTRALITY_NEAR = 0.2
+CENTRALITY_FAR = 0.5
+CENTRALITY_BONUS = 0.2
+
+# Tunable weights, in score_features() column order; current values from the constants above
+SCORE_WEIGHT_NAMES = tuple(STATUS_BONUS) + (
+    "sharpness", "text_penalty", "brightness_penalty",
+    "aspect_bonus", "aspect_wide_penalty", "centrality_bonus", "centrality_far_penalty",
+)
+# --replay: random weight sets tried (plus the current one), scored in batches of this many
+REPLAY_TRIALS = 2000
+REPLAY_BATCH = 500
 
+# Columnar view of candidate records for score_table / best_per_slug; status is an index
+# into STATUS_CODES (len(STATUS_CODES) for anything unknown, scored 0 like score_candidate)
+STATUS_CODES = tuple(STATUS_BONUS)
+CANDIDATE_DTYPE = np.dtype([
+    ("slug", np.int32),
+    ("status", np.int8),
+    ("sharpness", np.float64),
+    ("aspect_ratio", np.float64),
+    ("face_centrality", np.float64),
+    ("has_text", np.bool_),
+    ("bad_brightness", np.bool_),
+])
 
-def detect_all_faces(image_path: Path, cascade) -> list[tuple[int, int, int, int]]:
+# OCR engine: "auto" prefers tesserocr, falls back to pytesseract; OCR_WORKERS engines/threads per process
+OCR_BACKEND = "auto"
+OCR_WORKERS = 2
+
+
+def _face_detector() -> FaceDetector:
+    return get_detector(DETECTOR, DETECTOR_MODEL, DETECTOR_CONFIG, DETECT_MAX_SIDE, DETECT_REFINE)
+
+
+def detect_all_faces(image_path: Path, detector: FaceDetector) -> list[tuple[int, int, int, int]]:
     """Return all faces (x, y, w, h) sorted by area descending."""
-    img = cv2.imread(str(image_path))
-    if img is None:
+    ctx = ImageContext.load(image_path)
+    if ctx is None:
         return []
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    faces = cascade.detectMultiScale(
-        gray,
-        scaleFactor=1.1,
-        minNeighbors=5,
-        minSize=(30, 30),
-        flags=cv2.CASCADE_SCALE_IMAGE,
-    )
-    rects = [(int(x), int(y), int(w), int(h)) for (x, y, w, h) in faces]
-    return sorted(rects, key=lambda r: r[2] * r[3], reverse=True)
-
-
-def center_crop_rect(img_shape: tuple[int, ...]) -> tuple[int, int, int, int]:
-    """Square center crop (x1, y1, x2, y2) for image with no face."""
-    h_img, w_img = img_shape[:2]
-    side = min(h_img, w_img)
-    x1 = (w_img - side) // 2
-    y1 = (h_img - side) // 2
-    return (x1, y1, x1 + side, y1 + side)
-
-
-def compute_crop_region(
-    img_shape: tuple[int, int],
-    face: tuple[int, int, int, int],
-) -> tuple[int, int, int, int]:
-    """Compute (x1, y1, x2, y2) square crop for head+bust from face (x,y,w,h)."""
-    h_img, w_img = img_shape[:2]
-    fx, fy, fw, fh = face
-    fcx = fx + fw / 2
-    fcy = fy + fh / 2
-    side = int(fh * CROP_FACE_SCALE)
-    side = max(side, TARGET_SIZE // 2)
-    cy = fcy - side * (FACE_OFFSET_UP - 0.5)
-    cx = fcx
-    x1 = int(cx - side / 2)
-    y1 = int(cy - side / 2)
-    x2 = x1 + side
-    y2 = y1 + side
-    x1 = max(0, min(x1, w_img - side))
-    y1 = max(0, min(y1, h_img - side))
-    x2 = min(w_img, x1 + side)
-    y2 = min(h_img, y1 + side)
-    w_crop = x2 - x1
-    h_crop = y2 - y1
-    if w_crop > h_crop:
-        d = (w_crop - h_crop) // 2
-        x1 += d
-        x2 -= w_crop - h_crop - d
-    elif h_crop > w_crop:
-        d = (h_crop - w_crop) // 2
-        y1 += d
-        y2 -= h_crop - w_crop - d
-    return (x1, y1, x2, y2)
+    return detector.detect(ctx.img, ctx.gray)
+
+
+def laplacian_variance(gray: np.ndarray) -> float:
+    """Laplacian variance of a gray image: higher = sharper."""
+    return float(cv2.Laplacian(gray, cv2.CV_64F).var())
 
 
 def sharpness_variance(image_path: Path) -> float:
     """Laplacian variance: higher = sharper. Returns 0 if image cannot be read."""
-    img = cv2.imread(str(image_path))
-    if img is None:
+    ctx = ImageContext.load(image_path)
+    if ctx is None:
         return 0.0
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    return float(cv2.Laplacian(gray, cv2.CV_64F).var())
+    return laplacian_variance(ctx.gray)
 
 
-def has_significant_text(image_path: Path) -> bool:
+class OcrBackend(ABC):
     """
-    True if the image contains enough text (words/overlay) to reject for avatar use.
-    Requires pytesseract and system Tesseract. Returns False if OCR unavailable.
+    OCR engine behind text_in_image. Subclasses implement _recognize(gray, psm); this
+    base times every call and runs batches on OCR_WORKERS threads (both engines
+    release the GIL while Tesseract works).
+    """
+
+    name = "ocr"
+
+    def __init__(self, workers: int = OCR_WORKERS):
+        self.workers = max(1, workers)
+        self.calls = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self._lock = threading.Lock()
+        self._executor: ThreadPoolExecutor | None = None
+
+    @abstractmethod
+    def _recognize(self, gray: np.ndarray, psm: int | None) -> str:
+        """Text Tesseract reads in a gray image (psm: page segmentation mode, None = automatic)."""
+
+    def image_to_string(self, gray: np.ndarray, psm: int | None = None) -> str:
+        start = time.perf_counter()
+        try:
+            return self._recognize(gray, psm)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.calls += 1
+                self.seconds += elapsed
+                self.max_seconds = max(self.max_seconds, elapsed)
+
+    def image_to_strings(self, grays: list[np.ndarray], psm: int | None = None) -> list[str]:
+        if len(grays) < 2 or self.workers < 2:
+            return [self.image_to_string(g, psm) for g in grays]
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers)
+        return list(self._executor.map(lambda g: self.image_to_string(g, psm), grays))
+
+    def stats(self) -> dict:
+        return {"calls": self.calls, "seconds": self.seconds, "max_seconds": self.max_seconds}
+
+
+class PytesseractBackend(OcrBackend):
+    """Current path: one tesseract process per call, image passed through a temp file."""
+
+    name = "pytesseract"
+
+    def _recognize(self, gray: np.ndarray, psm: int | None) -> str:
+        return pytesseract.image_to_string(gray, config=f"--psm {psm}" if psm is not None else "")
+
+
+class TesserocrBackend(OcrBackend):
+    """
+    Pool of long-lived Tesseract engines (tesserocr / C API), one per worker thread.
+    Pixels go straight from the numpy buffer into the engine: no process start, no temp files.
+    """
+
+    name = "tesserocr"
+
+    def __init__(self, workers: int = OCR_WORKERS):
+        super().__init__(workers)
+        self._engines: queue.SimpleQueue = queue.SimpleQueue()
+        for _ in range(self.workers):
+            # Raises RuntimeError when no tessdata/language is installed
+            self._engines.put(tesserocr.PyTessBaseAPI(lang="eng"))
+
+    def _recognize(self, gray: np.ndarray, psm: int | None) -> str:
+        engine = self._engines.get()
+        try:
+            engine.SetPageSegMode(psm if psm is not None else tesserocr.PSM.AUTO)
+            gray = np.ascontiguousarray(gray)
+            engine.SetImageBytes(gray.tobytes(), gray.shape[1], gray.shape[0], 1, gray.strides[0])
+            return engine.GetUTF8Text()
+        finally:
+            self._engines.put(engine)
+
+
+_ocr_backend: OcrBackend | None = None
+_ocr_backend_resolved = False
+
+
+def get_ocr_backend() -> OcrBackend | None:
+    """
+    The process-wide OCR engine for OCR_BACKEND, created on first use. None when no
+    engine is available (text filtering is then skipped).
+    """
+    global _ocr_backend, _ocr_backend_resolved
+    if _ocr_backend_resolved:
+        return _ocr_backend
+    _ocr_backend_resolved = True
+    if OCR_BACKEND in ("auto", "tesserocr") and _HAS_TESSEROCR:
+        try:
+            _ocr_backend = TesserocrBackend(OCR_WORKERS)
+            return _ocr_backend
+        except RuntimeError as e:
+            if OCR_BACKEND == "tesserocr":
+                print(f"Note: tesserocr unavailable ({e}); skipping text-overlay filter.", file=sys.stderr)
+                return None
+    if OCR_BACKEND in ("auto", "pytesseract") and _HAS_PYTESSERACT:
+        _ocr_backend = PytesseractBackend(OCR_WORKERS)
+    return _ocr_backend
+
+
+def _glyph_boxes(gray: np.ndarray) -> list[tuple[int, int, int, int]]:
+    """MSER blobs shaped like single characters (x, y, w, h)."""
+    mser = cv2.MSER_create(delta=5, min_area=20, max_area=max(21, int(gray.size * 0.01)))
+    regions, boxes = mser.detectRegions(gray)
+    h_img = gray.shape[0]
+    glyphs = set()
+    for (x, y, w, h), pts in zip(boxes, regions):
+        if h < 6 or h > h_img * 0.2 or not (0.1 <= w / h <= 1.5):
+            continue
+        if not (0.2 <= len(pts) / float(w * h) <= 0.9):
+            continue
+        glyphs.add((int(x), int(y), int(w), int(h)))
+    return sorted(glyphs)
+
+
+def _group_text_lines(glyphs: list[tuple[int, int, int, int]]) -> list[tuple[tuple[int, int, int, int], int]]:
+    """
+    Chain glyphs left to right into lines: similar height, same baseline band, gaps
+    under ~1.2 glyph heights. Returns (line box, glyph count) for lines with at least
+    TEXT_LINE_MIN_GLYPHS glyphs.
+    """
+    used = [False] * len(glyphs)
+    lines = []
+    for i, first in enumerate(glyphs):
+        if used[i]:
+            continue
+        used[i] = True
+        line = [first]
+        last = first
+        for j in range(i + 1, len(glyphs)):
+            if used[j]:
+                continue
+            g = glyphs[j]
+            size = max(last[3], g[3])
+            if size / min(last[3], g[3]) > 1.5:
+                continue
+            if abs((last[1] + last[3] / 2) - (g[1] + g[3] / 2)) > 0.4 * size:
+                continue
+            gap = g[0] - (last[0] + last[2])
+            if gap > 3 * size:
+                break  # sorted by x: nothing further can join
+            if gap > 1.2 * size:
+                continue
+            used[j] = True
+            if gap < -0.5 * min(last[2], g[2]):
+                continue  # nested MSER box of a glyph already in the line
+            line.append(g)
+            last = g
+        if len(line) >= TEXT_LINE_MIN_GLYPHS:
+            x1 = min(g[0] for g in line)
+            y1 = min(g[1] for g in line)
+            x2 = max(g[0] + g[2] for g in line)
+            y2 = max(g[1] + g[3] for g in line)
+            lines.append(((x1, y1, x2 - x1, y2 - y1), len(line)))
+    return lines
+
+
+def text_regions(gray: np.ndarray) -> list[tuple[int, int, int, int]]:
+    """
+    Cheap text detector: MSER character candidates grouped into horizontal lines.
+    Returns line boxes (x, y, w, h) in gray's coordinates; empty means no text-like
+    structure (fewer than TEXT_MIN_GLYPHS glyphs over all lines), so OCR can be skipped.
+    Runs on a copy capped at TEXT_DETECT_MAX_SIDE.
+    """
+    h, w = gray.shape[:2]
+    scale = min(1.0, TEXT_DETECT_MAX_SIDE / max(h, w))
+    small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale < 1 else gray
+    lines = _group_text_lines(_glyph_boxes(small))
+    if sum(n for _, n in lines) < TEXT_MIN_GLYPHS:
+        return []
+    return [
+        (int(x / scale), int(y / scale), int(rw / scale), int(rh / scale))
+        for (x, y, rw, rh), _ in lines
+    ]
+
+
+def _ocr_text_regions(
+    ocr: OcrBackend,
+    gray: np.ndarray,
+    regions: list[tuple[int, int, int, int]],
+) -> str:
+    """OCR each padded line crop (upscaled to a readable height) and join the text."""
+    h_img, w_img = gray.shape[:2]
+    crops = []
+    for x, y, w, h in regions:
+        pad = max(2, int(h * 0.3))
+        crop = gray[max(0, y - pad):min(h_img, y + h + pad), max(0, x - pad):min(w_img, x + w + pad)]
+        if h < 40:
+            crop = cv2.resize(crop, None, fx=40 / h, fy=40 / h, interpolation=cv2.INTER_LINEAR)
+        crops.append(crop)
+    # psm 7: treat each crop as a single text line
+    return "\n".join(t.strip() for t in ocr.image_to_strings(crops, psm=7))
+
+
+def text_in_image(img: np.ndarray, gray: np.ndarray | None = None) -> bool:
+    """
+    True if the BGR image contains enough text (words/overlay) to reject for avatar use.
+    With TEXT_PREFILTER, images without text-like regions are text-free without OCR and
+    only the detected lines are OCR'd; word/char thresholds apply to all text found.
+    Requires tesserocr or pytesseract + system Tesseract. Returns False if OCR unavailable.
     """
-    if not _HAS_PYTESSERACT:
+    ocr = get_ocr_backend()
+    if ocr is None:
         return False
     try:
-        img = cv2.imread(str(image_path))
-        if img is None:
-            return False
-        # Slight upscale can help OCR on small text
-        h, w = img.shape[:2]
-        if max(h, w) < 400:
-            scale = 400 / max(h, w)
-            img = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_LINEAR)
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        text = pytesseract.image_to_string(gray).strip()
+        if gray is None:
+            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        text = None
+        if TEXT_PREFILTER:
+            regions = text_regions(gray)
+            if not regions:
+                return False
+            area = sum(w * h for _, _, w, h in regions)
+            if area <= TEXT_REGION_MAX_COVER * gray.shape[0] * gray.shape[1]:
+                text = _ocr_text_regions(ocr, gray, regions)
+        if text is None:
+            # Slight upscale can help OCR on small text
+            h, w = img.shape[:2]
+            if max(h, w) < 400:
+                scale = 400 / max(h, w)
+                img = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_LINEAR)
+                gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+            text = ocr.image_to_string(gray).strip()
         # Count words (split on whitespace, ignore single-char tokens as noise)
         words = [t for t in text.split() if len(t) > 1]
         alpha_chars = sum(1 for c in text if c.isalpha())
@@ -149,29 +424,30 @@ def has_significant_text(image_path: Path) -> bool:
         return False
 
 
-def mean_brightness(image_path: Path) -> float:
-    """Mean intensity of gray image. Returns 0 if unreadable."""
-    img = cv2.imread(str(image_path))
-    if img is None:
-        return 0.0
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+def has_significant_text(image_path: Path) -> bool:
+    """
+    True if the image contains enough text (words/overlay) to reject for avatar use.
+    Requires tesserocr or pytesseract + system Tesseract. Returns False if OCR unavailable.
+    """
+    if get_ocr_backend() is None:
+        return False
+    ctx = ImageContext.load(image_path)
+    if ctx is None:
+        return False
+    return text_in_image(ctx.img, ctx.gray)
+
+
+def gray_mean(gray: np.ndarray) -> float:
+    """Mean intensity of a gray image."""
     return float(np.mean(gray))
 
 
-def face_centrality(face: tuple[int, int, int, int], img_shape: tuple[int, ...]) -> float:
-    """
-    Normalized distance from face center to image center (0 = centered, 1 = corner).
-    Lower is better for a portrait.
-    """
-    h_img, w_img = img_shape[:2]
-    fx, fy, fw, fh = face
-    fcx = fx + fw / 2
-    fcy = fy + fh / 2
-    img_cx = w_img / 2
-    img_cy = h_img / 2
-    dist = ((fcx - img_cx) ** 2 + (fcy - img_cy) ** 2) ** 0.5
-    diag = (w_img**2 + h_img**2) ** 0.5
-    return dist / diag if diag > 0 else 0.0
+def mean_brightness(image_path: Path) -> float:
+    """Mean intensity of gray image. Returns 0 if unreadable."""
+    ctx = ImageContext.load(image_path)
+    if ctx is None:
+        return 0.0
+    return gray_mean(ctx.gray)
 
 
 def group_staging_files(staging_dir: Path) -> dict[str, list[Path]]:
@@ -199,29 +475,69 @@ def group_staging_files(staging_dir: Path) -> dict[str, list[Path]]:
     return groups
 
 
+def _dedup_paths(paths: list[Path], hashes: dict[Path, tuple[int, int] | None]) -> list[Path]:
+    """paths minus near-duplicates (highest resolution kept), in the original order; unreadable files stay."""
+    readable = [p for p in paths if hashes[p] is not None]
+    keep = near_duplicate_keep([hashes[p][0] for p in readable], [hashes[p][1] for p in readable])
+    dropped = {p for p, k in zip(readable, keep) if not k}
+    return [p for p in paths if p not in dropped]
+
+
+def dedup_work(
+    work: list[tuple[str, list[Path], Path]],
+    mode: str = DEDUP,
+) -> tuple[list[tuple[str, list[Path], Path]], int]:
+    """
+    Drop near-duplicate candidates (dHash, see headshot_processor.dedup) before analysis,
+    keeping the highest-resolution copy of each cluster. mode "slug" dedups within each
+    predictor; "global" also across predictors, but never drops a predictor's last
+    candidate. Returns (work, number of candidates dropped = analyses saved).
+    """
+    if mode == "off":
+        return work, 0
+    hashes = {p: dhash(p) for _, paths, _ in work for p in paths}
+    if mode == "global":
+        survivors = set(_dedup_paths(list(hashes), hashes))
+    deduped = []
+    for slug, paths, out_path in work:
+        kept = _dedup_paths(paths, hashes)
+        if mode == "global":
+            kept = [p for p in kept if p in survivors] or [max(kept, key=lambda p: (hashes[p] or (0, 0))[1])]
+        deduped.append((slug, kept, out_path))
+    dropped = sum(len(paths) for _, paths, _ in work) - sum(len(paths) for _, paths, _ in deduped)
+    return deduped, dropped
+
+
 def analyze_candidate(
     path: Path,
-    cascade,
+    detector: FaceDetector,
+    ctx: ImageContext | None = None,
+    ocr: bool = True,
 ) -> dict | None:
     """
     Analyze one image for avatar suitability. Always returns a record when image is
     readable (so we can pick "best" even when none are ideal). Uses center crop for
     0 faces, largest face for 2+. Records has_text, bad_brightness, and status for scoring.
+    The file is decoded once (or not at all when ctx is given); every metric runs on
+    the same pixels. With ocr=False, has_text is left as None for resolve_text().
     Returns None only if image cannot be read.
     """
-    img = cv2.imread(str(path))
-    if img is None:
+    if ctx is None:
+        ctx = ImageContext.load_reduced(path, DECODE_MIN_SIDE)
+    if ctx is None:
         return None
-    has_text = has_significant_text(path)
-    brightness = mean_brightness(path)
+    img = ctx.img
+    has_text = text_in_image(img, ctx.gray) if ocr else None
+    brightness = gray_mean(ctx.gray)
     bad_brightness = brightness < BRIGHTNESS_MIN or brightness > BRIGHTNESS_MAX
-    faces = detect_all_faces(path, cascade)
-    h_img, w_img = img.shape[:2]
+    faces = [ctx.rect_to_full(f) for f in detector.detect(img, ctx.gray)]
+    shape = ctx.full_shape
+    h_img, w_img = shape[:2]
     aspect = h_img / w_img if w_img else 1.0
-    sharp = sharpness_variance(path)
+    sharp = laplacian_variance(ctx.gray)
 
     if len(faces) == 0:
-        crop_rect = center_crop_rect(img.shape)
+        crop_rect = center_crop_rect(shape)
         return {
             "path": path,
             "face": None,
@@ -238,21 +554,15 @@ def analyze_candidate(
         }
     face = faces[0]
     fh = face[3]
-    crop_rect = compute_crop_region(img.shape, face)
+    crop_rect = compute_crop_region(shape, face, PROFILE)
     x1, y1, x2, y2 = crop_rect
     crop_side = min(x2 - x1, y2 - y1)
-    face_frac = fh / crop_side if crop_side else 0
+    face_frac, status = classify_face_scale(fh, crop_side, PROFILE)
     if len(faces) > 1:
         status = "multi_face"
     elif fh < MIN_FACE_HEIGHT:
         status = "face_too_small"
-    elif face_frac < IDEAL_FACE_FRAC_MIN:
-        status = "too_far"
-    elif face_frac > IDEAL_FACE_FRAC_MAX:
-        status = "too_close"
-    else:
-        status = "ok"
-    centrality = face_centrality(face, img.shape)
+    centrality = face_centrality(face, shape)
     return {
         "path": path,
         "face": face,
@@ -269,64 +579,556 @@ def analyze_candidate(
     }
 
 
+def analysis_fingerprint(detector: FaceDetector) -> str:
+    """
+    Hash of everything that affects an analyze_candidate result besides the pixels:
+    the detector (backend, settings, model/cascade file), face/brightness/text thresholds,
+    text pre-filter, crop geometry and OCR engine.
+    """
+    h = hashlib.sha256()
+    config = {
+        "detector": detector.fingerprint(),
+        "min_face_height": MIN_FACE_HEIGHT,
+        "brightness": [BRIGHTNESS_MIN, BRIGHTNESS_MAX],
+        "text": [TEXT_WORD_THRESHOLD, TEXT_CHAR_THRESHOLD],
+        "text_prefilter": [TEXT_PREFILTER, TEXT_LINE_MIN_GLYPHS, TEXT_MIN_GLYPHS, TEXT_DETECT_MAX_SIDE, TEXT_REGION_MAX_COVER],
+        "ocr": ocr.name if (ocr := get_ocr_backend()) is not None else None,
+        "geometry": PROFILE.as_dict(),
+        "decode_min_side": DECODE_MIN_SIDE,
+    }
+    h.update(json.dumps(config, sort_keys=True).encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+class AnalysisCache:
+    """
+    Single-file SQLite store of analyze_candidate results, keyed by SHA-256 of the
+    file content plus analysis_fingerprint(). Unreadable images are cached too (as
+    null). evict() trims least-recently-used rows down to max_bytes of record JSON.
+    Safe to open from several worker processes at once (WAL, autocommit).
+    """
+
+    def __init__(self, path: Path, fingerprint: str, max_bytes: int = ANALYSIS_CACHE_MAX_MB * 1024 * 1024):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(path), timeout=30, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS analyses (
+                content_hash TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                record TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (content_hash, fingerprint)
+            )"""
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS analyses_last_used ON analyses (last_used)")
+
+    def get(self, content_hash: str) -> tuple[bool, dict | None]:
+        """(found, record). record is None for a cached unreadable image."""
+        row = self._db.execute(
+            "SELECT record FROM analyses WHERE content_hash = ? AND fingerprint = ?",
+            (content_hash, self.fingerprint),
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        self._db.execute(
+            "UPDATE analyses SET last_used = ? WHERE content_hash = ? AND fingerprint = ?",
+            (time.time(), content_hash, self.fingerprint),
+        )
+        return True, json.loads(row[0])
+
+    def put(self, content_hash: str, record: dict | None) -> None:
+        data = json.dumps(record)
+        self._db.execute(
+            "INSERT OR REPLACE INTO analyses VALUES (?, ?, ?, ?, ?)",
+            (content_hash, self.fingerprint, data, len(data), time.time()),
+        )
+
+    def evict(self) -> int:
+        """Delete least-recently-used rows until total size <= max_bytes. Returns rows deleted."""
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM analyses").fetchone()[0]
+        if total <= self.max_bytes:
+            return 0
+        deleted = 0
+        rows = self._db.execute("SELECT rowid, size FROM analyses ORDER BY last_used").fetchall()
+        self._db.execute("BEGIN")
+        for rowid, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM analyses WHERE rowid = ?", (rowid,))
+            total -= size
+            deleted += 1
+        self._db.execute("COMMIT")
+        return deleted
+
+    def close(self) -> None:
+        self._db.close()
+
+
+def _record_to_json(rec: dict) -> dict:
+    out = {k: v for k, v in rec.items() if k not in ("path", "score", "content_hash")}
+    out["face"] = list(rec["face"]) if rec["face"] is not None else None
+    out["crop_rect"] = list(rec["crop_rect"])
+    return out
+
+
+def _record_from_json(data: dict, path: Path) -> dict:
+    rec = dict(data)
+    rec["path"] = path
+    rec["face"] = tuple(data["face"]) if data["face"] is not None else None
+    rec["crop_rect"] = tuple(data["crop_rect"])
+    return rec
+
+
+def analyze_candidate_cached(
+    path: Path,
+    detector: FaceDetector,
+    cache: AnalysisCache | None,
+    ocr: bool = True,
+) -> dict | None:
+    """
+    analyze_candidate, answered from cache when this exact file content was analyzed
+    before. A cached record whose OCR was deferred gets it now if ocr=True.
+    """
+    if cache is None:
+        return analyze_candidate(path, detector, ocr=ocr)
+    try:
+        data = path.read_bytes()
+    except OSError:
+        return None
+    content_hash = hashlib.sha256(data).hexdigest()
+    found, cached = cache.get(content_hash)
+    if found:
+        if cached is None:
+            return None
+        rec = _record_from_json(cached, path)
+        rec["content_hash"] = content_hash
+        if ocr and rec["has_text"] is None:
+            resolve_text(rec, cache, ImageContext.load_reduced(path, DECODE_MIN_SIDE, data))
+        return rec
+    ctx = ImageContext.load_reduced(path, DECODE_MIN_SIDE, data)
+    rec = analyze_candidate(path, detector, ctx, ocr=ocr) if ctx is not None else None
+    cache.put(content_hash, _record_to_json(rec) if rec is not None else None)
+    if rec is not None:
+        rec["content_hash"] = content_hash
+    return rec
+
+
+def resolve_text(rec: dict, cache: AnalysisCache | None = None, ctx: ImageContext | None = None) -> None:
+    """Run the deferred OCR for a record analyzed with ocr=False; updates the cache entry too."""
+    if rec["has_text"] is not None:
+        return
+    if ctx is None:
+        ctx = ImageContext.load_reduced(Path(rec["path"]), DECODE_MIN_SIDE)
+    rec["has_text"] = text_in_image(ctx.img, ctx.gray) if ctx is not None else False
+    if cache is not None and rec.get("content_hash"):
+        cache.put(rec["content_hash"], _record_to_json(rec))
+
+
+def pick_best(candidates: list[dict], cache: AnalysisCache | None = None) -> dict:
+    """
+    Highest-scoring candidate (first one on ties, like max()). Candidates whose OCR was
+    deferred (has_text None) are scored optimistically as text-free; OCR then runs in
+    descending score order only while a candidate could still reach the best confirmed
+    score, since has_text can only lower a score. The pick matches eager OCR.
+    """
+    for c, score in zip(candidates, score_table(candidate_table(candidates)).tolist()):
+        c["score"] = score
+    best_score = float("-inf")
+    for c in sorted(candidates, key=lambda c: c["score"], reverse=True):
+        if c["score"] < best_score:
+            break
+        if c["has_text"] is None:
+            resolve_text(c, cache)
+            c["score"] = score_candidate(c)
+        best_score = max(best_score, c["score"])
+    return max(candidates, key=lambda c: c["score"])
+
+
 def score_candidate(c: dict) -> float:
     """
     Higher = better avatar. Combines framing, sharpness, aspect ratio, face centrality.
     Penalties for text overlay, bad brightness, and non-ideal face (so we prefer
     acceptable images but can fall back to best available when none are acceptable).
     """
-    status_bonus = {
-        "ok": 2.0,
-        "too_close": 1.0,
-        "too_far": 0.5,
-        "face_too_small": 0.3,
-        "multi_face": 0.2,
-        "no_face": 0.0,
-    }.get(c["status"], 0)
-    sharp = min(c["sharpness"] / 500.0, 1.0)
+    status_bonus = STATUS_BONUS.get(c["status"], 0)
+    sharp = min(c["sharpness"] / SHARPNESS_FULL, 1.0)
     # Penalties for fallback-quality issues
     if c.get("has_text"):
-        status_bonus -= 1.5
+        status_bonus -= TEXT_PENALTY
     if c.get("bad_brightness"):
-        status_bonus -= 0.5
-    # Prefer portrait or square; penalize very wide (group/crowd)
+        status_bonus -= BRIGHTNESS_PENALTY
     aspect = c.get("aspect_ratio", 1.0)
     if aspect >= 1.0:
-        aspect_bonus = 0.3
-    elif aspect < 0.55:
-        aspect_bonus = -0.5
+        aspect_bonus = ASPECT_BONUS
+    elif aspect < ASPECT_WIDE:
+        aspect_bonus = -ASPECT_WIDE_PENALTY
     else:
         aspect_bonus = 0.0
-    # Prefer face near center of frame
     centrality = c.get("face_centrality", 0.5)
-    if centrality <= 0.2:
-        centrality_bonus = 0.2
-    elif centrality > 0.5:
-        centrality_bonus = -0.2
+    if centrality <= CENTRALITY_NEAR:
+        centrality_bonus = CENTRALITY_BONUS
+    elif centrality > CENTRALITY_FAR:
+        centrality_bonus = -CENTRALITY_BONUS
     else:
         centrality_bonus = 0.0
     return status_bonus + sharp + aspect_bonus + centrality_bonus
 
 
+def candidate_table(candidates: list[dict], slugs: list[int] | None = None) -> np.ndarray:
+    """
+    CANDIDATE_DTYPE array with one row per record (same order). slugs gives each record's
+    group id for best_per_slug (default: all 0). Deferred OCR (has_text None) counts as
+    no text, as in score_candidate.
+    """
+    codes = {status: i for i, status in enumerate(STATUS_CODES)}
+    table = np.zeros(len(candidates), dtype=CANDIDATE_DTYPE)
+    if slugs is not None:
+        table["slug"] = slugs
+    table["status"] = [codes.get(c["status"], len(STATUS_CODES)) for c in candidates]
+    table["sharpness"] = [c["sharpness"] for c in candidates]
+    table["aspect_ratio"] = [c.get("aspect_ratio", 1.0) for c in candidates]
+    table["face_centrality"] = [c.get("face_centrality", 0.5) for c in candidates]
+    table["has_text"] = [bool(c.get("has_text")) for c in candidates]
+    table["bad_brightness"] = [bool(c.get("bad_brightness")) for c in candidates]
+    return table
+
+
+def current_score_weights() -> np.ndarray:
+    """The weights score_candidate uses, as a SCORE_WEIGHT_NAMES vector."""
+    return np.array(list(STATUS_BONUS.values()) + [
+        1.0, TEXT_PENALTY, BRIGHTNESS_PENALTY,
+        ASPECT_BONUS, ASPECT_WIDE_PENALTY, CENTRALITY_BONUS, CENTRALITY_BONUS,
+    ])
+
+
+def score_table(table: np.ndarray) -> np.ndarray:
+    """
+    score_candidate for every row of a candidate_table at once. Terms are added in the
+    same order as score_candidate, so scores (and therefore ties) are bit-identical.
+    """
+    status_bonus = np.array(list(STATUS_BONUS.values()) + [0.0])[table["status"]]
+    status_bonus = status_bonus - np.where(table["has_text"], TEXT_PENALTY, 0.0)
+    status_bonus = status_bonus - np.where(table["bad_brightness"], BRIGHTNESS_PENALTY, 0.0)
+    sharp = np.minimum(table["sharpness"] / SHARPNESS_FULL, 1.0)
+    aspect = table["aspect_ratio"]
+    aspect_bonus = np.where(aspect >= 1.0, ASPECT_BONUS, np.where(aspect < ASPECT_WIDE, -ASPECT_WIDE_PENALTY, 0.0))
+    centrality = table["face_centrality"]
+    centrality_bonus = np.where(
+        centrality <= CENTRALITY_NEAR, CENTRALITY_BONUS, np.where(centrality > CENTRALITY_FAR, -CENTRALITY_BONUS, 0.0)
+    )
+    return status_bonus + sharp + aspect_bonus + centrality_bonus
+
+
+def score_features(table: np.ndarray) -> np.ndarray:
+    """
+    (rows, SCORE_WEIGHT_NAMES) feature matrix of a candidate_table: score_candidate is
+    linear in its weights, so features @ weights equals it (up to float rounding).
+    """
+    features = np.zeros((len(table), len(SCORE_WEIGHT_NAMES)))
+    known = table["status"] < len(STATUS_BONUS)
+    features[np.flatnonzero(known), table["status"][known]] = 1.0
+    columns = {name: i for i, name in enumerate(SCORE_WEIGHT_NAMES)}
+    aspect, centrality = table["aspect_ratio"], table["face_centrality"]
+    features[:, columns["sharpness"]] = np.minimum(table["sharpness"] / SHARPNESS_FULL, 1.0)
+    # Penalties are subtracted: -1.0 where they apply
+    features[:, columns["text_penalty"]] = -1.0 * table["has_text"]
+    features[:, columns["brightness_penalty"]] = -1.0 * table["bad_brightness"]
+    features[:, columns["aspect_bonus"]] = aspect >= 1.0
+    features[:, columns["aspect_wide_penalty"]] = -1.0 * (aspect < ASPECT_WIDE)
+    features[:, columns["centrality_bonus"]] = centrality <= CENTRALITY_NEAR
+    features[:, columns["centrality_far_penalty"]] = -1.0 * (centrality > CENTRALITY_FAR)
+    return features
+
+
+def best_per_slug(table: np.ndarray, scores: np.ndarray) -> dict[int, int]:
+    """
+    {slug id: row index of its highest score}, for every slug in the table in one pass;
+    the first row wins ties, like max() over that slug's candidates.
+    """
+    if not len(table):
+        return {}
+    order = np.lexsort((np.arange(len(table)), -scores, table["slug"]))
+    slugs = table["slug"][order]
+    first = np.flatnonzero(np.r_[True, slugs[1:] != slugs[:-1]])
+    return dict(zip(slugs[first].tolist(), order[first].tolist()))
+
+
+def load_replay_records(
+    groups: dict[str, list[Path]],
+    cache: AnalysisCache,
+) -> tuple[dict[str, list[dict]], int, int]:
+    """
+    Cached analysis records per slug, for --replay. Files are hashed; only candidates
+    whose OCR was deferred (--ocr lazy) are decoded, to run it (and cache it): replayed
+    weight sets vary the text penalty, so every candidate needs a real has_text.
+    Returns (records, candidates skipped because this configuration never analyzed
+    them, candidates OCR'd now).
+    """
+    records: dict[str, list[dict]] = {}
+    missing = resolved = 0
+    for slug, paths in groups.items():
+        for path in paths:
+            try:
+                content_hash = hashlib.sha256(path.read_bytes()).hexdigest()
+            except OSError:
+                continue
+            found, data = cache.get(content_hash)
+            if not found:
+                missing += 1
+                continue
+            if data is None:
+                continue
+            rec = _record_from_json(data, path)
+            rec["content_hash"] = content_hash
+            if rec["has_text"] is None:
+                resolve_text(rec, cache)
+                resolved += 1
+            records.setdefault(slug, []).append(rec)
+    return records, missing, resolved
+
+
+def _crop_dhash(rec: dict) -> int | None:
+    """dHash of a candidate's crop (as crop_and_save would cut it), from a small decode."""
+    x1, y1, x2, y2 = rec["crop_rect"]
+    ctx = ImageContext.load(Path(rec["path"]), reduction_for(min(x2 - x1, y2 - y1), 64))
+    if ctx is None:
+        return None
+    crop = crop_and_resize(ctx.img, ctx.rect_from_full(rec["crop_rect"]), 64)
+    return dhash_image(crop) if crop is not None else None
+
+
+def load_approved(source: Path, records: dict[str, list[dict]]) -> dict[str, set[int]]:
+    """
+    Human-approved picks as {slug: indices into records[slug]}. source is either a CSV of
+    slug,candidate-file rows, or a folder of approved avatars ({slug}.jpg, e.g.
+    public/headshots or a reviewed cropped/), matched to the candidate whose crop has
+    the nearest dHash (within DEDUP_MAX_DISTANCE). Slugs that match nothing are left out.
+    """
+    approved: dict[str, set[int]] = {}
+    if source.is_dir():
+        for slug, recs in records.items():
+            avatar = dhash(source / f"{slug}.jpg") if (source / f"{slug}.jpg").exists() else None
+            if avatar is None:
+                continue
+            dist = {i: hamming(avatar[0], h) for i, h in enumerate(map(_crop_dhash, recs)) if h is not None}
+            if dist and min(dist.values()) <= DEDUP_MAX_DISTANCE:
+                approved[slug] = {i for i, d in dist.items() if d == min(dist.values())}
+        return approved
+    with open(source, newline="", encoding="utf-8") as f:
+        for row in csv.reader(f):
+            if len(row) < 2 or row[0].strip() not in records:
+                continue
+            slug, name = row[0].strip(), Path(row[1].strip()).name
+            hits = {i for i, rec in enumerate(records[slug]) if Path(rec["path"]).name == name}
+            if hits:
+                approved.setdefault(slug, set()).update(hits)
+    return approved
+
+
+def random_score_weights(count: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    count weight sets drawn uniformly from [0, 2x current] per weight ([0, 1] where the
+    current weight is 0). Sharpness stays 1: scaling every weight alike never changes a pick.
+    """
+    current = current_score_weights()
+    high = np.where(current > 0, 2 * current, 1.0)
+    weights = rng.uniform(0.0, 1.0, (count, len(current))) * high
+    weights[:, SCORE_WEIGHT_NAMES.index("sharpness")] = 1.0
+    return weights
+
+
+def replay_agreement(table: np.ndarray, approved: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """
+    Fraction of slugs whose pick under each weight set (rows of weights) is an approved
+    row; approved is a per-row mask over a candidate_table. All sets are scored with
+    one matrix product, then each slug's candidates are padded to a common length so
+    argmax (first maximum, like pick_best) picks per slug and set at once. Scores can
+    differ from score_candidate in the last bit, which only matters for exact ties.
+    """
+    scores = score_features(table) @ np.atleast_2d(weights).T
+    slug_ids, rows_per_slug = np.unique(table["slug"], return_counts=True)
+    order = np.argsort(table["slug"], kind="stable")
+    starts = np.r_[0, np.cumsum(rows_per_slug)[:-1]]
+    slot = np.arange(len(table)) - np.repeat(starts, rows_per_slug)
+    # padded[g, j] = row of slug g's j-th candidate; padding points at an appended -inf row
+    padded = np.full((len(slug_ids), rows_per_slug.max()), len(table))
+    padded[np.repeat(np.arange(len(slug_ids)), rows_per_slug), slot] = order
+    scores = np.vstack([scores, np.full(scores.shape[1], -np.inf)])
+    picks = np.take_along_axis(padded, scores[padded].argmax(axis=1), axis=1)
+    return approved[picks].mean(axis=0)
+
+
+def run_replay(
+    approved_source: Path,
+    groups: dict[str, list[Path]],
+    cache: AnalysisCache,
+    trials: int = REPLAY_TRIALS,
+    seed: int | None = None,
+    report_path: Path | None = None,
+) -> None:
+    """
+    --replay: re-rank cached analyses under the current and trials random weight sets
+    and print how often each agrees with the approved picks (best sets first).
+    """
+    records, missing, resolved = load_replay_records(groups, cache)
+    approved = load_approved(approved_source, records)
+    if not approved:
+        print(f"No approved pick in {approved_source} matches a cached candidate.", file=sys.stderr)
+        sys.exit(1)
+    slugs = sorted(approved)
+    recs = [rec for slug in slugs for rec in records[slug]]
+    table = candidate_table(recs, [i for i, slug in enumerate(slugs) for _ in records[slug]])
+    mask = np.array([i in approved[slug] for slug in slugs for i in range(len(records[slug]))])
+    print(f"Replay: {len(slugs)} approved predictors, {len(recs)} cached candidates"
+          f" ({missing} never analyzed with these settings, {resolved} OCR'd now)")
+
+    # The current weights go through score_table, so exact ties break as in a real run
+    current = np.mean([mask[row] for row in best_per_slug(table, score_table(table)).values()])
+    trial_weights = random_score_weights(trials, np.random.default_rng(seed))
+    start = time.perf_counter()
+    agreement = np.concatenate([[current]] + [
+        replay_agreement(table, mask, trial_weights[i:i + REPLAY_BATCH]) for i in range(0, trials, REPLAY_BATCH)
+    ])
+    elapsed = time.perf_counter() - start
+    weights = np.vstack([current_score_weights(), trial_weights])
+    print(f"{trials} weight sets in {elapsed:.2f}s ({trials / max(elapsed, 1e-9):.0f}/s)")
+
+    def describe(i: int) -> str:
+        w = ", ".join(f"{name}={v:.2f}" for name, v in zip(SCORE_WEIGHT_NAMES, weights[i]))
+        return f"{agreement[i]:6.1%} ({round(agreement[i] * len(slugs))}/{len(slugs)})  {w}"
+
+    print(f"current: {describe(0)}")
+    for rank, i in enumerate(np.argsort(-agreement, kind="stable")[:5], 1):
+        print(f"#{rank}:     {describe(i)}")
+    if report_path is not None:
+        with open(report_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(("agreement",) + SCORE_WEIGHT_NAMES)
+            for a, w in zip(agreement, weights):
+                writer.writerow([f"{a:.4f}"] + [f"{v:.4f}" for v in w])
+        print(f"Wrote {len(weights)} weight sets to {report_path}")
+
+
 def crop_and_save(record: dict, out_path: Path) -> None:
-    """Crop image to record['crop_rect'], resize to TARGET_SIZE, save as JPEG."""
-    path = Path(record["path"])
-    img = cv2.imread(str(path))
-    if img is None:
-        return
+    """
+    Crop image to record['crop_rect'], resize to the profile's target size, save as JPEG.
+    With OUTPUTS sizes, every size/format variant is written next to it, all downscaled
+    progressively from the one crop.
+    """
+    sides = (PROFILE.target_size,) + OUTPUTS.pixel_sizes()
     x1, y1, x2, y2 = record["crop_rect"]
-    crop = img[y1:y2, x1:x2]
-    if crop.size == 0:
+    reduce = reduction_for(min(x2 - x1, y2 - y1), max(sides)) if DECODE_MIN_SIDE else 1
+    ctx = ImageContext.load(Path(record["path"]), reduce)
+    if ctx is None:
         return
-    crop_rgb = cv2.cvtColor(crop, cv2.COLOR_BGR2RGB)
-    pil_crop = Image.fromarray(crop_rgb)
-    resized = pil_crop.resize(
-        (TARGET_SIZE, TARGET_SIZE),
-        resample=Image.LANCZOS,
-        reducing_gap=3,
-    )
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    resized.save(str(out_path), "JPEG", quality=92)
+    crop = crop_image(ctx.img, ctx.rect_from_full(record["crop_rect"]))
+    if crop is None:
+        return
+    avatars = downscale_progressive(crop, sides)
+    save_jpeg(avatars[PROFILE.target_size], out_path)
+    if OUTPUTS.sizes:
+        save_avatar_set(avatars, out_path.parent, out_path.stem, OUTPUTS)
+
+
+def process_group(
+    slug: str,
+    paths: list[Path],
+    out_path: Path,
+    detector: FaceDetector,
+    cache: AnalysisCache | None = None,
+    lazy_ocr: bool = False,
+) -> dict:
+    """
+    Analyze and score every candidate for one predictor, crop the best to out_path.
+    With lazy_ocr, OCR only runs on finalists (see pick_best).
+    Returns {slug, processed, error, lines}; lines are (stream, text) pairs for the
+    caller to print, so parallel workers can have their output merged in slug order.
+    """
+    candidates = []
+    for p in paths:
+        rec = analyze_candidate_cached(p, detector, cache, ocr=not lazy_ocr)
+        if rec is not None:
+            candidates.append(rec)
+    if not candidates:
+        msg = f"No image could be read for '{slug}' ({len(paths)} files)."
+        return {"slug": slug, "processed": False, "error": msg, "lines": [("stderr", msg)]}
+    best = pick_best(candidates, cache)
+    crop_and_save(best, out_path)
+    acceptable = best["status"] == "ok" and not best.get("has_text") and not best.get("bad_brightness")
+    fallback_note = "" if acceptable else " (fallback: no ideal image)"
+    line = f"{slug}: chose {Path(best['path']).name} (status={best['status']}, sharpness={best['sharpness']:.0f}) -> {out_path.name}{fallback_note}"
+    return {"slug": slug, "processed": True, "error": None, "lines": [("stdout", line)]}
+
+
+def apply_settings(settings: dict) -> None:
+    """Set the module-level geometry/detection/OCR options chosen on the command line (also run in each worker)."""
+    global TEXT_PREFILTER, OCR_BACKEND, OCR_WORKERS, DETECTOR, DETECTOR_MODEL, DETECTOR_CONFIG
+    global DETECT_MAX_SIDE, DETECT_REFINE, DECODE_MIN_SIDE, PROFILE, OUTPUTS
+    PROFILE = PROFILES[settings["profile"]]
+    OUTPUTS = AvatarOutputs(*settings["outputs"])
+    DETECTOR = settings["detector"]
+    DETECTOR_MODEL = settings["detector_model"]
+    DETECTOR_CONFIG = settings["detector_config"]
+    DETECT_MAX_SIDE = settings["detect_max_side"]
+    DETECT_REFINE = settings["detect_refine"]
+    DECODE_MIN_SIDE = settings["decode_min_side"]
+    TEXT_PREFILTER = settings["text_prefilter"]
+    OCR_BACKEND = settings["ocr_backend"]
+    OCR_WORKERS = settings["ocr_workers"]
+
+
+# Per-process detector and cache connection for --jobs workers (neither can be pickled)
+_worker_detector = None
+_worker_cache: AnalysisCache | None = None
+_worker_lazy_ocr = False
+
+
+def _init_worker(cache_path: Path | None, fingerprint: str, settings: dict) -> None:
+    global _worker_detector, _worker_cache, _worker_lazy_ocr
+    # One process per core already; keep OpenCV from spawning its own thread pool in each
+    cv2.setNumThreads(1)
+    apply_settings(settings)
+    _worker_detector = _face_detector()
+    _worker_lazy_ocr = settings["lazy_ocr"]
+    if cache_path is not None:
+        _worker_cache = AnalysisCache(cache_path, fingerprint)
+
+
+def _process_group_in_worker(work: tuple[str, list[Path], Path]) -> dict:
+    slug, paths, out_path = work
+    ocr = get_ocr_backend()
+    ocr_before = ocr.stats() if ocr is not None else None
+    hits, misses = (_worker_cache.hits, _worker_cache.misses) if _worker_cache is not None else (0, 0)
+    result = process_group(slug, paths, out_path, _worker_detector, _worker_cache, _worker_lazy_ocr)
+    if _worker_cache is not None:
+        result["cache_hits"] = _worker_cache.hits - hits
+        result["cache_misses"] = _worker_cache.misses - misses
+    if ocr is not None:
+        after = ocr.stats()
+        result["ocr"] = {
+            "calls": after["calls"] - ocr_before["calls"],
+            "seconds": after["seconds"] - ocr_before["seconds"],
+            "max_seconds": after["max_seconds"],
+        }
+    return result
+
+
+def _report_group(result: dict, errors: list[str]) -> int:
+    """Print a process_group result and collect its error. Returns 1 if a crop was written."""
+    for stream, text in result["lines"]:
+        print(text, file=sys.stderr if stream == "stderr" else sys.stdout)
+    if result["error"]:
+        errors.append(result["error"])
+    return 1 if result["processed"] else 0
 
 
 def main() -> None:
@@ -340,7 +1142,166 @@ def main() -> None:
         default=DEFAULT_STAGING_DIR,
         help=f"Staging directory (default: {DEFAULT_STAGING_DIR})",
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Score predictors in N worker processes (default: 1, no pool)",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Re-pick and overwrite predictors that already have a cropped output",
+    )
+    parser.add_argument(
+        "--cache",
+        type=Path,
+        default=None,
+        help=f"Analysis cache file (default: <staging-dir>/{ANALYSIS_CACHE_FILENAME})",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Do not read or write the analysis cache",
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=float,
+        default=ANALYSIS_CACHE_MAX_MB,
+        help=f"Evict least-recently-used cache entries above this size (default: {ANALYSIS_CACHE_MAX_MB})",
+    )
+    parser.add_argument(
+        "--ocr",
+        choices=("lazy", "eager"),
+        default="lazy",
+        help="lazy: OCR only candidates that could still win after the text penalty; "
+        "eager: OCR every candidate (default: lazy; both pick the same image)",
+    )
+    parser.add_argument(
+        "--dedup",
+        choices=DEDUP_MODES,
+        default=DEDUP,
+        help="Skip near-duplicate candidates (dHash) within each predictor (slug, default), across all (global), or not (off)",
+    )
+    parser.add_argument(
+        "--sizes",
+        type=parse_sizes,
+        default=OUTPUTS.sizes,
+        help="Also write these avatar sizes as cropped/<slug>-<px>.<ext>, e.g. 64,96,150,300 (default: none)",
+    )
+    parser.add_argument(
+        "--retina",
+        action="store_true",
+        help="With --sizes, also write 2x variants (e.g. 128 for 64)",
+    )
+    parser.add_argument(
+        "--formats",
+        type=parse_formats,
+        default=OUTPUTS.formats,
+        help="Formats for --sizes outputs: jpeg,webp,avif (default: jpeg; avif only if Pillow supports it)",
+    )
+    parser.add_argument(
+        "--replay",
+        type=Path,
+        metavar="APPROVED",
+        help="Tune scoring weights offline: re-rank cached analyses under random weight sets and report "
+        "agreement with approved picks (CSV of slug,candidate-file rows, or a folder of {slug}.jpg avatars)",
+    )
+    parser.add_argument(
+        "--replay-trials",
+        type=int,
+        default=REPLAY_TRIALS,
+        help=f"Random weight sets to try besides the current one (default: {REPLAY_TRIALS})",
+    )
+    parser.add_argument(
+        "--replay-seed",
+        type=int,
+        default=None,
+        help="Seed for the random weight sets (default: random)",
+    )
+    parser.add_argument(
+        "--replay-report",
+        type=Path,
+        default=None,
+        help="Write every weight set and its agreement rate to this CSV",
+    )
+    parser.add_argument(
+        "--no-text-prefilter",
+        action="store_true",
+        help="OCR the whole frame of every candidate instead of only detected text lines",
+    )
+    parser.add_argument(
+        "--ocr-backend",
+        choices=("auto", "tesserocr", "pytesseract"),
+        default=OCR_BACKEND,
+        help="auto: long-lived tesserocr engines when installed, else pytesseract (default: auto)",
+    )
+    parser.add_argument(
+        "--ocr-workers",
+        type=int,
+        default=OCR_WORKERS,
+        help=f"OCR engines/threads per process for text-line crops (default: {OCR_WORKERS})",
+    )
+    parser.add_argument(
+        "--profile",
+        choices=sorted(PROFILES),
+        default=PROFILE.name,
+        help=f"Crop geometry profile (default: {PROFILE.name})",
+    )
+    parser.add_argument(
+        "--detector",
+        choices=DETECTOR_BACKENDS,
+        default=DETECTOR,
+        help="Face detector backend (default: haar; yunet/ssd need --detector-model)",
+    )
+    parser.add_argument(
+        "--detector-model",
+        help="Model file: YuNet .onnx, or SSD .caffemodel",
+    )
+    parser.add_argument(
+        "--detector-config",
+        help="SSD .prototxt (ssd backend only)",
+    )
+    parser.add_argument(
+        "--detect-max-side",
+        type=int,
+        default=DETECT_MAX_SIDE,
+        help="Detect faces on a copy downscaled to this longest side, mapping rects back (default: 0, full resolution)",
+    )
+    parser.add_argument(
+        "--detect-refine",
+        action="store_true",
+        help="With --detect-max-side, re-detect each face in a full-resolution ROI (haar)",
+    )
+    parser.add_argument(
+        "--decode-min-side",
+        type=int,
+        default=DECODE_MIN_SIDE,
+        help="Decode JPEG candidates at 1/2-1/8 scale while the shorter side stays >= this (default: 0, full decode)",
+    )
     args = parser.parse_args()
+    settings = {
+        "profile": args.profile,
+        "detector": args.detector,
+        "detector_model": args.detector_model,
+        "detector_config": args.detector_config,
+        "detect_max_side": args.detect_max_side,
+        "detect_refine": args.detect_refine,
+        "decode_min_side": args.decode_min_side,
+        "outputs": (args.sizes, args.retina, args.formats),
+        "lazy_ocr": args.ocr == "lazy",
+        "text_prefilter": not args.no_text_prefilter,
+        "ocr_backend": args.ocr_backend,
+        "ocr_workers": args.ocr_workers,
+    }
+    apply_settings(settings)
+    try:
+        detector = _face_detector()
+    except ValueError as e:
+        parser.error(str(e))
+    if OUTPUTS.sizes and "avif" in OUTPUTS.formats and not AVIF_SUPPORTED:
+        print("Note: this Pillow build cannot encode AVIF; writing the other formats only.", file=sys.stderr)
     staging_dir = args.staging_dir.resolve()
     cropped_dir = staging_dir / CROPPED_SUBDIR
 
@@ -353,34 +1314,76 @@ def main() -> None:
         print("No staging groups found (expect files named {slug}-1.jpg, {slug}-2.jpg, ...).", file=sys.stderr)
         sys.exit(1)
 
-    if not _HAS_PYTESSERACT:
-        print("Note: pytesseract not installed; skipping text-overlay filter (install pytesseract + tesseract to exclude images with words).", file=sys.stderr)
-    cascade = _face_detector()
+    if get_ocr_backend() is None:
+        print("Note: no OCR engine available; skipping text-overlay filter (install tesserocr, or pytesseract + tesseract, to exclude images with words).", file=sys.stderr)
+    if args.replay is not None:
+        if args.no_cache:
+            print("--replay re-ranks cached analyses; it cannot be combined with --no-cache.", file=sys.stderr)
+            sys.exit(1)
+        replay_groups = {slug: paths for slug, paths, _ in dedup_work(
+            [(slug, groups[slug], cropped_dir / f"{slug}.jpg") for slug in sorted(groups)], args.dedup
+        )[0]}
+        cache = AnalysisCache(args.cache or staging_dir / ANALYSIS_CACHE_FILENAME, analysis_fingerprint(detector))
+        try:
+            run_replay(args.replay, replay_groups, cache, args.replay_trials, args.replay_seed, args.replay_report)
+        finally:
+            cache.close()
+        return
+
     errors: list[str] = []
     processed = 0
 
+    work = []
     for slug in sorted(groups.keys()):
         out_path = cropped_dir / f"{slug}.jpg"
-        if out_path.exists():
+        if out_path.exists() and not args.force:
             continue  # already have cropped output; skip
-        paths = groups[slug]
-        candidates = []
-        for p in paths:
-            rec = analyze_candidate(p, cascade)
-            if rec is not None:
-                rec["score"] = score_candidate(rec)
-                candidates.append(rec)
-        if not candidates:
-            msg = f"No image could be read for '{slug}' ({len(paths)} files)."
-            errors.append(msg)
-            print(msg, file=sys.stderr)
-            continue
-        best = max(candidates, key=lambda c: c["score"])
-        crop_and_save(best, out_path)
-        acceptable = best["status"] == "ok" and not best.get("has_text") and not best.get("bad_brightness")
-        fallback_note = "" if acceptable else " (fallback: no ideal image)"
-        print(f"{slug}: chose {Path(best['path']).name} (status={best['status']}, sharpness={best['sharpness']:.0f}) -> {out_path.name}{fallback_note}")
-        processed += 1
+        work.append((slug, groups[slug], out_path))
+
+    work, deduped = dedup_work(work, args.dedup)
+    if deduped:
+        print(f"Dedup ({args.dedup}): skipped {deduped} near-duplicate candidates ({deduped} analyses saved)")
+
+    cache_path = None if args.no_cache else (args.cache or staging_dir / ANALYSIS_CACHE_FILENAME)
+    fingerprint = analysis_fingerprint(detector)
+    cache = AnalysisCache(cache_path, fingerprint, int(args.cache_max_mb * 1024 * 1024)) if cache_path else None
+    cache_hits = cache_misses = 0
+    ocr_calls, ocr_seconds, ocr_max = 0, 0.0, 0.0
+
+    if args.jobs > 1 and len(work) > 1:
+        # map() yields in submission order, so output and errors stay in slug order
+        with ProcessPoolExecutor(
+            max_workers=args.jobs,
+            initializer=_init_worker,
+            initargs=(cache_path, fingerprint, settings),
+        ) as pool:
+            for result in pool.map(_process_group_in_worker, work):
+                processed += _report_group(result, errors)
+                cache_hits += result.get("cache_hits", 0)
+                cache_misses += result.get("cache_misses", 0)
+                if "ocr" in result:
+                    ocr_calls += result["ocr"]["calls"]
+                    ocr_seconds += result["ocr"]["seconds"]
+                    ocr_max = max(ocr_max, result["ocr"]["max_seconds"])
+    else:
+        for slug, paths, out_path in work:
+            result = process_group(slug, paths, out_path, detector, cache, settings["lazy_ocr"])
+            processed += _report_group(result, errors)
+        if cache is not None:
+            cache_hits, cache_misses = cache.hits, cache.misses
+        if (ocr := get_ocr_backend()) is not None:
+            ocr_calls, ocr_seconds, ocr_max = ocr.calls, ocr.seconds, ocr.max_seconds
+
+    if ocr_calls:
+        print(f"OCR ({get_ocr_backend().name}): {ocr_calls} calls, "
+              f"mean {ocr_seconds / ocr_calls * 1000:.0f} ms, max {ocr_max * 1000:.0f} ms, total {ocr_seconds:.1f}s")
+
+    if cache is not None:
+        evicted = cache.evict()
+        cache.close()
+        if cache_hits or cache_misses:
+            print(f"Analysis cache: {cache_hits} hits, {cache_misses} misses"
+                  + (f", evicted {evicted} entries" if evicted else ""))
 
     print(f"\nProcessed {processed} predictors; cropped headshots in {cropped_dir}")
     if errors:
@@ -0,0 +1,38 @@
+"""create_detector reports bad detector settings as ValueError, which the CLIs turn into parser.error."""
+
+import pytest
+
+from headshot_processor.detectors import create_detector
+
+
+@pytest.fixture
+def corrupt(tmp_path):
+    """A .onnx / .caffemodel / .prototxt trio OpenCV cannot parse."""
+    paths = {}
+    for name in ("model.onnx", "model.caffemodel", "deploy.prototxt"):
+        paths[name] = tmp_path / name
+        paths[name].write_text("not a model {")
+    return {name: str(path) for name, path in paths.items()}
+
+
+@pytest.mark.parametrize(
+    "args, message",
+    [
+        (("dlib",), "Unknown detector backend"),
+        (("yunet",), "needs --detector-model"),
+        (("ssd", "model.caffemodel"), "needs --detector-model"),
+        (("yunet", "missing.onnx"), "model file not found: missing.onnx"),
+        (("ssd", "model.caffemodel", "missing.prototxt"), "model file not found: missing.prototxt"),
+    ],
+)
+def test_bad_settings(args, message, corrupt, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with pytest.raises(ValueError, match=message):
+        create_detector(*args)
+
+
+def test_corrupt_models(corrupt):
+    with pytest.raises(ValueError, match=r"cannot load .*model\.onnx"):
+        create_detector("yunet", corrupt["model.onnx"])
+    with pytest.raises(ValueError, match=r"cannot load .*model\.caffemodel"):
+        create_detector("ssd", corrupt["model.caffemodel"], corrupt["deploy.prototxt"])
@@ -0,0 +1,36 @@
+"""process_headshots._download_all: per-host limits must not starve other hosts; bad URLs are skipped."""
+
+import asyncio
+
+import pytest
+
+import bench_headshots
+import process_headshots
+
+SLOW = 0.3  # seconds per response from the slow host
+
+
+@pytest.fixture
+def hosts():
+    image = bench_headshots._sample_jpeg(64)
+    slow = bench_headshots.start_latency_server(image, SLOW)
+    fast = bench_headshots.start_latency_server(image, 0.0)
+    # Different hostnames, so each gets its own per-host slot
+    yield f"http://localhost:{slow.server_address[1]}", f"http://127.0.0.1:{fast.server_address[1]}"
+    slow.shutdown()
+    fast.shutdown()
+
+
+def test_busy_host_does_not_block_others(hosts, tmp_path, capsys):
+    slow, fast = hosts
+    jobs = [(f"s{i}", f"{slow}/img/{i}.jpg", tmp_path / f"s{i}.jpg") for i in range(4)]
+    jobs += [("bad", "http://[::1/x.jpg", tmp_path / "bad.jpg")]
+    jobs += [(f"f{i}", f"{fast}/img/{i}.jpg", tmp_path / f"f{i}.jpg") for i in range(4)]
+
+    fetched = asyncio.run(process_headshots._download_all(jobs, concurrency=4, per_host=1))
+
+    assert [f and f["id"] for f in fetched] == ["s0", "s1", "s2", "s3", None, "f0", "f1", "f2", "f3"]
+    done = [line.split()[1] for line in capsys.readouterr().out.splitlines() if line.startswith("Downloaded:")]
+    # The slow host's queue waits on its own slot, not on global ones: every fast
+    # download finishes before the second slow one
+    assert done.index("s1.jpg") > max(done.index(f"f{i}.jpg") for i in range(4))
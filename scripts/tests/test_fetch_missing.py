@@ -0,0 +1,120 @@
+"""fetch_missing_headshots.fetch_all against the benchmark's local Serper /images mock."""
+
+import asyncio
+import time
+
+import pytest
+
+import bench_headshots
+import fetch_missing_headshots as fmh
+from headshot_processor import SearchCache
+
+PREDICTORS = 8
+RESULTS = 3
+RATE = 20.0  # searches per second
+
+
+# Result URLs neither urlsplit nor httpx can parse
+BAD_URLS = ("http://[::1/x.jpg", "http://a\x00b.com/x.jpg")
+
+
+@pytest.fixture
+def serper(request, monkeypatch):
+    """The Serper mock; parametrize indirectly with extra result URLs."""
+    images = bench_headshots.start_latency_server(bench_headshots._sample_jpeg(64), 0.0)
+    serper = bench_headshots.start_serper_mock(
+        f"http://127.0.0.1:{images.server_address[1]}/img", 0.0, RESULTS, getattr(request, "param", ())
+    )
+    monkeypatch.setattr(fmh, "SERPER_IMAGES_URL", f"http://127.0.0.1:{serper.server_address[1]}/images")
+    yield serper
+    serper.shutdown()
+    images.shutdown()
+
+
+def _missing() -> list[tuple[str, str, str]]:
+    return [(f"Person {i}", "Individual", f"person_{i}") for i in range(PREDICTORS)]
+
+
+def _staged_files(staging_dir) -> set[str]:
+    return {p.name for p in staging_dir.iterdir()}
+
+
+def test_searches_rate_limited_and_staged(serper, tmp_path):
+    staging = tmp_path / "staging"
+    staging.mkdir()
+    staged = asyncio.run(fmh.fetch_all(_missing(), "test", staging, search_rate=RATE))
+
+    assert serper.searches == PREDICTORS
+    assert sorted(query for _, query in serper.requests) == sorted(name for name, _, _ in _missing())
+    # Burst 1: every search after the first waits for a token
+    arrivals = sorted(t for t, _ in serper.requests)
+    assert arrivals[-1] - arrivals[0] >= 0.9 * (PREDICTORS - 1) / RATE
+    assert staged == {f"person_{i}": RESULTS for i in range(PREDICTORS)}
+    assert _staged_files(staging) == {
+        f"person_{i}-{n}.jpg" for i in range(PREDICTORS) for n in range(1, RESULTS + 1)
+    }
+
+
+def test_warm_search_cache_makes_no_calls(serper, tmp_path):
+    search_cache = SearchCache(tmp_path / "search.sqlite")
+    runs = []
+    for run in ("cold", "warm"):
+        staging = tmp_path / run
+        staging.mkdir()
+        calls = serper.searches
+        staged = asyncio.run(fmh.fetch_all(_missing(), "test", staging, search_rate=RATE, search_cache=search_cache))
+        runs.append((serper.searches - calls, staged, _staged_files(staging)))
+    assert (search_cache.hits, search_cache.misses) == (PREDICTORS, PREDICTORS)
+    search_cache.close()
+
+    (cold_calls, cold_staged, cold_files), (warm_calls, warm_staged, warm_files) = runs
+    assert cold_calls == PREDICTORS
+    assert warm_calls == 0
+    assert warm_staged == cold_staged
+    assert warm_files == cold_files
+
+
+@pytest.mark.parametrize("serper", [BAD_URLS], indirect=True)
+def test_malformed_result_urls_are_skipped(serper, tmp_path):
+    staging = tmp_path / "staging"
+    staging.mkdir()
+    staged = asyncio.run(fmh.fetch_all(_missing(), "test", staging, search_rate=RATE))
+
+    assert staged == {f"person_{i}": RESULTS for i in range(PREDICTORS)}
+    assert _staged_files(staging) == {
+        f"person_{i}-{n}.jpg" for i in range(PREDICTORS) for n in range(1, RESULTS + 1)
+    }
+
+
+def test_busy_host_does_not_block_others(tmp_path, monkeypatch):
+    """Downloads queued on one slow host wait on its per-host slot, not on global slots."""
+    image = bench_headshots._sample_jpeg(64)
+    slow = bench_headshots.start_latency_server(image, 0.2)
+    fast = bench_headshots.start_latency_server(image, 0.0)
+    fast_url = f"http://127.0.0.1:{fast.server_address[1]}/img/fast.jpg"
+    serper = bench_headshots.start_serper_mock(
+        f"http://localhost:{slow.server_address[1]}/img", 0.0, RESULTS, (fast_url,)
+    )
+    monkeypatch.setattr(fmh, "SERPER_IMAGES_URL", f"http://127.0.0.1:{serper.server_address[1]}/images")
+    finished: list[tuple[float, str]] = []
+    download_image = fmh.download_image
+
+    async def timed_download(client, url, dest, cache=None):
+        ok = await download_image(client, url, dest, cache)
+        finished.append((time.monotonic(), url))
+        return ok
+
+    monkeypatch.setattr(fmh, "download_image", timed_download)
+    staging = tmp_path / "staging"
+    staging.mkdir()
+    try:
+        staged = asyncio.run(fmh.fetch_all(_missing()[:2], "test", staging, search_rate=RATE, concurrency=2, per_host=1))
+    finally:
+        serper.shutdown()
+        slow.shutdown()
+        fast.shutdown()
+
+    assert staged == {"person_0": RESULTS + 1, "person_1": RESULTS + 1}
+    slow_done = sorted(t for t, url in finished if url != fast_url)
+    fast_done = [t for t, url in finished if url == fast_url]
+    assert len(fast_done) == 2 and max(fast_done) < slow_done[1]
@@ -0,0 +1,94 @@
+"""HttpCache against the benchmark's local server, which answers conditional GETs with 304."""
+
+import httpx
+import pytest
+
+import bench_headshots
+import process_headshots
+from headshot_processor import HttpCache
+
+COUNT = 20
+
+
+@pytest.fixture
+def server():
+    server = bench_headshots.start_latency_server(bench_headshots._sample_jpeg(64), 0.0)
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture
+def caches(monkeypatch):
+    """Every HttpCache download_images opens, so its counters can be read after close()."""
+    opened = []
+
+    class RecordingCache(HttpCache):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            opened.append(self)
+
+    monkeypatch.setattr(process_headshots, "HttpCache", RecordingCache)
+    return opened
+
+
+def test_warm_run_revalidates_every_url(server, caches, tmp_path):
+    port = server.server_address[1]
+    csv_path = tmp_path / "sources.csv"
+    rows = [f"person_{i},http://127.0.0.1:{port}/img/{i}.jpg" for i in range(COUNT)]
+    csv_path.write_text("id,image_url\n" + "\n".join(rows) + "\n")
+
+    def run() -> dict[str, bytes]:
+        results = process_headshots.download_images(
+            csv_path, tmp_path / "downloaded", http_cache_dir=tmp_path / "http_cache"
+        )
+        return {r["id"]: open(r["path"], "rb").read() for r in results}
+
+    cold = run()
+    cold_requests = list(server.requests)
+    warm = run()
+    warm_requests = server.requests[len(cold_requests):]
+
+    assert len(cold) == COUNT
+    assert [status for _, _, status in cold_requests] == [200] * COUNT
+    assert all("If-None-Match" not in headers for _, headers, _ in cold_requests)
+    assert len(warm_requests) == COUNT
+    for _, headers, status in warm_requests:
+        assert headers.get("If-None-Match")
+        assert headers.get("If-Modified-Since") == "Wed, 01 Jan 2025 00:00:00 GMT"
+        assert status == 304
+    assert (caches[0].hits, caches[0].misses) == (0, COUNT)
+    assert (caches[1].hits, caches[1].misses) == (COUNT, 0)
+    assert warm == cold
+
+
+def _headers(etag: str) -> httpx.Headers:
+    return httpx.Headers({"etag": etag, "content-type": "image/jpeg"})
+
+
+def test_replaced_body_is_deleted(tmp_path):
+    cache = HttpCache(tmp_path)
+    cache.put("http://a/1", _headers('"v1"'), b"x" * 100)
+    cache.put("http://a/2", _headers('"v1"'), b"x" * 100)  # same body, stored once
+    old = cache._object_path(cache._entry("http://a/1")[3])
+    cache.put("http://a/1", _headers('"v2"'), b"y" * 100)
+    assert old.exists()  # still referenced by http://a/2
+    cache.put("http://a/2", _headers('"v2"'), b"z" * 100)
+    assert not old.exists()
+    assert sum(1 for p in cache.objects.rglob("*") if p.is_file()) == 2
+    assert cache.stored_bytes() == 200
+    cache.close()
+
+
+def test_evict_least_recently_used(tmp_path):
+    cache = HttpCache(tmp_path, max_bytes=250)
+    for i in range(4):
+        cache.put(f"http://a/{i}", _headers(f'"{i}"'), bytes([i]) * 100)
+    assert cache.hit("http://a/0") is not None  # now the most recently used
+    assert cache.evict() == 2
+    assert cache.stored_bytes() == 200
+    assert [url for url in (f"http://a/{i}" for i in range(4)) if cache.request_headers(url)] == [
+        "http://a/0", "http://a/3"
+    ]
+    assert sum(1 for p in cache.objects.rglob("*") if p.is_file()) == 2
+    assert cache.evict() == 0
+    cache.close()
@@ -0,0 +1,136 @@
+"""
+--ocr lazy (pick_best OCRs only candidates that can still win) must pick exactly what
+--ocr eager (every candidate OCR'd, then max(score_candidate)) picks, with fewer OCR calls.
+"""
+
+import random
+
+import cv2
+import numpy as np
+import pytest
+
+import process_staging_headshots as psh
+
+# Fake OCR output per gray level of the synthetic candidate images; the texts sit on
+# both sides of TEXT_WORD_THRESHOLD / TEXT_CHAR_THRESHOLD
+FAKE_TEXT = {
+    10: "",
+    20: "ab",             # 1 word: not text
+    30: "ab cd",          # 2 words: text
+    40: "a b c d e f",    # single-character tokens are noise
+    50: "abcdefghijk",    # 11 letters: not text
+    60: "abcdefghijkl",   # 12 letters: text
+    70: "BREAKING NEWS tonight",
+}
+TEXT_LEVELS = {level for level, text in FAKE_TEXT.items()
+               if len([t for t in text.split() if len(t) > 1]) >= psh.TEXT_WORD_THRESHOLD
+               or sum(c.isalpha() for c in text) >= psh.TEXT_CHAR_THRESHOLD}
+
+# Feature values at and around every scoring threshold
+SHARPNESS = (0.0, 100.0, psh.SHARPNESS_FULL - 1, psh.SHARPNESS_FULL, psh.SHARPNESS_FULL * 3)
+ASPECTS = (psh.ASPECT_WIDE - 0.01, psh.ASPECT_WIDE, 0.99, 1.0, 1.5)
+CENTRALITY = (0.0, psh.CENTRALITY_NEAR, 0.3, psh.CENTRALITY_FAR, 0.9)
+
+
+class FakeOcr(psh.OcrBackend):
+    """Returns FAKE_TEXT for the image's gray level; counts calls like a real backend."""
+
+    name = "fake"
+
+    def _recognize(self, gray: np.ndarray, psm: int | None) -> str:
+        return FAKE_TEXT[int(gray[0, 0])]
+
+
+@pytest.fixture
+def ocr(monkeypatch):
+    backend = FakeOcr(workers=1)
+    monkeypatch.setattr(psh, "_ocr_backend", backend)
+    monkeypatch.setattr(psh, "_ocr_backend_resolved", True)
+    # Solid images have no text-like regions: OCR the whole frame
+    monkeypatch.setattr(psh, "TEXT_PREFILTER", False)
+    return backend
+
+
+@pytest.fixture
+def level_images(tmp_path):
+    """{gray level: PNG path} of a solid image per FAKE_TEXT level."""
+    paths = {}
+    for level in FAKE_TEXT:
+        path = tmp_path / f"level-{level}.png"
+        cv2.imwrite(str(path), np.full((32, 32, 3), level, dtype=np.uint8))
+        paths[level] = path
+    return paths
+
+
+def _record(path, rng: random.Random) -> dict:
+    return {
+        "path": path,
+        "face": None,
+        "crop_rect": (0, 0, 32, 32),
+        "status": rng.choice(psh.STATUS_CODES),
+        "sharpness": rng.choice(SHARPNESS),
+        "aspect_ratio": rng.choice(ASPECTS),
+        "face_centrality": rng.choice(CENTRALITY),
+        "has_text": None,
+        "bad_brightness": rng.random() < 0.2,
+    }
+
+
+def _synthetic_slugs(level_images, seed: int = 1, slugs: int = 300) -> list[list[dict]]:
+    """Candidate lists of 1-10 records; every third slug repeats features to force ties."""
+    rng = random.Random(seed)
+    groups = []
+    for i in range(slugs):
+        records = []
+        for _ in range(rng.randint(1, 10)):
+            level = rng.choice(list(FAKE_TEXT))
+            if i % 3 == 0 and records and rng.random() < 0.5:
+                records.append(dict(records[-1], path=level_images[level]))
+            else:
+                records.append(_record(level_images[level], rng))
+        groups.append(records)
+    return groups
+
+
+def _eager_pick(records: list[dict]) -> int:
+    for rec in records:
+        psh.resolve_text(rec)
+    return max(range(len(records)), key=lambda i: psh.score_candidate(records[i]))
+
+
+def _lazy_pick(records: list[dict]) -> int:
+    best = psh.pick_best(records)
+    return next(i for i, rec in enumerate(records) if rec is best)
+
+
+def test_fake_ocr_thresholds(ocr, level_images):
+    for level, path in level_images.items():
+        assert psh.has_significant_text(path) == (level in TEXT_LEVELS)
+
+
+def test_lazy_pick_matches_eager(ocr, level_images):
+    groups = _synthetic_slugs(level_images)
+    eager_records = [[dict(rec) for rec in records] for records in groups]
+    lazy_records = [[dict(rec) for rec in records] for records in groups]
+
+    eager = [_eager_pick(records) for records in eager_records]
+    eager_calls = ocr.calls
+    lazy = [_lazy_pick(records) for records in lazy_records]
+    lazy_calls = ocr.calls - eager_calls
+
+    assert lazy == eager
+    assert eager_calls == sum(len(records) for records in groups)
+    assert lazy_calls < eager_calls / 2
+    # The pick always has its text resolved, and its score is final
+    for records, i in zip(lazy_records, lazy):
+        assert records[i]["has_text"] is not None
+        assert records[i]["score"] == psh.score_candidate(records[i])
+
+
+def test_lazy_pick_first_of_ties(ocr, level_images):
+    """Equal scores: the first candidate wins, as with max(); a tie lost to text does not count."""
+    base = {"face": None, "crop_rect": (0, 0, 32, 32), "status": "ok", "sharpness": 200.0,
+            "aspect_ratio": 1.0, "face_centrality": 0.1, "has_text": None, "bad_brightness": False}
+    texty, clean_a, clean_b = (dict(base, path=level_images[level]) for level in (30, 10, 20))
+    assert psh.pick_best([texty, clean_a, clean_b]) is clean_a
+    assert psh.pick_best([dict(clean_b, has_text=None), dict(texty, has_text=None)])["path"] == clean_b["path"]
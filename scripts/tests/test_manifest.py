@@ -0,0 +1,25 @@
+"""BuildManifest keeps cropped/ in step with its entries."""
+
+import process_headshots
+
+
+def _entry(out_dir, stem: str, sizes: tuple[int, ...] = ()) -> dict:
+    return {
+        "id": stem,
+        "out_path": str(out_dir / f"{stem}.jpg"),
+        "record": {"outputs": [str(out_dir / f"{stem}-{px}.webp") for px in sizes]},
+    }
+
+
+def test_sweep_removes_unreferenced_outputs(tmp_path):
+    out_dir = tmp_path / "cropped"
+    out_dir.mkdir()
+    for name in ("a.jpg", "a-64.webp", "a-96.webp", "b.jpg", "renamed.jpg", "notes.txt", ".a.tmp"):
+        (out_dir / name).write_bytes(b"x")
+    manifest = process_headshots.BuildManifest(tmp_path / "manifest.json", {})
+    manifest.entries = {"src/a.jpg": _entry(out_dir, "a", (64,)), "src/b.jpg": _entry(out_dir, "b")}
+
+    assert manifest.sweep_outputs(out_dir) == 2
+    assert sorted(p.name for p in out_dir.iterdir()) == [".a.tmp", "a-64.webp", "a.jpg", "b.jpg", "notes.txt"]
+    assert manifest.sweep_outputs(out_dir) == 0
+    assert manifest.sweep_outputs(tmp_path / "missing") == 0
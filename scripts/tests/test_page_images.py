@@ -0,0 +1,68 @@
+"""fetch_headshots_google.download_image on a page URL, against the benchmark's local page server."""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import bench_headshots
+import fetch_headshots_google as fhg
+
+SLOW = 0.3  # seconds; well under PROBE_TIMEOUT, so slow-* images pass their probes
+
+
+@pytest.fixture
+def server():
+    server = bench_headshots.start_page_server(bench_headshots._sample_jpeg(64), 20, 0.0, SLOW)
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture
+def client():
+    with fhg.create_client() as client:
+        yield client
+
+
+@pytest.fixture
+def pool():
+    with ThreadPoolExecutor(max_workers=fhg.PROBE_WORKERS) as pool:
+        yield pool
+
+
+def _download(server, client, pool, page, tmp_path) -> list[tuple[str, str]]:
+    """Image requests made while fetching /<page>; asserts an image was saved."""
+    dest = tmp_path / f"{page}.jpg"
+    assert fhg.download_image(client, f"http://127.0.0.1:{server.server_address[1]}/{page}", dest, None, pool)
+    assert dest.read_bytes()[:2] == b"\xff\xd8"
+    return [(method, path) for method, path in server.requests if path.startswith("/img/")]
+
+
+def _downloaded(requests: list[tuple[str, str]]) -> list[str]:
+    """GETs of paths that serve an image (404 and text/html paths also get ranged GET probes)."""
+    return [path for method, path in requests
+            if method == "GET" and path.startswith(("/img/ok", "/img/slow", "/img/huge"))]
+
+
+def test_og_image_skips_body_probes(server, client, pool, tmp_path):
+    assert _download(server, client, pool, "og", tmp_path) == [("GET", "/img/ok.jpg")]
+
+
+def test_broken_og_image_falls_back_to_body(server, client, pool, tmp_path):
+    requests = _download(server, client, pool, "og-broken", tmp_path)
+    assert requests[0] == ("GET", "/img/missing-og.jpg")
+    assert ("HEAD", "/img/missing-0.jpg") in requests
+    assert _downloaded(requests) == ["/img/slow-0.jpg"]
+
+
+@pytest.mark.parametrize("shared_pool", [True, False])
+def test_first_passing_probe_in_page_order_wins(server, client, pool, tmp_path, shared_pool):
+    """ok.jpg answers its probe first, but slow-0.jpg comes earlier on the page."""
+    requests = _download(server, client, pool if shared_pool else None, "plain", tmp_path)
+    assert _downloaded(requests) == ["/img/slow-0.jpg"]
+
+
+@pytest.mark.parametrize("shared_pool", [True, False])
+def test_malformed_urls_are_skipped(server, client, pool, tmp_path, shared_pool):
+    """Unparseable share images and <img>s (urljoin ValueError, httpx.InvalidURL) count as failures."""
+    requests = _download(server, client, pool if shared_pool else None, "og-malformed", tmp_path)
+    assert _downloaded(requests) == ["/img/slow-0.jpg"]
@@ -0,0 +1,61 @@
+"""--replay must score every candidate with its real has_text, even after an --ocr lazy run."""
+
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import process_staging_headshots as psh
+from headshot_processor import get_detector
+
+PORTRAITS = Path(__file__).resolve().parents[2] / "public" / "portraits"
+
+
+class FakeOcr(psh.OcrBackend):
+    """Every image reads as a caption."""
+
+    name = "fake"
+
+    def _recognize(self, gray: np.ndarray, psm: int | None) -> str:
+        return "BREAKING NEWS tonight"
+
+
+@pytest.fixture
+def ocr(monkeypatch):
+    backend = FakeOcr(workers=1)
+    monkeypatch.setattr(psh, "_ocr_backend", backend)
+    monkeypatch.setattr(psh, "_ocr_backend_resolved", True)
+    monkeypatch.setattr(psh, "TEXT_PREFILTER", False)
+    return backend
+
+
+@pytest.fixture
+def groups(tmp_path):
+    portraits = sorted(PORTRAITS.glob("*.jpg"))[:4]
+    if len(portraits) < 4:
+        pytest.skip("needs public/portraits")
+    paths = []
+    for n, src in enumerate(portraits, 1):
+        paths.append(tmp_path / f"person-{n}.jpg")
+        shutil.copy(src, paths[-1])
+    return {"person": paths}
+
+
+def test_replay_resolves_deferred_ocr(ocr, groups, tmp_path):
+    detector = get_detector("haar")
+    cache = psh.AnalysisCache(tmp_path / "analysis.sqlite", psh.analysis_fingerprint(detector))
+    for path in groups["person"]:
+        assert psh.analyze_candidate_cached(path, detector, cache, ocr=False)["has_text"] is None
+    assert ocr.calls == 0
+
+    records, missing, resolved = psh.load_replay_records(groups, cache)
+    assert (missing, resolved) == (0, 4)
+    assert [rec["has_text"] for rec in records["person"]] == [True] * 4
+    calls = ocr.calls
+
+    # The OCR results went into the cache: a second replay decodes nothing
+    records, missing, resolved = psh.load_replay_records(groups, cache)
+    assert (missing, resolved, ocr.calls) == (0, 0, calls)
+    assert [rec["has_text"] for rec in records["person"]] == [True] * 4
+    cache.close()
@@ -0,0 +1,79 @@
+"""score_table / best_per_slug must stay bit-identical to score_candidate / max() per slug."""
+
+import random
+
+import numpy as np
+
+import process_staging_headshots as psh
+
+# Feature values at and around every scoring threshold, plus ordinary ones
+SHARPNESS = (0.0, 1.0, psh.SHARPNESS_FULL - 1e-9, psh.SHARPNESS_FULL, psh.SHARPNESS_FULL * 3, 123.456)
+ASPECTS = (0.3, psh.ASPECT_WIDE - 1e-9, psh.ASPECT_WIDE, 0.99, 1.0, 1.7)
+CENTRALITY = (0.0, psh.CENTRALITY_NEAR, psh.CENTRALITY_NEAR + 1e-9, 0.33, psh.CENTRALITY_FAR,
+              psh.CENTRALITY_FAR + 1e-9, 1.0)
+STATUSES = list(psh.STATUS_BONUS) + ["unknown-status"]
+
+
+def _record(rng: random.Random) -> dict:
+    rec = {
+        "status": rng.choice(STATUSES),
+        "sharpness": rng.choice(SHARPNESS) if rng.random() < 0.7 else rng.uniform(0, 900),
+        "aspect_ratio": rng.choice(ASPECTS),
+        "face_centrality": rng.choice(CENTRALITY),
+        "has_text": rng.choice((True, False, None)),
+        "bad_brightness": rng.random() < 0.3,
+    }
+    # score_candidate defaults the optional features; candidate_table must too
+    for key in ("aspect_ratio", "face_centrality", "has_text", "bad_brightness"):
+        if rng.random() < 0.1:
+            del rec[key]
+    return rec
+
+
+def _records(seed: int = 7, count: int = 3000, slugs: int = 400) -> tuple[list[dict], list[int]]:
+    """Records with interleaved slug ids; a third are copies of an earlier record, so scores tie."""
+    rng = random.Random(seed)
+    records, slug_ids = [], []
+    for _ in range(count):
+        slug = rng.randrange(slugs)
+        same_slug = [r for r, s in zip(records[-50:], slug_ids[-50:]) if s == slug]
+        records.append(dict(rng.choice(same_slug)) if same_slug and rng.random() < 0.33 else _record(rng))
+        slug_ids.append(slug)
+    return records, slug_ids
+
+
+def test_scores_bit_identical():
+    records, slug_ids = _records()
+    scores = psh.score_table(psh.candidate_table(records, slug_ids))
+    assert scores.tolist() == [psh.score_candidate(r) for r in records]
+
+
+def test_best_per_slug_matches_max():
+    records, slug_ids = _records()
+    table = psh.candidate_table(records, slug_ids)
+    best = psh.best_per_slug(table, psh.score_table(table))
+
+    expected = {}
+    for slug in sorted(set(slug_ids)):
+        rows = [i for i, s in enumerate(slug_ids) if s == slug]
+        expected[slug] = max(rows, key=lambda i: psh.score_candidate(records[i]))
+    assert best == expected
+    # The data really exercises ties: some slugs have a tied best score
+    scores = [psh.score_candidate(r) for r in records]
+    tied = sum(1 for slug, i in best.items()
+               if sum(1 for j, s in enumerate(slug_ids) if s == slug and scores[j] == scores[i]) > 1)
+    assert tied > 10
+
+
+def test_score_features_linear_in_weights():
+    records, slug_ids = _records(seed=11, count=500)
+    table = psh.candidate_table(records, slug_ids)
+    np.testing.assert_allclose(
+        psh.score_features(table) @ psh.current_score_weights(), psh.score_table(table), rtol=0, atol=1e-12
+    )
+
+
+def test_empty_table():
+    table = psh.candidate_table([])
+    assert psh.score_table(table).shape == (0,)
+    assert psh.best_per_slug(table, psh.score_table(table)) == {}
@@ -0,0 +1,28 @@
+"""text_regions must keep any text the OCR thresholds could count, however it wraps."""
+
+import cv2
+import numpy as np
+import pytest
+
+import process_staging_headshots as psh
+
+
+def _caption(lines: list[str]) -> np.ndarray:
+    gray = np.full((400, 400), 200, dtype=np.uint8)
+    for i, text in enumerate(lines):
+        cv2.putText(gray, text, (60, 120 + i * 90), cv2.FONT_HERSHEY_SIMPLEX, 2, 0, 4)
+    return gray
+
+
+@pytest.mark.parametrize(
+    "lines, regions",
+    [
+        (["AB CD"], 1),
+        (["AB", "CD"], 2),  # two 2-letter words wrapped onto two lines
+        (["AB"], 0),        # one word: cannot reach TEXT_WORD_THRESHOLD
+        (["A", "B"], 0),
+        ([], 0),
+    ],
+)
+def test_text_regions(lines, regions):
+    assert len(psh.text_regions(_caption(lines))) == regions